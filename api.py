@@ -1,20 +1,35 @@
+import os
+
 import uvicorn
 
-from api.router.user import router as user
-from api.router.konsol import router as konsol
-from core.api import app
+from config import cnf
 from core.logger import api_logger as logger
 
-app.include_router(router=user)
-app.include_router(router=konsol)
+
+def setup_multiprocess_metrics() -> None:
+    """
+    Несколько воркеров: каждый пишет метрики в файлы PROMETHEUS_MULTIPROC_DIR, /metrics их суммирует.
+    Переменная задаётся до запуска воркеров (prometheus_client читает её при импорте),
+    файлы прошлого запуска удаляются.
+    """
+    path = cnf.metrics.MULTIPROC_DIR
+    path.mkdir(parents=True, exist_ok=True)
+    for file in path.glob("*.db"):
+        file.unlink()
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(path)
 
 
 if __name__ == "__main__":
+    if cnf.api.WORKERS > 1:
+        setup_multiprocess_metrics()
     try:
+        # Приложение передаётся строкой: при API_WORKERS > 1 каждый процесс импортирует его сам
         uvicorn.run(
-            app=app,
-            host="0.0.0.0",
-            port=9000
+            app="core.api:app",
+            host=cnf.api.HOST,
+            port=cnf.api.PORT,
+            workers=cnf.api.WORKERS,
+            timeout_graceful_shutdown=cnf.api.SHUTDOWN_TIMEOUT
         )
     except KeyboardInterrupt:
         logger.info('Exit')
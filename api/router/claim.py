@@ -0,0 +1,58 @@
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.schemas.response import ResponseBase
+from api.schemas.claim import ClaimItem, ClaimsListResponse
+from db.beanie.models.models import Claim, ApiKey
+from utils.api import require_scope
+from utils.pagination import paginate, date_range_filter, InvalidCursor
+
+router = APIRouter(
+    tags=["Claims"],
+    prefix='/claims'
+)
+
+# bank_details_kind платежа -> payment_method заявки
+PAYMENT_METHOD_BY_KIND = {
+    "fps": "phone",
+    "card": "card"
+}
+
+
+@router.get("", response_model=ResponseBase)
+async def list_claims(
+    status: Optional[str] = Query(None, description="claim_status: pending / process / confirm / cancelled"),
+    user_id: Optional[int] = Query(None, description="tg_id пользователя"),
+    bank_details_kind: Optional[str] = Query(None, description="fps / card"),
+    date_from: Optional[datetime] = Query(None, description="created_at >= date_from"),
+    date_to: Optional[datetime] = Query(None, description="created_at < date_to"),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущего ответа"),
+    limit: int = Query(50, ge=1, le=200),
+    auth: ApiKey = Depends(require_scope("claims"))
+) -> ResponseBase:
+    """
+    Список заявок, новые первыми, с keyset пагинацией
+    """
+    query: Dict[str, Any] = date_range_filter(date_from, date_to)
+    if status:
+        query["claim_status"] = status
+    if user_id is not None:
+        query["user_id"] = user_id
+    if bank_details_kind:
+        query["payment_method"] = PAYMENT_METHOD_BY_KIND.get(bank_details_kind, bank_details_kind)
+
+    try:
+        claims, next_cursor = await paginate(Claim, query, cursor, limit)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Некорректный cursor")
+
+    return ResponseBase(
+        success=True,
+        data=ClaimsListResponse(
+            items=[ClaimItem.model_validate(claim.model_dump()) for claim in claims],
+            next_cursor=next_cursor
+        ),
+        message="Список заявок получен"
+    )
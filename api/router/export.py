@@ -0,0 +1,45 @@
+from typing import Optional
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from db.beanie.models import ApiKey
+from utils.api import require_scope
+from utils.export import EXPORTS, EXPORT_FORMATS, MEDIA_TYPES, export_chunks, gzip_chunks
+
+router = APIRouter(
+    tags=["Export"],
+    prefix='/export'
+)
+
+
+@router.get("/{kind}")
+async def export_collection(
+    kind: str,
+    format: str = Query("csv", description="csv / ndjson"),
+    gzip: bool = Query(False, description="Сжать выгрузку gzip"),
+    date_from: Optional[datetime] = Query(None, description="created_at >= date_from"),
+    date_to: Optional[datetime] = Query(None, description="created_at < date_to"),
+    auth: ApiKey = Depends(require_scope("export"))
+) -> StreamingResponse:
+    """
+    Потоковая выгрузка заявок (claims) или платежей (payments).
+    Строки формируются по мере чтения курсора, память не растёт с размером коллекции.
+    """
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Неизвестная выгрузка: {kind}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Формат должен быть одним из: {', '.join(EXPORT_FORMATS)}")
+
+    chunks = export_chunks(kind, format, date_from, date_to)
+    filename = f"{kind}.{format}"
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+
+    return StreamingResponse(
+        content=chunks,
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from core.logger import api_logger as logger
+from core.mongo import client as mongo_client
+
+router = APIRouter(
+    tags=["Health"],
+    prefix='/health'
+)
+
+
+@router.get("/live", include_in_schema=False)
+async def live() -> dict:
+    """
+    Процесс жив и обрабатывает запросы
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready", include_in_schema=False)
+async def ready(request: Request) -> JSONResponse:
+    """
+    Воркер прогрет и MongoDB доступна — можно направлять трафик
+    """
+    if not request.app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    try:
+        await mongo_client.admin.command("ping")
+    except Exception as e:
+        logger.warning(f"Readiness check failed: {e}")
+        return JSONResponse(status_code=503, content={"status": "mongo unavailable"})
+    return JSONResponse(content={"status": "ok"})
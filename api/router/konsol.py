@@ -1,26 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+import asyncio
+import hashlib
+import hmac
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from beanie.operators import In
+from pydantic import ValidationError
+from pymongo.errors import DuplicateKeyError
+
 from api.schemas.response import ResponseBase
 from api.schemas.konsol import (
-    CreatePaymentRequest, PaymentResponse, FpsBankMemberResponse
+    CreatePaymentRequest, PaymentResponse, FpsBankMemberResponse, KonsolWebhookPayload,
+    PaymentStatusBatchRequest, PaymentStatusItem, PaymentStatusBatchResponse, PaymentsListResponse
 )
-from utils.api import auth_by_token
+from config import cnf
+from core.bot import bot
+from utils.api import require_scope
+from utils.cache import AsyncTTLCache
+from core.metrics import register_cache
+from core.tracing import claim_span
 from utils.konsol_client import konsol_client
+from utils.pagination import paginate, date_range_filter, InvalidCursor
+from utils.payment_status import (
+    apply_payment_status, is_status_fresh, is_terminal, notify_payment_status, fetch_payment_statuses
+)
 from core.logger import api_logger as logger
-from db.beanie.models.models import KonsolPayment, User, Claim
+from db.beanie.models.models import KonsolPayment, KonsolWebhookEvent, User, Claim, MOSCOW_TZ, ApiKey
 
 router = APIRouter(
     tags=["Konsol Payments"],
     prefix='/konsol'
 )
 
+# Кэш ответов GET /payments/{konsol_id}
+payment_status_cache = AsyncTTLCache(name="konsol_payment_status", maxsize=cnf.konsol.CACHE_MAXSIZE)
+register_cache(payment_status_cache)
+
+
+def payment_to_dict(db_payment: KonsolPayment) -> Dict[str, Any]:
+    """
+    Платёж из локальной БД в формате ответа konsol.pro
+    """
+    return {
+        "id": db_payment.konsol_id,
+        "status": db_payment.status,
+        "amount": str(db_payment.amount),
+        "purpose": db_payment.purpose,
+        "contractor_id": db_payment.contractor_id,
+        "bank_details_kind": db_payment.bank_details_kind,
+        "bank_details": {
+            "card_number": db_payment.card_number,
+            "fps_mobile_phone": db_payment.phone_number,
+            "fps_bank_member_id": db_payment.bank_member_id
+        },
+        "claim_id": db_payment.claim_id,
+        "user_id": db_payment.user_id,
+        "created_at": db_payment.created_at.isoformat(),
+        "updated_at": db_payment.updated_at.isoformat(),
+        "paid_at": db_payment.paid_at.isoformat() if db_payment.paid_at else None
+    }
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str]) -> None:
+    """
+    Проверяет HMAC-SHA256 подпись тела webhook запроса
+    """
+    if not cnf.konsol.WEBHOOK_SECRET:
+        raise HTTPException(status_code=403, detail="Webhook не настроен")
+
+    expected = hmac.new(cnf.konsol.WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    if not signature or not hmac.compare_digest(signature.lower(), expected):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
 
 @router.post("/payments", response_model=ResponseBase)
 async def create_payment(
     data: CreatePaymentRequest,
-    auth: bool = Depends(auth_by_token)
+    auth: ApiKey = Depends(require_scope("konsol"))
 ) -> ResponseBase:
     """
     Создать новый платёж через Konsol API
@@ -58,7 +115,8 @@ async def create_payment(
         }
 
         # === Вызов Konsol API ===
-        result = await konsol_client.create_payment(payment_payload)
+        with claim_span("claim.payment.create", data.claim_id, **{"payment.kind": bank_details_kind}):
+            result = await konsol_client.create_payment(payment_payload)
 
         # === Сохранение в БД ===
         konsol_payment = await KonsolPayment.create(
@@ -90,53 +148,96 @@ async def create_payment(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/payments", response_model=ResponseBase)
+async def list_payments(
+    status: Optional[str] = Query(None, description="Статус платежа"),
+    user_id: Optional[int] = Query(None, description="tg_id пользователя"),
+    bank_details_kind: Optional[str] = Query(None, description="fps / card / bank_account"),
+    date_from: Optional[datetime] = Query(None, description="created_at >= date_from"),
+    date_to: Optional[datetime] = Query(None, description="created_at < date_to"),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущего ответа"),
+    limit: int = Query(50, ge=1, le=200),
+    auth: ApiKey = Depends(require_scope("konsol"))
+) -> ResponseBase:
+    """
+    Список платежей, новые первыми, с keyset пагинацией
+    """
+    query: Dict[str, Any] = date_range_filter(date_from, date_to)
+    if status:
+        query["status"] = status
+    if user_id is not None:
+        query["user_id"] = user_id
+    if bank_details_kind:
+        query["bank_details_kind"] = bank_details_kind
+
+    try:
+        payments, next_cursor = await paginate(KonsolPayment, query, cursor, limit)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Некорректный cursor")
+
+    return ResponseBase(
+        success=True,
+        data=PaymentsListResponse(
+            items=[payment_to_dict(payment) for payment in payments],
+            next_cursor=next_cursor
+        ),
+        message="Список платежей получен"
+    )
+
+
+async def load_payment_status(konsol_id: str) -> Dict[str, Any]:
+    """
+    Статус платежа: из БД, если он актуален, иначе из konsol.pro
+    """
+    # Сначала ищем в нашей БД
+    db_payment = await KonsolPayment.get(konsol_id=konsol_id)
+
+    if not db_payment:
+        raise HTTPException(status_code=404, detail="Платёж не найден в локальной БД")
+
+    # Статус актуален (конечный или недавно пришёл webhook) — в API не ходим
+    if is_status_fresh(db_payment, cnf.konsol.STATUS_FRESHNESS):
+        return payment_to_dict(db_payment)
+
+    # Запрашиваем статус из API
+    try:
+        api_result = await konsol_client.get_payment(konsol_id)
+
+        # Обновляем статус в БД, если изменился
+        if api_result.get("status"):
+            await apply_payment_status(db_payment, api_result.get("status"))
+
+        return api_result
+
+    except Exception as api_error:
+        logger.warning(f"Failed to fetch payment status from API: {api_error}")
+        # Возвращаем данные из БД
+        return payment_to_dict(db_payment)
+
+
+def payment_status_ttl(result: Dict[str, Any]) -> Optional[float]:
+    """
+    Конечные статусы кэшируются бессрочно, остальные — на CACHE_TTL_PENDING секунд
+    """
+    if is_terminal(result.get("status")):
+        return None
+    return cnf.konsol.CACHE_TTL_PENDING
+
+
 @router.get("/payments/{konsol_id}", response_model=ResponseBase)
 async def get_payment_status(
     konsol_id: str,
-    auth: bool = Depends(auth_by_token)
+    auth: ApiKey = Depends(require_scope("konsol"))
 ) -> ResponseBase:
     """
     Получить статус платежа
     """
     try:
-        # Сначала ищем в нашей БД
-        db_payment = await KonsolPayment.get(konsol_id=konsol_id)
-
-        if not db_payment:
-            raise HTTPException(status_code=404, detail="Платёж не найден в локальной БД")
-
-        # Запрашиваем статус из API
-        try:
-            api_result = await konsol_client.get_payment(konsol_id)
-
-            # Обновляем статус в БД, если изменился
-            if db_payment.status != api_result.get("status"):
-                update_data = {"status": api_result.get("status"), "updated_at": datetime.now()}
-                if api_result.get("status") == "executed" and not db_payment.paid_at:
-                    update_data["paid_at"] = datetime.now()
-                await db_payment.update(**update_data)
-
-            result = api_result
-
-        except Exception as api_error:
-            logger.warning(f"Failed to fetch payment status from API: {api_error}")
-            # Возвращаем данные из БД
-            result = {
-                "id": db_payment.konsol_id,
-                "status": db_payment.status,
-                "amount": str(db_payment.amount),
-                "purpose": db_payment.purpose,
-                "contractor_id": db_payment.contractor_id,
-                "bank_details_kind": db_payment.bank_details_kind,
-                "bank_details": {
-                    "card_number": db_payment.card_number,
-                    "fps_mobile_phone": db_payment.phone_number,
-                    "fps_bank_member_id": db_payment.bank_member_id
-                },
-                "created_at": db_payment.created_at.isoformat(),
-                "updated_at": db_payment.updated_at.isoformat(),
-                "paid_at": db_payment.paid_at.isoformat() if db_payment.paid_at else None
-            }
+        result = await payment_status_cache.get_or_load(
+            konsol_id,
+            loader=lambda: load_payment_status(konsol_id),
+            ttl_for=payment_status_ttl
+        )
 
         return ResponseBase(
             success=True,
@@ -151,9 +252,162 @@ async def get_payment_status(
         raise HTTPException(status_code=500, detail="Ошибка получения статуса платежа")
 
 
+@router.post("/payments/status:batch", response_model=ResponseBase)
+async def get_payment_statuses_batch(
+    data: PaymentStatusBatchRequest,
+    auth: ApiKey = Depends(require_scope("konsol"))
+) -> ResponseBase:
+    """
+    Получить статусы нескольких платежей за один запрос.
+    Платежи читаются одним `$in` запросом, в konsol.pro запрашиваются только устаревшие незавершённые.
+    """
+    konsol_ids = list(dict.fromkeys(data.ids))
+    if len(konsol_ids) > cnf.konsol.STATUS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Не более {cnf.konsol.STATUS_BATCH_MAX_IDS} ID за запрос"
+        )
+
+    try:
+        # === 1. Кэш ===
+        results, missing = payment_status_cache.get_many(konsol_ids)
+
+        # === 2. Один запрос в БД ===
+        db_payments = await KonsolPayment.find(In(KonsolPayment.konsol_id, missing)).to_list() if missing else []
+
+        stale = []
+        for db_payment in db_payments:
+            if is_status_fresh(db_payment, cnf.konsol.STATUS_FRESHNESS):
+                results[db_payment.konsol_id] = payment_to_dict(db_payment)
+            else:
+                stale.append(db_payment)
+
+        # === 3. Параллельное обновление устаревших из konsol.pro ===
+        if stale:
+            api_results = await fetch_payment_statuses(
+                (db_payment.konsol_id for db_payment in stale),
+                concurrency=cnf.konsol.STATUS_BATCH_CONCURRENCY
+            )
+            await asyncio.gather(*(
+                apply_payment_status(db_payment, api_results[db_payment.konsol_id]["status"])
+                for db_payment in stale
+                if api_results.get(db_payment.konsol_id, {}).get("status")
+            ))
+            for db_payment in stale:
+                api_result = api_results.get(db_payment.konsol_id)
+                # Ответ без статуса не затирает сохранённый в БД
+                results[db_payment.konsol_id] = (
+                    api_result if api_result and api_result.get("status") else payment_to_dict(db_payment)
+                )
+
+        for konsol_id in missing:
+            if konsol_id in results:
+                payment_status_cache.set(konsol_id, results[konsol_id], payment_status_ttl(results[konsol_id]))
+
+        response = PaymentStatusBatchResponse(
+            items=[
+                PaymentStatusItem(
+                    id=konsol_id,
+                    status=results[konsol_id].get("status"),
+                    paid_at=results[konsol_id].get("paid_at")
+                )
+                for konsol_id in konsol_ids
+                if konsol_id in results
+            ],
+            not_found=[konsol_id for konsol_id in konsol_ids if konsol_id not in results]
+        )
+
+        return ResponseBase(
+            success=True,
+            data=response,
+            message="Статусы платежей получены"
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to get payment statuses batch: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка получения статусов платежей")
+
+
+@router.get("/cache/stats", response_model=ResponseBase)
+async def get_cache_stats(
+    auth: ApiKey = Depends(require_scope("konsol"))
+) -> ResponseBase:
+    """
+    Метрики кэша статусов платежей
+    """
+    return ResponseBase(
+        success=True,
+        data=payment_status_cache.stats(),
+        message="Метрики кэша получены"
+    )
+
+
+@router.post("/webhook", response_model=ResponseBase)
+async def konsol_webhook(request: Request) -> ResponseBase:
+    """
+    Приём уведомлений konsol.pro об изменении статуса платежа.
+    Тело подписывается HMAC-SHA256 (ключ KONSOL_WEBHOOK_SECRET), повторные события игнорируются.
+    """
+    body = await request.body()
+    verify_webhook_signature(body, request.headers.get(cnf.konsol.WEBHOOK_SIGNATURE_HEADER))
+
+    try:
+        payload = KonsolWebhookPayload.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+    konsol_id = payload.data.get("id")
+    status = payload.data.get("status")
+    if not konsol_id or not status:
+        raise HTTPException(status_code=422, detail="В событии нет id или status платежа")
+
+    event_id = (
+        payload.id
+        or request.headers.get("X-Konsol-Event-Id")
+        or hashlib.sha256(body).hexdigest()
+    )
+
+    # === Дедупликация по ID события ===
+    try:
+        event = await KonsolWebhookEvent.create(
+            event_id=event_id,
+            konsol_id=konsol_id,
+            status=status,
+            payload=payload.model_dump(mode="json"),
+            received_at=datetime.now(MOSCOW_TZ)
+        )
+    except DuplicateKeyError:
+        logger.info(f"Duplicate Konsol webhook event {event_id}")
+        return ResponseBase(success=True, message="Событие уже обработано")
+
+    try:
+        db_payment = await KonsolPayment.get(konsol_id=konsol_id)
+        if db_payment:
+            with claim_span("claim.payment.webhook", db_payment.claim_id, **{"payment.status": status}):
+                if await apply_payment_status(db_payment, status):
+                    payment_status_cache.invalidate(konsol_id)
+                    if is_terminal(status):
+                        await notify_payment_status(bot, db_payment, status)
+
+    except Exception as e:
+        # Удаляем отметку, чтобы повторная доставка события обработала его заново
+        await event.delete()
+        logger.error(f"Failed to process Konsol webhook {event_id}: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка обработки события")
+
+    if not db_payment:
+        # Платёж может быть ещё не сохранён (вебхук пришёл раньше ответа на создание):
+        # снимаем отметку и отвечаем ошибкой, чтобы konsol.pro доставил событие повторно
+        await event.delete()
+        logger.warning(f"Konsol webhook for unknown payment {konsol_id}")
+        raise HTTPException(status_code=404, detail="Платёж не найден в локальной БД")
+
+    return ResponseBase(success=True, message="Событие обработано")
+
+
 @router.get("/fps-bank-members", response_model=ResponseBase)
 async def get_fps_bank_members(
-    auth: bool = Depends(auth_by_token)
+    auth: ApiKey = Depends(require_scope("konsol"))
 ) -> ResponseBase:
     """
     Получить список банков для СБП
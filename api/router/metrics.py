@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from core.metrics import metrics_registry
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Метрики Prometheus (при нескольких воркерах — сумма по всем)
+    """
+    return Response(content=generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
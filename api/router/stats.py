@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Query
+
+from api.schemas.response import ResponseBase
+from db.beanie.models import ApiKey
+from utils.api import require_scope
+from utils.stats import stats_service
+
+router = APIRouter(
+    tags=["Stats"],
+    prefix='/stats'
+)
+
+
+@router.get("", response_model=ResponseBase)
+async def get_stats(
+    days: int = Query(None, ge=1, le=366, description="Глубина статистики в днях"),
+    auth: ApiKey = Depends(require_scope("stats"))
+) -> ResponseBase:
+    """
+    Статистика по заявкам и выплатам: статусы по дням, время до подтверждения,
+    суммы выплат по способам, конверсия от ввода кода до подтверждения
+    """
+    return ResponseBase(
+        success=True,
+        data=await stats_service.get(days),
+        message="Статистика получена"
+    )
@@ -3,7 +3,8 @@ from fastapi import APIRouter, Depends
 from api.schemas.response import ResponseBase
 from api.schemas.user import User
 from db.psql.models import models as psql
-from utils.api import auth_by_token
+from db.beanie.models import ApiKey
+from utils.api import require_scope
 
 router = APIRouter(
     tags=["User"],
@@ -12,7 +13,7 @@ router = APIRouter(
 
 
 @router.post("")
-async def post_user(data: User = Depends(), auth: bool = Depends(auth_by_token)) -> ResponseBase:
+async def post_user(data: User = Depends(), auth: ApiKey = Depends(require_scope("user"))) -> ResponseBase:
     """
         Create user
     :param data: User
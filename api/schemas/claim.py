@@ -0,0 +1,22 @@
+from typing import Optional, List
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class ClaimItem(BaseModel):
+    claim_id: str
+    user_id: int
+    claim_status: str
+    process_status: str
+    payment_method: str
+    payment_status: Optional[str] = None
+    amount: float
+    konsol_payment_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class ClaimsListResponse(BaseModel):
+    items: List[ClaimItem]
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы, None — страниц больше нет")
@@ -40,15 +40,37 @@ class PaymentResponse(BaseModel):
     paid_at: Optional[datetime] = None
 
 
+# === Схемы для пакетного запроса статусов ===
+class PaymentStatusBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, description="ID платежей в konsol.pro")
+
+
+class PaymentStatusItem(BaseModel):
+    id: str
+    status: Optional[str] = None  # konsol.pro мог не вернуть статус
+    paid_at: Optional[datetime] = None
+
+
+class PaymentStatusBatchResponse(BaseModel):
+    items: List[PaymentStatusItem]
+    not_found: List[str] = []
+
+
+# === Схема webhook уведомления от konsol.pro ===
+class KonsolWebhookPayload(BaseModel):
+    id: Optional[str] = Field(None, description="ID события")
+    event: str = Field("payment.updated", description="Тип события")
+    data: Dict[str, Any] = Field(..., description="Платёж: минимум id и status")
+    timestamp: Optional[datetime] = None
+
+
 class FpsBankMemberResponse(BaseModel):
     id: str
     name: str
     bic: str
 
 
-# === Схемы для списка платежей (если понадобится) ===
+# === Схемы для списка платежей ===
 class PaymentsListResponse(BaseModel):
-    items: List[PaymentResponse]
-    total: int
-    page: int
-    per_page: int
\ No newline at end of file
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы, None — страниц больше нет")
\ No newline at end of file
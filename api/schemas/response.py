@@ -1,5 +1,9 @@
+from typing import Any, Optional
+
 from pydantic import BaseModel
 
 
 class ResponseBase(BaseModel):
     success: bool
+    data: Optional[Any] = None
+    message: Optional[str] = None
@@ -0,0 +1,167 @@
+"""
+Бенчмарки горячих путей слоя данных.
+
+MongoDB — локальная, в отдельной базе `<MONGO_NAME>_bench`, которая заполняется перед прогоном
+и удаляется после. Konsol — локальный HTTP сервер без задержки (замеряется накладка клиента).
+Эндпоинты API (список и статус платежей) вызываются напрямую через ASGI, без HTTP сервера.
+MySQL замеряется только с --mysql: MYSQL_* должны указывать на локальную копию с oc_qrcode.
+
+    python -m benchmarks                      # сравнить с benchmarks/baselines/baseline.json
+    python -m benchmarks --save baseline      # сохранить результаты как базовые
+"""
+import argparse
+import asyncio
+import random
+import sys
+from decimal import Decimal
+from typing import List
+
+from beanie import init_beanie
+
+from benchmarks.runner import Benchmark, asgi_get, load_baseline, report, run_benchmark, save_baseline
+from config import cnf
+from core.api import app
+from core.mongo import create_client
+from db.beanie.models import AdminMessage, Claim, KonsolPayment, User, document_models
+from db.mysql.crud import close_mysql, get_and_delete_code
+from loadtest.stubs import FakeKonsolServer
+from utils.api_keys import api_keys
+from utils.konsol_client import konsol_client
+
+
+async def seed(users: int, claims: int, messages: int, payments: int) -> None:
+    """
+    Тестовые данные: пользователи, заявки, переписка по одной заявке и платежи
+    """
+    await User.get_motor_collection().insert_many([
+        User(tg_id=1_000_000 + i, username=f"bench{i}").model_dump(exclude={"id"})
+        for i in range(users)
+    ])
+    await Claim.get_motor_collection().insert_many([
+        Claim(
+            claim_id=f"{i + 1:06d}", user_id=1_000_000 + i % users, code=f"BENCH-{i}",
+            code_status="valid", payment_method="card", card="2222222222222222"
+        ).model_dump(exclude={"id"})
+        for i in range(claims)
+    ])
+    await AdminMessage.get_motor_collection().insert_many([
+        AdminMessage(
+            claim_id="000001", from_admin_id=1, to_user_id=1_000_000,
+            message_text=f"Сообщение {i}", is_reply=bool(i % 2)
+        ).model_dump(exclude={"id"})
+        for i in range(messages)
+    ])
+    await KonsolPayment.insert_many([
+        KonsolPayment(
+            konsol_id=f"bench-{i}", contractor_id="contractor-1", amount=Decimal("1500.00"), status="executed",
+            purpose="Выплата по заявке", services_list=[{"title": "Выплата", "amount": "1500.00"}],
+            bank_details_kind="card", card_number="2222222222222222", claim_id=f"{i + 1:06d}",
+            user_id=1_000_000 + i % users
+        )
+        for i in range(payments)
+    ])
+
+
+async def build_benchmarks(args: argparse.Namespace) -> List[Benchmark]:
+    claim = await Claim.find_one(Claim.claim_id == "000001")
+
+    async def model_update():
+        await claim.update(
+            review_text="Отличный продукт",
+            photo_file_ids=["file-1", "file-2"],
+            payment_method="card",
+            card="2222222222222222"
+        )
+
+    async def generate_next_claim_id():
+        await Claim.generate_next_claim_id()
+
+    async def user_get():
+        await User.get(tg_id=1_000_000 + random.randrange(args.users))
+
+    async def admin_message_history():
+        await AdminMessage.find(AdminMessage.claim_id == "000001").sort("created_at").to_list()
+
+    async def konsol_request():
+        await konsol_client.get_payment("bench")
+
+    # Проверка ключа входит в замер: ключ из кэша, лимит не ограничивает
+    _, key = await api_keys.create("benchmarks", ["konsol"], rate_limit=0)
+    headers = {"x-auth-token": key}
+
+    async def api_payments_list():
+        await asgi_get(app, "/konsol/payments", "limit=200", headers)
+
+    async def api_payment_status():
+        await asgi_get(app, "/konsol/payments/bench-1", headers=headers)
+
+    async def mysql_get_code():
+        await get_and_delete_code("BENCH-MISSING")
+
+    benchmarks = [
+        Benchmark("model_update", model_update),
+        Benchmark("generate_next_claim_id", generate_next_claim_id),
+        Benchmark("user_get", user_get),
+        Benchmark("admin_message_history", admin_message_history),
+        Benchmark("konsol_request", konsol_request),
+        Benchmark("api_payments_list", api_payments_list),
+        Benchmark("api_payment_status", api_payment_status),
+    ]
+    if args.mysql:
+        benchmarks.append(Benchmark("get_and_delete_code", mysql_get_code, iterations=100))
+    return [benchmark for benchmark in benchmarks if not args.only or benchmark.name in args.only]
+
+
+async def main(args: argparse.Namespace) -> int:
+    if args.mongo_db == cnf.mongo.NAME:
+        raise SystemExit("Бенчмарки удаляют свою базу — укажите --mongo-db, отличную от MONGO_NAME")
+
+    mongo_client = create_client(args.mongo_url, appname="benchmarks")
+    await mongo_client.drop_database(args.mongo_db)
+    await init_beanie(database=mongo_client[args.mongo_db], document_models=document_models)
+
+    # API вызывается напрямую: lifespan не запускается, Beanie уже инициализирован
+    app.state.ready = True
+
+    konsol = FakeKonsolServer()
+    konsol_client.base_url = await konsol.start()
+    try:
+        await seed(args.users, args.claims, args.messages, args.payments)
+        results = [
+            await run_benchmark(benchmark, args.iterations)
+            for benchmark in await build_benchmarks(args)
+        ]
+    finally:
+        await konsol_client.close()
+        await close_mysql()
+        await konsol.stop()
+        await mongo_client.drop_database(args.mongo_db)
+
+    regressions = report(results, load_baseline(args.compare), args.threshold)
+    if args.save:
+        print(f"\nСохранено: {save_baseline(args.save, results)}")
+    if regressions:
+        print(f"\nРегрессии (> {args.threshold:.0%}): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Бенчмарки слоя данных")
+    parser.add_argument("--only", nargs="*", help="Запустить только перечисленные бенчмарки")
+    parser.add_argument("--iterations", type=int, default=None, help="Замеров на бенчмарк")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--claims", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=100, help="Сообщений в истории заявки")
+    parser.add_argument("--payments", type=int, default=1000)
+    parser.add_argument("--mysql", action="store_true", help="Замерить get_and_delete_code (локальный MySQL)")
+    parser.add_argument("--compare", default="baseline", help="Имя базовых результатов для сравнения")
+    parser.add_argument("--save", default=None, help="Сохранить результаты под этим именем")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимый рост медианы")
+    parser.add_argument("--mongo-url", default=None, help="По умолчанию MONGO_* из .env")
+    parser.add_argument("--mongo-db", default=f"{cnf.mongo.NAME}_bench")
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(build_parser().parse_args())))
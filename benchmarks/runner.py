@@ -0,0 +1,122 @@
+import json
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[], Awaitable]
+    iterations: int = 200
+    warmup: int = 20
+
+
+@dataclass
+class Result:
+    name: str
+    samples: List[float] = field(default_factory=list)
+
+    @property
+    def median_ms(self) -> float:
+        return statistics.median(self.samples) * 1000
+
+    @property
+    def p95_ms(self) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+
+    @property
+    def mean_ms(self) -> float:
+        return statistics.fmean(self.samples) * 1000
+
+    @property
+    def ops(self) -> float:
+        return len(self.samples) / sum(self.samples) if self.samples else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "iterations": len(self.samples),
+            "median_ms": round(self.median_ms, 4),
+            "p95_ms": round(self.p95_ms, 4),
+            "mean_ms": round(self.mean_ms, 4),
+            "ops": round(self.ops, 1)
+        }
+
+
+async def run_benchmark(benchmark: Benchmark, iterations: Optional[int] = None) -> Result:
+    """
+    Прогрев, затем замер каждого вызова отдельно
+    """
+    for _ in range(benchmark.warmup):
+        await benchmark.func()
+
+    result = Result(benchmark.name)
+    for _ in range(iterations or benchmark.iterations):
+        start = time.perf_counter()
+        await benchmark.func()
+        result.samples.append(time.perf_counter() - start)
+    return result
+
+
+async def asgi_get(app, path: str, query: str = "", headers: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    GET запрос напрямую в ASGI приложение, без сети и HTTP сервера
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench"), *((k.encode(), v.encode()) for k, v in (headers or {}).items())], "client": ("127.0.0.1", 0), "server": ("bench", 80)
+    }
+    body = []
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"GET {path} -> {status}: {b''.join(body)[:200]}")
+    return b"".join(body)
+
+
+def save_baseline(name: str, results: List[Result]) -> Path:
+    BASELINES_DIR.mkdir(parents=True, exist_ok=True)
+    path = BASELINES_DIR / f"{name}.json"
+    path.write_text(json.dumps({result.name: result.to_dict() for result in results}, indent=2) + "\n")
+    return path
+
+
+def load_baseline(name: str) -> Dict[str, Dict[str, float]]:
+    path = BASELINES_DIR / f"{name}.json"
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def report(results: List[Result], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """
+    Печатает таблицу и возвращает имена бенчмарков, медиана которых выросла больше чем на threshold
+    """
+    regressions = []
+    print(f"{'benchmark':<28}{'median ms':>11}{'p95 ms':>10}{'ops/s':>10}{'baseline':>11}{'change':>9}")
+    for result in results:
+        line = f"{result.name:<28}{result.median_ms:>11.3f}{result.p95_ms:>10.3f}{result.ops:>10.1f}"
+        base = baseline.get(result.name)
+        if base:
+            change = result.median_ms / base["median_ms"] - 1
+            line += f"{base['median_ms']:>11.3f}{change:>+9.0%}"
+            if change > threshold:
+                line += "  REGRESSION"
+                regressions.append(result.name)
+        print(line)
+    return regressions
@@ -1,27 +1,34 @@
 import asyncio
 import contextlib
 
-from aiogram import Dispatcher, Bot
+from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommandScopeDefault, BotCommandScopeChat
 
-from bot.handlers import routers
+from bot.dispatcher import create_dispatcher
 from config import cnf
 from core.bot import bot
-from core.logger import bot_logger as logger
+from core.logger import bot_logger as logger, start_listener, stop_listener
 
 from db.beanie.models import document_models
 from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
-from db.mysql.crud import init_mysql
+from db.mysql.crud import init_mysql, close_mysql
+from bot.middlewares.timing import TelegramTimingMiddleware
+from bot.middlewares.inflight import inflight
+from core.tracing import setup_tracing, shutdown_tracing
+from core.metrics import register_fsm_storage, register_queue
+from core.mongo import client as mongo_client
+from prometheus_client import start_http_server
+from utils.pending_storage import pending_actions
+from utils.payment_reconciler import payment_reconciler
+from utils.payout_queue import payout_worker
+from utils.broadcast import broadcaster
+from utils.retention import ensure_abandoned_claims_ttl, retention_service
+from utils.konsol_client import konsol_client
 
 
-dp = Dispatcher(
-    bot=bot,
-    storage=MemoryStorage()
-)
-dp.include_routers(*routers)
+dp = create_dispatcher()
+bot.session.middleware(TelegramTimingMiddleware())
 
 
 
@@ -29,8 +36,9 @@ async def startup(bot: Bot) -> None:
     """
     Активируется при запуске бота
     """
+    setup_tracing("bot")
+
     # === Инициализация MongoDB (Beanie) ===
-    mongo_client = AsyncIOMotorClient(cnf.mongo.URL)
     await init_beanie(
         database=mongo_client[cnf.mongo.NAME],
         document_models=document_models
@@ -41,6 +49,28 @@ async def startup(bot: Bot) -> None:
     await init_mysql()
     logger.info("✅ MySQL подключена")
 
+    # === Метрики Prometheus ===
+    if cnf.metrics.ENABLED:
+        register_fsm_storage(dp.storage)
+        register_queue("pending_actions", lambda: len(pending_actions))
+        start_http_server(cnf.metrics.BOT_PORT)
+        logger.info(f"✅ Метрики доступны на :{cnf.metrics.BOT_PORT}/metrics")
+
+    # === Фоновая сверка статусов платежей ===
+    if cnf.konsol.RECONCILE_ENABLED:
+        payment_reconciler.start(bot)
+
+    # === Хранение данных: TTL брошенных заявок и архивация старых ===
+    if cnf.retention.ENABLED:
+        await ensure_abandoned_claims_ttl()
+        retention_service.start()
+
+    # === Очередь выплат ===
+    payout_worker.start(bot)
+
+    # === Продолжаем прерванные рассылки ===
+    await broadcaster.resume(bot)
+
     # === Настройка команд бота ===
     await bot.delete_webhook()
     user_commands = [
@@ -63,17 +93,49 @@ async def startup(bot: Bot) -> None:
 
 async def shutdown(bot: Bot) -> None:
     """
-    Активируется при выключении
+    Активируется при выключении, после остановки polling и до закрытия сессии бота.
+    Текущие апдейты дорабатывают до BOT_SHUTDOWN_TIMEOUT, затем ресурсы закрываются.
     """
-    await bot.close()
-    await dp.stop_polling()
+    await payment_reconciler.stop()
+    await retention_service.stop()
+
+    # === Дожидаемся текущих апдейтов ===
+    aborted = await inflight.drain(cnf.bot.SHUTDOWN_TIMEOUT)
+    for info in aborted:
+        logger.error("Update aborted on shutdown", extra=info)
+    if aborted:
+        logger.error(f"Aborted {len(aborted)} in-flight updates, check them manually")
+
+    # === Текущие выплаты дорабатывают, остальные останутся в очереди ===
+    await payout_worker.stop(cnf.bot.SHUTDOWN_TIMEOUT)
+    await broadcaster.stop(cnf.bot.SHUTDOWN_TIMEOUT)
+
+    # === Подтверждаем последнюю пачку апдейтов, чтобы Telegram не прислал её повторно ===
+    # Прерванные апдейты Telegram не вернёт в любом случае: polling подтверждает их следующим
+    # getUpdates ещё во время обработки. Они только попадают в лог выше
+    if inflight.last_update_id is not None:
+        with contextlib.suppress(Exception):
+            await bot.get_updates(offset=inflight.last_update_id + 1, limit=1, timeout=0)
+
+    # === Закрываем соединения ===
+    shutdown_tracing()
+    await konsol_client.close()
+    await close_mysql()
+    mongo_client.close()
+
     logger.info('=== Bot stopped ===')
 
 
 async def main() -> None:
+    start_listener()
     dp.startup.register(startup)
     dp.shutdown.register(shutdown)
-    await dp.start_polling(bot)
+    try:
+        # Сессия бота закрывается aiogram после shutdown
+        await dp.start_polling(bot, close_bot_session=True)
+    finally:
+        # Дописываем очередь логов
+        stop_listener()
 
 
 if __name__ == "__main__":
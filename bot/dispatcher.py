@@ -0,0 +1,39 @@
+from typing import Optional
+
+from aiogram import Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.handlers import routers
+from bot.middlewares.context import CorrelationMiddleware
+from bot.middlewares.fsm_cache import FSMCacheMiddleware
+from bot.middlewares.inflight import inflight
+from bot.middlewares.metrics import HandlerMetricsMiddleware
+from bot.middlewares.throttling import ThrottlingMiddleware
+from bot.middlewares.timing import UpdateTimingMiddleware
+from bot.middlewares.tracing import HandlerTracingMiddleware
+from core.bot import bot
+
+
+def create_dispatcher(storage: Optional[BaseStorage] = None) -> Dispatcher:
+    """
+    Диспетчер с роутерами и middleware бота.
+    Роутеры подключаются к одному диспетчеру, поэтому вызывается один раз на процесс.
+    """
+    dp = Dispatcher(
+        bot=bot,
+        storage=storage or MemoryStorage()
+    )
+    dp.include_routers(*routers)
+    dp.update.outer_middleware(inflight)
+    dp.update.outer_middleware(CorrelationMiddleware())
+    dp.update.outer_middleware(UpdateTimingMiddleware())
+    # После FSMContextMiddleware, который диспетчер подключает сам
+    dp.update.outer_middleware(FSMCacheMiddleware())
+    dp.message.middleware(ThrottlingMiddleware())
+    dp.callback_query.middleware(ThrottlingMiddleware())
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
+    dp.message.middleware(HandlerTracingMiddleware())
+    dp.callback_query.middleware(HandlerTracingMiddleware())
+    return dp
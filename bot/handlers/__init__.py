@@ -1,9 +1,13 @@
 from .user.commands import router as commands
 from .admin.commands import router as admin_commands
 from .admin.chat_with_user import router as chat
+from .admin.stats import router as admin_stats
+from .admin.broadcast import router as admin_broadcast
 
 routers = [
     commands,
     admin_commands,
+    admin_stats,
+    admin_broadcast,
     chat
 ]
@@ -0,0 +1,87 @@
+from aiogram import Router, F
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, Message
+from bson import ObjectId
+
+from bot.filters.admin import IsAdmin
+from bot.templates.admin import broadcast as tbroadcast
+from bot.templates.admin.menu import AdminState
+from core.logger import bot_logger as logger
+from db.beanie.models import Broadcast, User
+from utils.broadcast import broadcaster, recipients_filter
+
+router = Router()
+
+
+@router.message(Command("broadcast"), IsAdmin())
+async def request_broadcast(msg: Message, state: FSMContext):
+    """Запрашивает у админа сообщение для рассылки"""
+    await state.set_state(AdminState.waiting_broadcast_message)
+    await msg.answer(text=tbroadcast.broadcast_request_text, parse_mode="HTML")
+
+
+@router.message(StateFilter(AdminState.waiting_broadcast_message), Command("cancel"))
+async def cancel_broadcast_request(msg: Message, state: FSMContext):
+    await state.clear()
+    await msg.answer(text=tbroadcast.broadcast_cancelled_text)
+
+
+@router.message(StateFilter(AdminState.waiting_broadcast_message))
+async def receive_broadcast_message(msg: Message, state: FSMContext):
+    """Сообщение админа — предпросмотр рассылки, до подтверждения ничего не отправляется"""
+    recipients = await User.get_motor_collection().count_documents(recipients_filter())
+    await state.update_data(broadcast_chat_id=msg.chat.id, broadcast_message_id=msg.message_id)
+    await msg.reply(
+        text=tbroadcast.broadcast_confirm_text(recipients),
+        parse_mode="HTML",
+        reply_markup=tbroadcast.broadcast_confirm_ikb()
+    )
+
+
+@router.callback_query(tbroadcast.BroadcastCallback.filter(F.action == "start"), IsAdmin())
+async def start_broadcast(call: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    if "broadcast_message_id" not in data:
+        await call.answer("Сообщение для рассылки не найдено, начните заново: /broadcast", show_alert=True)
+        return
+    await state.clear()
+
+    broadcast = await Broadcast.create(
+        admin_id=call.from_user.id,
+        from_chat_id=data["broadcast_chat_id"],
+        message_id=data["broadcast_message_id"],
+        total=await User.get_motor_collection().count_documents(recipients_filter()),
+        status_chat_id=call.message.chat.id,
+        status_message_id=call.message.message_id
+    )
+    logger.info("Broadcast started", extra={"admin_id": call.from_user.id, "total": broadcast.total})
+
+    await call.message.edit_text(
+        text=tbroadcast.broadcast_status_text(broadcast),
+        parse_mode="HTML",
+        reply_markup=tbroadcast.broadcast_cancel_ikb(str(broadcast.id))
+    )
+    broadcaster.launch(call.bot, broadcast)
+    await call.answer()
+
+
+@router.callback_query(tbroadcast.BroadcastCallback.filter(F.action == "abort"), IsAdmin())
+async def abort_broadcast(call: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await call.message.edit_text(text=tbroadcast.broadcast_cancelled_text)
+    await call.answer()
+
+
+@router.callback_query(tbroadcast.BroadcastCallback.filter(F.action == "cancel"), IsAdmin())
+async def cancel_broadcast(call: CallbackQuery, callback_data: tbroadcast.BroadcastCallback):
+    """Остановка идущей рассылки"""
+    broadcast = await Broadcast.get(_id=ObjectId(callback_data.broadcast_id))
+    if not broadcast or not await broadcaster.cancel(broadcast):
+        await call.answer("Рассылка уже завершена", show_alert=True)
+        return
+
+    broadcast = await Broadcast.get(_id=broadcast.id)
+    logger.info("Broadcast cancelled", extra={"admin_id": call.from_user.id, "sent": broadcast.sent})
+    await call.message.edit_text(text=tbroadcast.broadcast_status_text(broadcast), parse_mode="HTML")
+    await call.answer("Рассылка остановлена")
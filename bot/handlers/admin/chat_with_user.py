@@ -11,6 +11,7 @@ from core.bot import bot, bot_config
 from db.beanie.models.models import MOSCOW_TZ
 from utils.konsol_client import konsol_client
 from utils.pending_storage import pending_actions
+from core.logger import bot_logger as logger
 router = Router()
 
 
@@ -62,7 +63,7 @@ async def send_message_to_user(user_id: int, claim_id: str, text: str):
         )
         return True
     except Exception as e:
-        print(f"Ошибка отправки пользователю {user_id}: {e}")
+        logger.warning("Message to user failed: %s", e, extra={"user_id": user_id})
         return False
 
 
@@ -157,7 +158,7 @@ async def handle_force_reply(msg: Message):
         del pending_actions[user_id]
         
     else:
-        print(f"🔍 Действие НЕ найдено для user_id: {user_id}")
+        logger.info("Pending action not found", extra={"user_id": user_id})
         await msg.answer("❌ Сессия устарела. Начните заново.")
 
 
@@ -246,7 +247,7 @@ async def process_user_to_admin_reply(msg: Message, action: dict):
                     reply_markup=admin_reply_ikb(claim_id)
                 )
             except Exception as e:
-                print(f"Ошибка отправки фото админу {admin_id}: {e}")
+                logger.warning("Photo to admin failed: %s", e, extra={"admin_id": admin_id})
 
         await msg.answer("✅ Фото отправлено администратору")
 
@@ -270,6 +271,6 @@ async def process_user_to_admin_reply(msg: Message, action: dict):
                     reply_markup=admin_reply_ikb(claim_id)
                 )
             except Exception as e:
-                print(f"Ошибка уведомления админа {admin_id}: {e}")
+                logger.warning("Admin notification failed: %s", e, extra={"admin_id": admin_id})
 
         await msg.answer("✅ Ваш ответ отправлен администратору")
@@ -8,8 +8,12 @@ from aiogram.types import CallbackQuery, Message, ForceReply
 from bot.templates.admin import menu as tadmin
 from bot.templates.admin.menu import AdminState
 from db.beanie.models import Claim, KonsolPayment, User
+from db.beanie.models.models import PAYOUT_JOB_ACTIVE_STATUSES
 from core.bot import bot
-from utils.konsol_client import konsol_client
+from utils.payout_queue import RESULT_LABELS, enqueue_payout
+from utils import rollup
+from core.logger import bot_logger as logger
+from core.tracing import claim_span
 
 router = Router()
 
@@ -77,18 +81,20 @@ async def receive_bank_id(msg: Message, state: FSMContext):
 async def handle_confirm_action(call: CallbackQuery):
     """Обработка кнопки '✅ Подтвердить оплату'"""
     claim_id = call.data.replace("confirm_", "")
-    print(f"✅ Подтверждение оплаты для заявки: {claim_id}")
+    logger.info("Claim approval requested", extra={"claim_id": claim_id, "admin_id": call.from_user.id})
 
-    await process_claim_approval(call, claim_id)
+    with claim_span("claim.approve", claim_id, **{"telegram.admin_id": call.from_user.id}):
+        await process_claim_approval(call, claim_id)
 
 # --- 4. Обработка отклонения ---
 @router.callback_query(F.data.startswith("reject_"))
 async def handle_reject_action(call: CallbackQuery):
     """Обработка кнопки '❌ Отклонить'"""
     claim_id = call.data.replace("reject_", "")
-    print(f"❌ Отклонение заявки: {claim_id}")
+    logger.info("Claim rejection requested", extra={"claim_id": claim_id, "admin_id": call.from_user.id})
 
-    await process_claim_rejection(call, claim_id)
+    with claim_span("claim.reject", claim_id, **{"telegram.admin_id": call.from_user.id}):
+        await process_claim_rejection(call, claim_id)
 
 @router.callback_query(F.data.startswith("ban_"))
 async def handle_ban_action(call: CallbackQuery):
@@ -116,7 +122,7 @@ async def process_user_ban(call: CallbackQuery, user_id: int, claim_id: str):
         await user.update(banned=True)
         await call.answer("Пользователь заблокирован", show_alert=True)
 
-        print(f"🚫 Пользователь заблокирован {user_id}")
+        logger.info("User banned", extra={"claim_id": claim_id, "user_id": user_id})
 
         if call.message.photo:
             current_caption = call.message.caption or ""
@@ -128,21 +134,22 @@ async def process_user_ban(call: CallbackQuery, user_id: int, claim_id: str):
             await call.message.edit_text(text=new_text, reply_markup=tadmin.claim_action_ikb(claim_id))
 
     except Exception as e:
-        print(f"❌ Ошибка блокировки пользователя: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("User ban failed", extra={"claim_id": claim_id, "user_id": user_id})
         await call.answer("Ошибка блокировки пользователя", show_alert=True)
 
 
 async def process_claim_approval(call: CallbackQuery, claim_id: str):
-    """Обработка подтверждения заявки: создание НОВОГО контрактора и платежа"""
+    """
+    Обработка подтверждения заявки: выплата ставится в очередь.
+    Контрактор и платёж в Konsol создаёт воркер (utils/payout_queue.py), он же обновит сообщение.
+    """
     try:
         claim = await Claim.get(claim_id=claim_id)
         if not claim:
             await call.answer("Заявка не найдена", show_alert=True)
             return
 
-        print(f"🔍 Найдена заявка: {claim.claim_id}, текущий статус: {claim.claim_status}")
+        logger.debug("Claim found", extra={"claim_id": claim.claim_id, "claim_status": claim.claim_status})
 
         # === Получаем пользователя ===
         user = await User.get(tg_id=claim.user_id)
@@ -150,131 +157,41 @@ async def process_claim_approval(call: CallbackQuery, claim_id: str):
             await call.answer("Пользователь не найден", show_alert=True)
             return
 
-        # === 1. Создаём НОВОГО contract_id в Konsol API ===
-        # Определяем телефон для contract_id
-        if claim.phone:
-            # Если СБП - используем реальный телефон из заявки
-            contractor_phone = claim.phone
-        else:
-            # Если карта - используем заглушку
-            contractor_phone = "+79000" + claim.claim_id
-
-        contractor_data = {
-            "kind": "individual",
-            "first_name": claim.claim_id,
-            "last_name": "Заявка",
-            "phone": contractor_phone
-        }
-
-        try:
-            contractor_result = await konsol_client.create_contractor(contractor_data)
-            contractor_id = contractor_result["id"]
-
-            # === Сохраняем contractor_id в ЗАЯВКЕ ===
-            await claim.update(contractor_id=contractor_id)
-
-            print(f"[CONTRACTOR] Новый contract_id создан для заявки {claim.claim_id}: {contractor_id}")
-
-        except Exception as e:
-            error_msg = f"[CONTRACTOR ERROR] Не удалось создать contract_id для заявки {claim.claim_id}: {e}"
-            print(error_msg)
-            await call.message.answer(error_msg)
-            await call.answer("Ошибка создания contract_id", show_alert=True)
-            return # Прерываем обработку, если contract_id не создан
-
-        # === 2. Подготавливаем данные для платежа ===
-        bank_details_kind = "fps" if claim.phone else "card"
-
-        if bank_details_kind == "fps":
-            if not claim.bank_member_id:
-                await call.answer("❌ Необходимо указать ID банка для СБП!", show_alert=True)
-                return
-            bank_details = {
-                "fps_mobile_phone": claim.phone,
-                "fps_bank_member_id": claim.bank_member_id
-            }
+        if claim.phone and not claim.bank_member_id:
+            await call.answer("❌ Необходимо указать ID банка для СБП!", show_alert=True)
+            return
+
+        # === Ставим выплату в очередь ===
+        is_photo = bool(call.message.photo)
+        current = (call.message.caption if is_photo else call.message.text) or ""
+        prefix = current[:-14]
+
+        job = await enqueue_payout(
+            claim,
+            admin_id=call.from_user.id,
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            message_is_photo=is_photo,
+            message_prefix=prefix
+        )
+        if job.status not in PAYOUT_JOB_ACTIVE_STATUSES:
+            # Выплата уже завершена или ждёт ручной проверки (manage.py payout-requeue --force)
+            await call.answer(RESULT_LABELS[job.status], show_alert=True)
+            return
+        logger.info("Payout queued", extra={"claim_id": claim.claim_id, "payout_status": job.status})
+
+        # === Обновляем сообщение в группе ===
+        # При повторе после ошибки в сообщении уже статус ошибки — берём исходный текст из задания
+        new_text = f"{job.message_prefix} {RESULT_LABELS['queued']}"
+        if is_photo:
+            await call.message.edit_caption(caption=new_text, reply_markup=None)
         else:
-            bank_details = {
-                "card_number": claim.card
-            }
-
-        payment_data = {
-            "contractor_id": contractor_id, # Используем НОВЫЙ contractor_id из заявки
-            "services_list": [
-                {
-                    "title": f"Выплата по заявке {claim.claim_id}",
-                    "amount": str(claim.amount)
-                }
-            ],
-            "bank_details_kind": bank_details_kind,
-            "bank_details": bank_details,
-            "purpose": "Выплата выигрыша",
-            "amount": str(claim.amount)
-        }
-
-        # === 3. Создаём платёж в Konsol API ===
-        try:
-            result = await konsol_client.create_payment(payment_data)
-            payment_id = result.get("id")
-            payment_status = result.get("status")
-
-            print(f"[PAYMENT] Платёж создан для заявки {claim.claim_id}: {payment_id}")
-
-            # === 4. Сохраняем платёж в БД ===
-            await KonsolPayment.create(
-                konsol_id=payment_id,
-                contractor_id=contractor_id, # НОВЫЙ contractor_id
-                amount=claim.amount,
-                status=payment_status,
-                purpose=payment_data["purpose"],
-                services_list=payment_data["services_list"],
-                bank_details_kind=bank_details_kind,
-                card_number=claim.card,
-                phone_number=claim.phone,
-                bank_member_id=claim.bank_member_id,
-                claim_id=claim.claim_id,
-                user_id=claim.user_id
-            )
-
-            # === 5. Обновляем статусы в заявке ===
-            await claim.update(
-                claim_status="confirm",
-                process_status="complete",
-                konsol_payment_id=payment_id,
-                updated_at=datetime.utcnow()
-            )
-
-            # === 6. Обновляем сообщение в группе ===
-            if call.message.photo:
-                current_caption = call.message.caption or ""
-                new_caption = f"{current_caption[:-14]} Подтверждено ✅"
-                await call.message.edit_caption(caption=new_caption, reply_markup=None)
-            else:
-                current_text = call.message.text or ""
-                new_text = f"{current_text[:-14]} Подтверждено ✅"
-                await call.message.edit_text(text=new_text, reply_markup=None)
-
-            # === 7. Уведомляем пользователя ===
-            try:
-                await bot.send_message(
-                    chat_id=claim.user_id,
-                    text="✅ Ваш выигрыш отправлен на указанные реквизиты. Компания Pure желает Вам крепкого здоровья, и хорошего дня."
-                )
-            except Exception as notify_e:
-                print(f"[NOTIFY ERROR] Не удалось уведомить пользователя {claim.user_id}: {notify_e}")
-
-            await call.answer("✅ Оплата подтверждена")
-
-        except Exception as pay_e:
-            error_msg = f"[PAYMENT ERROR] Ошибка создания платежа для заявки {claim.claim_id}: {pay_e}"
-            print(error_msg)
-            await call.message.answer(error_msg)
-            await call.answer("Ошибка создания платежа", show_alert=True)
+            await call.message.edit_text(text=new_text, reply_markup=None)
+
+        await call.answer("Выплата поставлена в очередь")
 
     except Exception as e:
-        print(f"❌ Ошибка подтверждения заявки {claim_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Claim approval failed", extra={"claim_id": claim_id})
         await call.answer("Ошибка подтверждения", show_alert=True)
 
 # --- 6. Логика отклонения ---
@@ -292,6 +209,7 @@ async def process_claim_rejection(call: CallbackQuery, claim_id: str):
             process_status="cancelled",
             updated_at=datetime.utcnow()
         )
+        await rollup.bump(claims_rejected=1)
 
         # Обновляем сообщение в группе
         if call.message.photo:
@@ -303,7 +221,7 @@ async def process_claim_rejection(call: CallbackQuery, claim_id: str):
             new_text = f"{current_text[:-14]} Отклонено ❌"
             await call.message.edit_text(text=new_text, reply_markup=None)
 
-        print(f"✏️ Сообщение обновлено (отклонено)")
+        logger.info("Claim rejected", extra={"claim_id": claim_id})
 
         # Уведомление пользователю если нужно
         # try:
@@ -317,5 +235,5 @@ async def process_claim_rejection(call: CallbackQuery, claim_id: str):
         await call.answer("❌ Заявка отклонена")
 
     except Exception as e:
-        print(f"❌ Ошибка отклонения заявки: {e}")
+        logger.exception("Claim rejection failed", extra={"claim_id": claim_id})
         await call.answer("❌ Ошибка отклонения", show_alert=True)
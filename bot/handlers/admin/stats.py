@@ -0,0 +1,29 @@
+from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery
+
+from bot.filters.admin import IsAdmin
+from bot.templates.admin import stats as tstats
+from bot.templates.admin.menu import AdminMenuCallback
+from utils.stats import stats_service
+
+router = Router()
+
+
+@router.message(Command("stats"), IsAdmin())
+async def show_stats(msg: Message):
+    """Статистика по заявкам и выплатам"""
+    stats = await stats_service.get()
+    await msg.answer(text=tstats.stats_text(stats), reply_markup=tstats.stats_ikb())
+
+
+@router.callback_query(AdminMenuCallback.filter(F.page == "stats"), IsAdmin())
+async def refresh_stats(call: CallbackQuery):
+    stats = await stats_service.get()
+    try:
+        await call.message.edit_text(text=tstats.stats_text(stats), reply_markup=tstats.stats_ikb())
+    except TelegramBadRequest:
+        # message is not modified
+        pass
+    await call.answer()
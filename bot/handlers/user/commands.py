@@ -12,14 +12,18 @@ from core.bot import bot, bot_config
 from db.beanie.models import User, Claim, AdminMessage
 from db.mysql.crud import get_and_delete_code
 from utils.check_subscribe import check_user_subscription
+from utils import rollup
+from core.tracing import claim_span
+from core.logger import bot_logger as logger
 from config import cnf
-from aiogram.types import FSInputFile
+from utils.media import static_media
+from utils.throttling import CODE_RULE, format_wait, throttler
 
 router = Router()
 user_locks = {}
 
 
-@router.message(Command("start"))
+@router.message(Command("start"), flags={"throttle": "start"})
 async def start_new_user(msg: Message, state: FSMContext):
     await state.clear()
 
@@ -38,12 +42,17 @@ async def start_new_user(msg: Message, state: FSMContext):
         )
     if user.banned:
         return
+    if user.blocked_bot:
+        # Пользователь снова пишет боту — рассылки до него доходят
+        await user.update(blocked_bot=False)
 
-    welcome_photo = FSInputFile("utils/IMG_1262.png")
     welcome_text = "Привет! Это бот компании Pure. Введите секретный код, указанный на голограмме."
 
-    await msg.answer_photo(
-        photo=welcome_photo,
+    # Картинка загружается в Telegram один раз, дальше отправляется по file_id
+    await static_media.send(
+        bot=msg.bot,
+        chat_id=msg.chat.id,
+        path="utils/IMG_1262.png",
         caption=welcome_text
     )
     await state.set_state(treg.RegState.waiting_for_code)
@@ -85,7 +94,7 @@ async def help_preserve_state(msg: Message, state: FSMContext):
         await state.set_state(current_state)
         await state.set_data(current_data)
 
-@router.message(StateFilter(treg.RegState.waiting_for_code))
+@router.message(StateFilter(treg.RegState.waiting_for_code), flags={"throttle": CODE_RULE})
 async def process_code(msg: Message, state: FSMContext):
     if not msg.text:
         await msg.answer(
@@ -96,8 +105,14 @@ async def process_code(msg: Message, state: FSMContext):
 
     code_valid = await get_and_delete_code(code)
     if not code_valid:
+        await rollup.bump(codes_rejected=1)
+        cooldown = await throttler.code_failed(msg.from_user.id)
+        if cooldown:
+            await msg.answer(text=treg.code_cooldown_text.format(wait=format_wait(cooldown)), reply_markup=tmenu.support_ikb())
+            return
         await msg.answer(text=treg.code_not_found_text, reply_markup=tmenu.support_ikb())
         return
+    await throttler.code_accepted(msg.from_user.id)
 
     # Отправляем сообщение о выигрыше
     await msg.answer(text=treg.code_found_text)
@@ -144,17 +159,19 @@ async def proceed_to_review(user_tg_id: int, state: FSMContext, code: str):
     claim_id = await Claim.generate_next_claim_id()
 
     # Создаём заявку с user_tg_id (гарантированно правильный ID)
-    await Claim.create(
-        claim_id=claim_id,
-        user_id=user_tg_id,
-        code=code,
-        code_status="valid",
-        process_status="process",
-        claim_status="pending",
-        payment_method="unknown",
-        review_text="",
-        photo_file_ids=[]
-    )
+    with claim_span("claim.create", claim_id, **{"telegram.user_id": user_tg_id}):
+        await Claim.create(
+            claim_id=claim_id,
+            user_id=user_tg_id,
+            code=code,
+            code_status="valid",
+            process_status="process",
+            claim_status="pending",
+            payment_method="unknown",
+            review_text="",
+            photo_file_ids=[]
+        )
+        await rollup.bump(claims_created=1)
 
     await state.update_data(claim_id=claim_id, entered_code=code)
     # Получаем chat_id для отправки сообщения (в личке = user_tg_id)
@@ -225,7 +242,7 @@ async def process_screenshot(msg: Message, state: FSMContext):
                 )
             except Exception as e:
                 if "message is not modified" not in str(e):
-                    print(f"Ошибка редактирования: {e}")
+                    logger.warning("Message edit failed: %s", e)
         else:
             sent_msg = await msg.answer(
                 text=new_text,
@@ -296,6 +313,12 @@ async def finalize_claim(user_tg_id: int, state: FSMContext):
         await bot.send_message(chat_id=user_tg_id, text="Ошибка: заявка не найдена.")
         return
 
+    with claim_span("claim.finalize", claim_id, **{"telegram.user_id": user_tg_id}):
+        await send_claim_to_managers(user_tg_id, state, data, claim_id)
+
+
+async def send_claim_to_managers(user_tg_id: int, state: FSMContext, data: dict, claim_id: str):
+    """Отправляет заявку в группу менеджеров и переводит её в статус process"""
     claim = await Claim.get(claim_id=claim_id)
     if not claim:
         await bot.send_message(chat_id=user_tg_id, text="Ошибка: заявка не найдена в базе.")
@@ -370,7 +393,7 @@ async def finalize_claim(user_tg_id: int, state: FSMContext):
                     reply_markup=keyboard  # Используем правильную клавиатуру
                 )
             except Exception as e:
-                print(f"Ошибка отправки медиагруппы: {e}")
+                logger.warning("Media group send failed: %s", e, extra={"claim_id": claim_id})
                 # Fallback: отправляем по одному
                 for i, fid in enumerate(photo_ids):
                     caption = f"{claim_text}\n\n📸 Скриншот {i + 1}/{len(photo_ids)}" if i == 0 else None
@@ -410,6 +433,7 @@ async def finalize_claim(user_tg_id: int, state: FSMContext):
 
     # === Обновляем заявку ===
     await claim.update(**update_data)
+    await rollup.bump(claims_finalized=1)
 
     # === Завершение ===
     await bot.send_message(chat_id=user_tg_id, text=treg.success_text)
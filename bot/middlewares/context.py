@@ -0,0 +1,25 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from core.logger import correlation_id
+
+
+class CorrelationMiddleware(BaseMiddleware):
+    """
+    Проставляет id апдейта во все записи лога, сделанные при его обработке.
+    Регистрируется как outer middleware на dp.update.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        token = correlation_id.set(f"upd-{event.update_id}" if isinstance(event, Update) else None)
+        try:
+            return await handler(event, data)
+        finally:
+            correlation_id.reset(token)
@@ -0,0 +1,77 @@
+import copy
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.types import TelegramObject
+
+
+class CachedFSMContext(FSMContext):
+    """
+    FSMContext на время одного апдейта: состояние берётся из raw_state, данные читаются из хранилища
+    не больше одного раза. Запись сразу уходит в хранилище (апдейты одного пользователя не изолированы,
+    отложенная запись затирала бы изменения параллельных апдейтов), но запись того же состояния
+    и тех же данных пропускается.
+    Данные читаются при первом обращении: хэндлер, который синхронизируется своей блокировкой
+    (process_screenshot), должен читать их уже под ней.
+    """
+
+    def __init__(self, storage: BaseStorage, key: StorageKey, state: Optional[str]):
+        super().__init__(storage=storage, key=key)
+        self._state = state
+        self._data: Optional[Dict[str, Any]] = None
+
+    async def _load_data(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = await self.storage.get_data(key=self.key)
+        return self._data
+
+    async def set_state(self, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        if state == self._state:
+            return
+        await super().set_state(state)
+        self._state = state
+
+    async def get_state(self) -> Optional[str]:
+        return self._state
+
+    async def set_data(self, data: Dict[str, Any]) -> None:
+        if self._data is not None and data == self._data:
+            return
+        await super().set_data(data)
+        self._data = copy.deepcopy(data)
+
+    async def get_data(self) -> Dict[str, Any]:
+        # Глубокая копия: хэндлеры меняют списки из данных на месте (photo_file_ids)
+        return copy.deepcopy(await self._load_data())
+
+    async def get_value(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        return copy.deepcopy((await self._load_data()).get(key, default))
+
+    async def update_data(self, data: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        await self.set_data({**await self.get_data(), **kwargs})
+        return await self.get_data()
+
+
+class FSMCacheMiddleware(BaseMiddleware):
+    """
+    Подменяет FSMContext апдейта на CachedFSMContext: состояние не перечитывается после
+    FSMContextMiddleware, данные читаются один раз, повторная запись без изменений не выполняется.
+    Регистрируется как outer middleware на dp.update — после FSMContextMiddleware диспетчера.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        state = data.get("state")
+        if state is not None and not isinstance(state, CachedFSMContext):
+            data["state"] = CachedFSMContext(state.storage, state.key, data.get("raw_state"))
+        return await handler(event, data)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject, Update
+
+from core.logger import bot_logger as logger
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Учёт обрабатываемых апдейтов для корректной остановки бота.
+    Регистрируется первым outer middleware на dp.update.
+
+    При остановке: новые апдейты не принимаются, текущие дорабатывают до дедлайна,
+    оставшиеся отменяются и попадают в лог.
+    """
+
+    def __init__(self):
+        self.accepting = True
+        self.tasks: Dict[asyncio.Task, Dict[str, Any]] = {}
+        self.last_update_id: Optional[int] = None
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        update_id = event.update_id if isinstance(event, Update) else None
+        if not self.accepting:
+            logger.info("Update rejected during shutdown", extra={"update_id": update_id})
+            return UNHANDLED
+
+        if update_id is not None and (self.last_update_id is None or update_id > self.last_update_id):
+            self.last_update_id = update_id
+
+        user = data.get("event_from_user")
+        task = asyncio.current_task()
+        self.tasks[task] = {
+            "update_id": update_id,
+            "user_id": user.id if user else None,
+            "event": event.event_type if isinstance(event, Update) else type(event).__name__,
+            "started": time.monotonic()
+        }
+        try:
+            return await handler(event, data)
+        finally:
+            self.tasks.pop(task, None)
+
+    async def drain(self, timeout: float) -> List[Dict[str, Any]]:
+        """
+        Перестаёт принимать апдейты и ждёт текущие до `timeout` секунд.
+
+        :return: Апдейты, которые пришлось прервать
+        """
+        self.accepting = False
+        if not self.tasks:
+            return []
+
+        logger.info(f"Waiting for {len(self.tasks)} in-flight updates (up to {timeout}s)")
+        _, pending = await asyncio.wait(list(self.tasks), timeout=timeout)
+
+        aborted = []
+        now = time.monotonic()
+        for task in pending:
+            info = dict(self.tasks.get(task) or {})
+            if info:
+                info["running_for"] = round(now - info.pop("started"), 1)
+                aborted.append(info)
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending, timeout=1)
+        return aborted
+
+
+# Глобальный экземпляр
+inflight = InFlightMiddleware()
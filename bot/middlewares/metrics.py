@@ -0,0 +1,48 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject
+
+from core.metrics import HANDLER_LATENCY, HANDLER_ERRORS, UPDATES_IN_PROGRESS
+from core.timing import current_timing
+
+
+def handler_labels(data: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Модуль и имя функции хэндлера, выбранного для события
+    """
+    handler_object: HandlerObject = data.get("handler")
+    callback = handler_object.callback if handler_object else None
+    return getattr(callback, "__module__", "unknown"), getattr(callback, "__name__", "unknown")
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Время и ошибки каждого хэндлера. Регистрируется как inner middleware
+    (dp.message.middleware / dp.callback_query.middleware), где уже известен хэндлер.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        router, name = handler_labels(data)
+
+        timing = current_timing.get()
+        if timing is not None:
+            timing.handler = f"{router}.{name}"
+
+        UPDATES_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(router, name).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(router, name).observe(time.perf_counter() - start)
+            UPDATES_IN_PROGRESS.dec()
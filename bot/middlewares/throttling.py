@@ -0,0 +1,72 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from bot.templates.user import reg as treg
+from config import cnf
+from core.logger import bot_logger as logger
+from core.metrics import THROTTLED_UPDATES
+from utils.throttling import format_wait, throttler
+
+DEFAULT_RULE = "default"
+
+
+def throttle_rule(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Правило для события: флаг хэндлера (flags={"throttle": "code"}, False — без ограничений),
+    иначе состояние FSM, если для него задано правило, иначе правило по умолчанию
+    """
+    flag = get_flag(data, "throttle")
+    if flag is False:
+        return None
+    if flag:
+        return flag
+    state = data.get("raw_state")
+    if state in cnf.throttle.RULES:
+        return state
+    return DEFAULT_RULE
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничивает частоту сообщений и нажатий кнопок от пользователей.
+    Регистрируется как inner middleware (dp.message.middleware / dp.callback_query.middleware),
+    где уже известны хэндлер и его флаги. Админы и группа менеджеров не ограничиваются.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        chat = data.get("event_chat")
+        if (
+                not cnf.throttle.ENABLED
+                or user is None
+                or user.id in (cnf.bot.ADMINS or [])
+                or (chat is not None and chat.id == cnf.bot.GROUP_ID)
+        ):
+            return await handler(event, data)
+
+        rule = throttle_rule(data)
+        if rule is None:
+            return await handler(event, data)
+
+        rejected = await throttler.check(rule, user.id)
+        if rejected is None:
+            return await handler(event, data)
+
+        scope, wait = rejected
+        THROTTLED_UPDATES.labels(rule, scope).inc()
+        logger.info("Update throttled", extra={"user_id": user.id, "rule": rule, "scope": scope})
+
+        text = (treg.code_cooldown_text if scope == "cooldown" else treg.throttled_text).format(wait=format_wait(wait))
+        if isinstance(event, CallbackQuery):
+            await event.answer(text)
+        elif isinstance(event, Message) and await throttler.notice_allowed(user.id):
+            await event.answer(text)
+        return None
@@ -0,0 +1,54 @@
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from config import cnf
+from core.logger import bot_logger as logger
+from core.timing import UpdateTiming, current_timing, track
+
+
+class UpdateTimingMiddleware(BaseMiddleware):
+    """
+    Время обработки апдейта целиком. Регистрируется как outer middleware на dp.update.
+    Если апдейт обрабатывался дольше BOT_SLOW_UPDATE_THRESHOLD, в лог пишется разбивка
+    по MongoDB / MySQL / Telegram / Konsol.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        timing = UpdateTiming(
+            update_id=event.update_id if isinstance(event, Update) else None,
+            user_id=user.id if user else None
+        )
+        token = current_timing.set(timing)
+        try:
+            return await handler(event, data)
+        finally:
+            current_timing.reset(token)
+            if timing.elapsed >= cnf.bot.SLOW_UPDATE_THRESHOLD:
+                logger.warning(f"Slow update: {json.dumps(timing.to_dict())}")
+
+
+class TelegramTimingMiddleware(BaseRequestMiddleware):
+    """
+    Время запросов к Telegram Bot API (bot.session.middleware)
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        with track("telegram"):
+            return await make_request(bot, method)
@@ -0,0 +1,32 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from opentelemetry.trace import SpanKind
+
+from bot.middlewares.metrics import handler_labels
+from core.tracing import span_attributes, tracer
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """
+    Спан на каждый вызов хэндлера. Регистрируется как inner middleware
+    (dp.message.middleware / dp.callback_query.middleware).
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        router, name = handler_labels(data)
+        user = data.get("event_from_user")
+        with tracer.start_as_current_span(
+            f"{router}.{name}",
+            kind=SpanKind.SERVER,
+            attributes=span_attributes(
+                **{"telegram.user_id": user.id if user else None, "telegram.event": type(event).__name__}
+            )
+        ):
+            return await handler(event, data)
@@ -0,0 +1,63 @@
+from typing import Optional
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from db.beanie.models import Broadcast
+
+broadcast_request_text = (
+    "📢 <b>Рассылка</b>\n\n"
+    "Отправьте сообщение, которое получат все пользователи (текст, фото, видео — как есть).\n"
+    "/cancel — отмена"
+)
+
+broadcast_cancelled_text = "Рассылка отменена"
+
+broadcast_status_labels = {
+    "running": "⏳ Идёт",
+    "done": "✅ Завершена",
+    "cancelled": "⛔️ Отменена"
+}
+
+
+class BroadcastCallback(CallbackData, prefix="broadcast"):
+    action: str  # "start", "abort", "cancel"
+    broadcast_id: Optional[str] = None
+
+
+def broadcast_confirm_text(recipients: int) -> str:
+    return f"☝️ Сообщение выше получат <b>{recipients}</b> пользователей. Начать рассылку?"
+
+
+def broadcast_status_text(broadcast: Broadcast) -> str:
+    """
+    Статус и статистика доставки рассылки
+    """
+    processed = broadcast.sent + broadcast.blocked + broadcast.failed
+    lines = [
+        f"📢 <b>Рассылка</b> — {broadcast_status_labels.get(broadcast.status, broadcast.status)}",
+        "",
+        f"• Обработано: {processed} из {broadcast.total}",
+        f"• Доставлено: {broadcast.sent}",
+        f"• Бот заблокирован: {broadcast.blocked}",
+        f"• Ошибки: {broadcast.failed}"
+    ]
+    if broadcast.finished_at:
+        seconds = (broadcast.finished_at - broadcast.created_at).total_seconds()
+        lines.append(f"• Длительность: {seconds / 60:.1f} мин")
+    return "\n".join(lines)
+
+
+def broadcast_confirm_ikb() -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="📢 Начать рассылку", callback_data=BroadcastCallback(action="start"))
+    builder.button(text="❌ Отмена", callback_data=BroadcastCallback(action="abort"))
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+def broadcast_cancel_ikb(broadcast_id: str) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="⛔️ Остановить рассылку", callback_data=BroadcastCallback(action="cancel", broadcast_id=broadcast_id))
+    return builder.as_markup()
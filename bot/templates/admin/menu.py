@@ -17,6 +17,7 @@ class AdminState(StatesGroup):
     waiting_message_to_user = State()
     waiting_reply_to_user = State()
     waiting_for_bank_id = State()
+    waiting_broadcast_message = State()
 
 def claim_action_ikb_with_bank_button(claim_id: str) -> InlineKeyboardMarkup:
     """
@@ -0,0 +1,67 @@
+from typing import Any, Dict
+
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from bot.templates.admin.menu import AdminMenuCallback
+
+claim_status_labels = {
+    "pending": "Не завершены пользователем",
+    "process": "Ожидают решения",
+    "confirm": "Подтверждены",
+    "cancelled": "Отклонены"
+}
+
+payout_kind_labels = {
+    "fps": "СБП",
+    "card": "Карта",
+    "bank_account": "Счёт"
+}
+
+
+def stats_text(stats: Dict[str, Any]) -> str:
+    """
+    Текст статистики для админ-панели
+    """
+    conversion = stats["conversion"]
+    latency = stats["approval_latency"]
+
+    lines = [f"📊 <b>Статистика с {stats['since']}</b>", "", "<b>Заявки:</b>"]
+    for status, label in claim_status_labels.items():
+        lines.append(f"• {label}: {stats['claims_by_status'].get(status, 0)}")
+
+    lines += ["", "<b>Конверсия:</b>", f"• Код введён: {conversion['created']}"]
+    if conversion["created"]:
+        lines += [
+            f"• Заявка оформлена: {conversion['finalized']} ({conversion['finalized_rate']:.0%})",
+            f"• Подтверждена: {conversion['approved']} ({conversion['approved_rate']:.0%})"
+        ]
+
+    if latency["count"]:
+        lines += [
+            "",
+            "<b>Время до подтверждения:</b>",
+            f"• Среднее: {latency['avg_seconds'] / 3600:.1f} ч",
+            f"• Максимальное: {latency['max_seconds'] / 3600:.1f} ч"
+        ]
+
+    lines += ["", "<b>Выплачено:</b>"]
+    if not stats["payouts"]:
+        lines.append("• Нет выплат")
+    for kind, payout in stats["payouts"].items():
+        lines.append(f"• {payout_kind_labels.get(kind, kind)}: {payout['count']} шт. на {payout['amount']} ₽")
+
+    lines += ["", "<b>По дням (код отклонён / создано / оформлено / подтверждено):</b>"]
+    for day in stats["rollups"][-7:]:
+        lines.append(
+            f"• {day['day']}: {day.get('codes_rejected', 0)} / {day.get('claims_created', 0)} / "
+            f"{day.get('claims_finalized', 0)} / {day.get('claims_approved', 0)}"
+        )
+
+    return "\n".join(lines)
+
+
+def stats_ikb() -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="🔄 Обновить", callback_data=AdminMenuCallback(page="stats"))
+    return builder.as_markup()
@@ -26,6 +26,10 @@ code_not_found_text = (
     "Если у вас возникли сложности, обратитесь в тех поддержку, мы будем рады Вам помочь."
 )
 
+code_cooldown_text = "⛔️ Слишком много неверных кодов. Попробуйте через {wait}"
+
+throttled_text = "⏳ Слишком много запросов. Попробуйте через {wait}"
+
 code_found_text = (
     "Поздравляем!\n"
     "Вы выиграли 100 рублей!\n"
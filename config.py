@@ -1,5 +1,6 @@
+import tempfile
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from aiogram.types import BotCommand
 from pydantic import field_validator
@@ -21,6 +22,8 @@ class BotConfig(BaseSettings):
     GROUP_ID: int
     CHANNEL_USERNAME: str
     SUPPORT: str
+    SLOW_UPDATE_THRESHOLD: float = 1.0  # секунды, после которых апдейт пишется в лог с разбивкой времени
+    SHUTDOWN_TIMEOUT: float = 20.0  # секунды на завершение текущих апдейтов при остановке
     COMMANDS: List[BotCommand] = [
         BotCommand(
             command='start',
@@ -32,6 +35,14 @@ class BotConfig(BaseSettings):
         BotCommand(
             command='admin',
             description='Админ-Панель'
+        ),
+        BotCommand(
+            command='stats',
+            description='Статистика'
+        ),
+        BotCommand(
+            command='broadcast',
+            description='Рассылка'
         )
     ]
 
@@ -49,10 +60,49 @@ class BotConfig(BaseSettings):
             raise ValueError('ADMINS value must be int,int,int')
 
 
+class ApiConfig(BaseSettings):
+    HOST: str = "0.0.0.0"
+    PORT: int = 9000
+    WORKERS: int = 1  # процессов uvicorn, у каждого свои пулы Mongo / Konsol и кэши
+    SHUTDOWN_TIMEOUT: int = 30  # секунды на завершение текущих запросов
+
+    # === Ключи API (manage.py api-key-create) ===
+    TOKEN: Optional[str] = None  # общий токен со всеми правами — для интеграций без своего ключа
+    KEY_CACHE_TTL: int = 60  # секунды, через которые отзыв ключа вступает в силу
+    KEY_CACHE_MAXSIZE: int = 10000
+    KEY_NEGATIVE_CACHE_MAXSIZE: int = 1000  # неизвестные ключи, отдельно от действующих
+
+    # === Лимит запросов на ключ в скользящем окне (по умолчанию, ключ может задать свой) ===
+    RATE_LIMIT: int = 600  # запросов за окно, 0 — без лимита
+    RATE_WINDOW: int = 60  # секунды
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | redis (общий лимит для всех воркеров и реплик)
+
+    class Config:
+        env_prefix = 'API_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
 class MongoConfig(BaseSettings):
     NAME: str
     PORT: int
     HOST: str
+    REPLICA_SET: Optional[str] = None  # нужен для чтения с secondary
+
+    # === Пул соединений (на процесс) ===
+    MAX_POOL_SIZE: int = 100
+    MIN_POOL_SIZE: int = 5  # держим прогретые соединения
+    MAX_IDLE_TIME_MS: Optional[int] = 300_000
+    SERVER_SELECTION_TIMEOUT_MS: int = 5_000  # вместо 30 с по умолчанию: недоступная база — быстрая ошибка
+    CONNECT_TIMEOUT_MS: int = 5_000
+
+    # === Сжатие трафика: первое из списка, которое поддерживает сервер ===
+    COMPRESSORS: str = "zstd,snappy"
+    ZLIB_COMPRESSION_LEVEL: int = 6  # если в COMPRESSORS указан zlib
+
+    # === Чтение: бот — с primary, листинги API, статистика и выгрузки — с secondary ===
+    READ_PREFERENCE: str = "primary"
+    ANALYTICS_READ_PREFERENCE: str = "secondaryPreferred"
 
     class Config:
         env_prefix = 'MONGO_'
@@ -61,7 +111,28 @@ class MongoConfig(BaseSettings):
 
     @property
     def URL(self) -> str:
-        return f"mongodb://{self.HOST}:{self.PORT}/{self.NAME}"
+        url = f"mongodb://{self.HOST}:{self.PORT}/{self.NAME}"
+        if self.REPLICA_SET:
+            url += f"?replicaSet={self.REPLICA_SET}"
+        return url
+
+
+class RedisConfig(BaseSettings):
+    NAME: int = 0
+    HOST: str = "localhost"
+    PORT: int = 6379
+    USER: Optional[str] = None
+    PASSWORD: Optional[str] = None
+
+    class Config:
+        env_prefix = 'REDIS_'
+        env_file = '.env'
+        extra = 'ignore'
+
+    @property
+    def URL(self) -> str:
+        auth = f"{self.USER or ''}:{self.PASSWORD}@" if self.PASSWORD else ""
+        return f"redis://{auth}{self.HOST}:{self.PORT}/{self.NAME}"
 
 
 class MysqlConfig(BaseSettings):
@@ -70,6 +141,9 @@ class MysqlConfig(BaseSettings):
     USER: str
     PASSWORD: str
     DATABASE: str
+    POOL_MIN_SIZE: int = 1
+    POOL_MAX_SIZE: int = 10
+    POOL_RECYCLE: int = 3600  # секунд, старше — соединение переоткрывается
 
     @property
     def URL(self) -> str:
@@ -84,6 +158,27 @@ class KonsolConfig(BaseSettings):
     TOKEN: str
     BASE_URL: str = "https://swagger-payments.konsol.pro"
     TIMEOUT: int = 30
+    POOL_SIZE: int = 100  # соединений в пуле общей сессии
+
+    # === Webhook уведомления о статусах платежей ===
+    WEBHOOK_SECRET: Optional[str] = None  # HMAC-SHA256 ключ подписи тела запроса
+    WEBHOOK_SIGNATURE_HEADER: str = "X-Konsol-Signature"
+    STATUS_FRESHNESS: int = 300  # секунды, в течение которых статус из БД считается актуальным
+
+    # === Кэш ответов GET /konsol/payments/{konsol_id} ===
+    CACHE_TTL_PENDING: int = 10  # секунды для незавершённых платежей, конечные кэшируются бессрочно
+    CACHE_MAXSIZE: int = 10000
+
+    # === POST /konsol/payments/status:batch ===
+    STATUS_BATCH_MAX_IDS: int = 200
+    STATUS_BATCH_CONCURRENCY: int = 10
+
+    # === Фоновая сверка статусов платежей (страховка на случай потерянных webhook) ===
+    RECONCILE_ENABLED: bool = True
+    RECONCILE_MIN_INTERVAL: int = 300  # секунды
+    RECONCILE_MAX_INTERVAL: int = 3600  # секунды
+    RECONCILE_CONCURRENCY: int = 5
+    RECONCILE_BATCH_SIZE: int = 100
 
     class Config:
         env_prefix = 'KONSOL_'
@@ -91,12 +186,138 @@ class KonsolConfig(BaseSettings):
         extra = 'ignore'
 
 
+class PayoutConfig(BaseSettings):
+    WORKERS: int = 3  # параллельных заданий на выплату
+    POLL_INTERVAL: float = 2.0  # секунды между проверками очереди
+    VISIBILITY_TIMEOUT: int = 180  # секунды аренды задания; после — задание снова доступно
+    MAX_ATTEMPTS: int = 5
+    RETRY_BACKOFF: int = 10  # секунды, удваиваются с каждой попыткой
+
+    class Config:
+        env_prefix = 'PAYOUT_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
+class StatsConfig(BaseSettings):
+    CACHE_TTL: int = 60  # секунды между пересчётами
+    REFRESH_DAYS: int = 7  # сколько последних дней пересчитывать (статусы старых заявок ещё меняются)
+    HISTORY_DAYS: int = 30  # глубина статистики по умолчанию
+
+    class Config:
+        env_prefix = 'STATS_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
+class RetentionConfig(BaseSettings):
+    ENABLED: bool = True
+    ABANDONED_CLAIM_DAYS: int = 14  # брошенные заявки (не дошли до отправки менеджерам) удаляются TTL индексом, 0 — хранить
+    ARCHIVE_AFTER_DAYS: int = 180  # завершённые заявки, переписка и платежи переносятся в архив, 0 — не переносить
+    ARCHIVE_COMPRESSOR: str = "zstd"  # block_compressor архивных коллекций: zstd | zlib | snappy
+    BATCH_SIZE: int = 500
+    INTERVAL: int = 6 * 3600  # секунды между проходами архивации
+
+    class Config:
+        env_prefix = 'RETENTION_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
+class BroadcastConfig(BaseSettings):
+    RATE: float = 25.0  # сообщений в секунду (лимит Telegram — около 30)
+    CONCURRENCY: int = 10  # одновременных запросов к Bot API
+    BATCH_SIZE: int = 200  # пользователей между сохранениями прогресса
+    PROGRESS_INTERVAL: int = 15  # секунды между обновлениями статуса у админа
+    MAX_RETRIES: int = 3  # повторов после retry_after и сетевых ошибок
+
+    class Config:
+        env_prefix = 'BROADCAST_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
+class ThrottleConfig(BaseSettings):
+    ENABLED: bool = True
+    BACKEND: str = "memory"  # memory | redis (общие лимиты для нескольких реплик бота)
+
+    # === Token bucket: (токенов в секунду, ёмкость) ===
+    USER_LIMIT: Tuple[float, int] = (1.0, 5)  # на пользователя, для хэндлеров без своего правила
+    GLOBAL_LIMIT: Tuple[float, int] = (100.0, 200)  # на все обращения к хэндлерам одного правила
+    # Правила по флагу хэндлера (flags={"throttle": "code"}) или по состоянию FSM ("RegState:waiting_for_code")
+    RULES: Dict[str, Tuple[float, int]] = {
+        "start": (0.2, 3),
+        "code": (0.2, 3),
+        "RegState:waiting_for_screenshot": (1.0, 10),  # альбом до 10 фото
+    }
+
+    # === Нарастающая блокировка за неверные коды ===
+    CODE_FAILURES: int = 3  # неверных кодов подряд до первой блокировки
+    CODE_COOLDOWN: int = 60  # секунды первой блокировки, каждая следующая вдвое дольше
+    CODE_COOLDOWN_MAX: int = 24 * 3600
+    CODE_FAILURES_TTL: int = 24 * 3600  # секунды, через которые счётчик неверных кодов сбрасывается
+
+    class Config:
+        env_prefix = 'THROTTLE_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
+class MetricsConfig(BaseSettings):
+    ENABLED: bool = True
+    BOT_PORT: int = 9100  # HTTP сервер /metrics в процессе бота
+    # Файлы метрик воркеров API при API_WORKERS > 1 (prometheus_client multiprocess)
+    MULTIPROC_DIR: Path = Path(tempfile.gettempdir()) / 'techwizards-metrics'
+
+    class Config:
+        env_prefix = 'METRICS_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
+class LogConfig(BaseSettings):
+    LEVEL: str = "INFO"
+    JSON: bool = True  # JSON строки вместо текстового формата
+    DIR: Path = Path(__file__).parent / 'logs'
+    FILE: Optional[str] = "app.log"  # пусто — только stderr
+    FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    FILE_BACKUP_COUNT: int = 5
+    INFO_SAMPLE_RATE: float = 1.0  # доля INFO записей, которые попадают в лог (WARNING и выше — всегда)
+
+    class Config:
+        env_prefix = 'LOG_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
+class TracingConfig(BaseSettings):
+    ENABLED: bool = False
+    EXPORTER: str = "file"  # file | otlp | console
+    OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    FILE: Path = Path(__file__).parent / 'logs' / 'traces.jsonl'
+
+    class Config:
+        env_prefix = 'TRACING_'
+        env_file = '.env'
+        extra = 'ignore'
+
+
 class Config:
     mongo = MongoConfig()
     bot = BotConfig()
+    api = ApiConfig()
     proj = ProjConfig()
     mysql = MysqlConfig()
+    redis = RedisConfig()
     konsol = KonsolConfig()
+    stats = StatsConfig()
+    payout = PayoutConfig()
+    throttle = ThrottleConfig()
+    broadcast = BroadcastConfig()
+    retention = RetentionConfig()
+    metrics = MetricsConfig()
+    log = LogConfig()
+    tracing = TracingConfig()
 
 
 cnf = Config()
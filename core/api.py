@@ -1,25 +1,121 @@
+import os
+import uuid
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from beanie import init_beanie
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
-from core.logger import api_logger as logger
+from opentelemetry.trace import SpanKind
+
+from api.router.claim import router as claim
+from api.router.export import router as export
+from api.router.health import router as health
+from api.router.konsol import router as konsol
+from api.router.metrics import router as metrics
+from api.router.stats import router as stats
+from api.router.user import router as user
+from config import cnf
+from core.logger import api_logger as logger, correlation_id, start_listener
+from core.metrics import mark_process_dead
+from core.mongo import client as mongo_client
+from core.tracing import setup_tracing, shutdown_tracing, tracer
+from db.beanie.models import document_models
+from utils.konsol_client import konsol_client
+from utils.serialization import ORJSONResponse
+from utils.stats import stats_service
+
+# Отвечают и до готовности — для проб оркестратора
+HEALTH_PATHS = ("/health/live", "/health/ready")
+
+
+async def warm_up() -> None:
+    """
+    Прогрев до приёма запросов: выбор сервера Mongo (пул добирает MONGO_MIN_POOL_SIZE соединений в фоне),
+    сессия Konsol, кэш статистики. Без статистики воркер всё равно запускается.
+    """
+    await mongo_client.admin.command("ping")
+    konsol_client.start()
+    try:
+        await stats_service.get()
+    except Exception as e:
+        logger.warning(f"Stats warm-up failed: {e}")
 
 
 @asynccontextmanager
 async def fastapi_lifespan(app: FastAPI) -> None:
     """
-        Init project
+        Init project: выполняется в каждом воркере до приёма запросов
     :param app: FastAPI
     :return:
     """
-    logger.info('=== App started ===')
+    start_listener()
+    setup_tracing("api")
+    await init_beanie(
+        database=mongo_client[cnf.mongo.NAME],
+        document_models=document_models
+    )
+    await warm_up()
+    app.state.ready = True
+    logger.info('=== App started ===', extra={"pid": os.getpid()})
 
     yield
 
-    logger.info('=== App stopped ===')
+    app.state.ready = False
+    await konsol_client.close()
+    mongo_client.close()
+    shutdown_tracing()
+    mark_process_dead()
+    logger.info('=== App stopped ===', extra={"pid": os.getpid()})
 
 
 app = FastAPI(
     title="api",
-    lifespan=fastapi_lifespan
+    lifespan=fastapi_lifespan,
+    default_response_class=ORJSONResponse
 )
+app.state.ready = False
+
+app.include_router(router=user)
+app.include_router(router=konsol)
+app.include_router(router=claim)
+app.include_router(router=export)
+app.include_router(router=stats)
+app.include_router(router=metrics)
+app.include_router(router=health)
+
+
+@app.middleware("http")
+async def readiness_middleware(request: Request, call_next):
+    """
+    До окончания прогрева и после начала остановки запросы отклоняются с 503,
+    балансировщик переключает их на готовые воркеры
+    """
+    if not app.state.ready and request.url.path not in HEALTH_PATHS:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service is not ready"},
+            headers={"Retry-After": "1"}
+        )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def correlation_middleware(request: Request, call_next):
+    """
+    Id запроса из X-Request-ID (или новый) — во все записи лога и в ответ
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = correlation_id.set(request_id)
+    try:
+        with tracer.start_as_current_span(
+            f"{request.method} {request.url.path}",
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": request.method, "url.path": request.url.path, "request.id": request_id}
+        ) as span:
+            response = await call_next(request)
+            span.set_attribute("http.response.status_code", response.status_code)
+    finally:
+        correlation_id.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
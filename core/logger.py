@@ -1,14 +1,84 @@
-import logging
-from logging import Logger, getLogger, Formatter, StreamHandler, INFO
+import atexit
+import copy
+import json
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging import Handler, Logger, LogRecord, getLogger, Filter, Formatter, StreamHandler, INFO, WARNING
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from typing import List, Optional
 
+from config import cnf
 
-def setting_logger(logger: Logger) -> Logger:
+# Идентификатор апдейта бота / HTTP запроса API, попадает в каждую запись лога
+correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+# Стандартные атрибуты LogRecord — всё остальное считается полями из extra
+_RECORD_ATTRS = set(vars(LogRecord("", 0, "", 0, "", None, None))) | {"message", "correlation_id", "sample"}
+
+
+class JsonFormatter(Formatter):
     """
-        Setting logger. Add handlers formatter etc.
-    :param logger: Logger
+    Одна запись — одна строка JSON
+    """
+
+    def format(self, record: LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(Filter):
+    """
+    Пропускает только часть INFO/DEBUG записей. WARNING и выше проходят всегда,
+    как и записи с extra={"sample": False}.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: LogRecord) -> bool:
+        if self.rate >= 1 or record.levelno >= WARNING or getattr(record, "sample", True) is False:
+            return True
+        return random.random() < self.rate
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Кладёт запись в очередь, не форматируя её: форматирование и запись в поток / файл
+    выполняются в потоке QueueListener и не блокируют event loop.
+    """
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        record = copy.copy(record)
+        record.correlation_id = correlation_id.get()
+        # Аргументы и исключение приводим к строкам здесь — объекты могут измениться до записи
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def create_handlers(log_file: bool) -> List[Handler]:
+    """
+    Обработчики фонового потока: stderr и, если log_file, файл в logs/
     """
-    # Create formatter
-    formatter = Formatter(
+    formatter = JsonFormatter() if cnf.log.JSON else Formatter(
         datefmt='%Y-%m-%d %H:%M:%S',
         fmt="%(levelname)s - %(asctime)s - %(name)s - (Line: %(lineno)d) - [%(filename)s]: %(message)s"
     )
@@ -17,12 +87,62 @@ def setting_logger(logger: Logger) -> Logger:
     stream_handler = StreamHandler(
         # stream=sys.stdout
     )
-    stream_handler.setFormatter(formatter)
+    handlers = [stream_handler]
 
-    # Add handlers to logger
-    logger.handlers = [stream_handler]
+    if log_file and cnf.log.FILE:
+        cnf.log.DIR.mkdir(parents=True, exist_ok=True)
+        handlers.append(RotatingFileHandler(
+            filename=cnf.log.DIR / cnf.log.FILE,
+            maxBytes=cnf.log.FILE_MAX_BYTES,
+            backupCount=cnf.log.FILE_BACKUP_COUNT,
+            encoding="utf-8"
+        ))
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    return handlers
+
+
+log_queue: SimpleQueue = SimpleQueue()
+queue_handler = ContextQueueHandler(log_queue)
+queue_handler.addFilter(SamplingFilter(cnf.log.INFO_SAMPLE_RATE))
+
+listener: Optional[QueueListener] = None
+
+
+def start_listener(log_file: bool = True) -> None:
+    """
+    (Пере)запускает фоновый поток, который пишет записи из очереди. При импорте модуля
+    он пишет только в stderr — файл в logs/ подключают точки входа бота и API
+    """
+    global listener
+    stop_listener()
+    listener = QueueListener(log_queue, *create_handlers(log_file), respect_handler_level=True)
+    listener.start()
+
+
+@atexit.register
+def stop_listener() -> None:
+    """
+    Дописывает оставшиеся в очереди записи при завершении процесса
+    """
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+start_listener(log_file=False)
+
+
+def setting_logger(logger: Logger) -> Logger:
+    """
+        Setting logger. All records go through the shared queue handler.
+    :param logger: Logger
+    """
+    logger.handlers = [queue_handler]
+    logger.propagate = False
 
-    logger.setLevel(INFO)
+    logger.setLevel(cnf.log.LEVEL)
 
     return logger
 
@@ -35,4 +155,7 @@ api_logger = setting_logger(
     logger=getLogger('api')
 )
 
-logging.basicConfig(level=INFO)
+# Логи библиотек (aiogram и др.) идут через ту же очередь
+root_logger = getLogger()
+root_logger.handlers = [queue_handler]
+root_logger.setLevel(INFO)
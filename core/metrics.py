@@ -0,0 +1,200 @@
+import os
+import re
+from typing import Dict, Iterable, List
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from prometheus_client.registry import Collector
+from pymongo import monitoring
+
+from core.timing import record
+
+# === Bot handlers ===
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds",
+    "Handler execution time",
+    ["router", "handler"]
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total",
+    "Handler exceptions",
+    ["router", "handler"]
+)
+UPDATES_IN_PROGRESS = Gauge(
+    "bot_updates_in_progress",
+    "Updates currently being handled"
+)
+THROTTLED_UPDATES = Counter(
+    "bot_throttled_updates_total",
+    "Updates rejected by throttling",
+    ["rule", "scope"]
+)
+
+BROADCAST_MESSAGES = Counter(
+    "bot_broadcast_messages_total",
+    "Broadcast deliveries by result",
+    ["result"]
+)
+
+# === API ===
+API_REJECTED_REQUESTS = Counter(
+    "api_rejected_requests_total",
+    "API requests rejected by key check",
+    ["reason", "scope"]
+)
+
+# === Databases ===
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command time",
+    ["command", "status"],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+)
+MYSQL_LATENCY = Histogram(
+    "mysql_query_duration_seconds",
+    "MySQL query time",
+    ["query"],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+)
+
+# === Konsol API ===
+KONSOL_LATENCY = Histogram(
+    "konsol_request_duration_seconds",
+    "konsol.pro request time",
+    ["method", "endpoint"]
+)
+KONSOL_RESPONSES = Counter(
+    "konsol_responses_total",
+    "konsol.pro responses by status code",
+    ["method", "endpoint", "status"]
+)
+
+# === Queues ===
+QUEUE_DEPTH = Gauge(
+    "queue_depth",
+    "Items waiting in internal queues",
+    ["queue"]
+)
+
+# Несколько воркеров API: значения пишутся в файлы, /metrics собирает их со всех процессов
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+_ID_SEGMENT = re.compile(r"/(?:\d+|[0-9a-fA-F-]{16,})(?=/|$)")
+
+
+def endpoint_label(endpoint: str) -> str:
+    """
+    Убирает ID из пути, чтобы не плодить метки: /api/v1/payments/123 -> /api/v1/payments/{id}
+    """
+    return _ID_SEGMENT.sub("/{id}", endpoint.split("?", 1)[0])
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Время каждой команды Mongo. Подключается к клиенту через event_listeners.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        MONGO_LATENCY.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+        record("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        MONGO_LATENCY.labels(event.command_name, "failed").observe(event.duration_micros / 1e6)
+        record("mongo", event.duration_micros / 1e6)
+
+
+mongo_metrics_listener = MongoCommandMetrics()
+
+
+class FSMStateCollector(Collector):
+    """
+    Количество пользователей в каждом состоянии FSM (для MemoryStorage)
+    """
+
+    def __init__(self):
+        self.storages: List = []
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        metric = GaugeMetricFamily("bot_fsm_states", "Users per FSM state", labels=["state"])
+        counts: Dict[str, int] = {}
+        for storage in self.storages:
+            for record in list(getattr(storage, "storage", {}).values()):
+                if record.state:
+                    counts[record.state] = counts.get(record.state, 0) + 1
+        for state, count in counts.items():
+            metric.add_metric([state], count)
+        yield metric
+
+
+class CacheCollector(Collector):
+    """
+    Счётчики попаданий/промахов AsyncTTLCache
+    """
+
+    def __init__(self):
+        self.caches: List = []
+
+    def collect(self) -> Iterable[CounterMetricFamily]:
+        requests = CounterMetricFamily("cache_requests", "Cache lookups by result", labels=["cache", "result"])
+        size = GaugeMetricFamily("cache_size", "Cached entries", labels=["cache"])
+        for cache in self.caches:
+            requests.add_metric([cache.name, "hit"], cache.hits)
+            requests.add_metric([cache.name, "miss"], cache.misses)
+            requests.add_metric([cache.name, "coalesced"], cache.coalesced)
+            size.add_metric([cache.name], len(cache))
+        yield requests
+        yield size
+
+
+fsm_state_collector = FSMStateCollector()
+cache_collector = CacheCollector()
+REGISTRY.register(fsm_state_collector)
+REGISTRY.register(cache_collector)
+
+
+def register_fsm_storage(storage) -> None:
+    """
+    Добавляет хранилище FSM в метрику bot_fsm_states
+    """
+    fsm_state_collector.storages.append(storage)
+
+
+def register_cache(cache) -> None:
+    """
+    Добавляет кэш в метрики cache_requests / cache_size
+    """
+    cache_collector.caches.append(cache)
+
+
+def register_queue(name: str, depth) -> None:
+    """
+    Глубина очереди считается при каждом scrape
+
+    :param name: Метка queue
+    :param depth: Функция без аргументов, возвращающая количество элементов
+    """
+    QUEUE_DEPTH.labels(name).set_function(depth)
+
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Реестр для /metrics. В режиме multiprocess — сумма по всем воркерам; cache_* и другие
+    метрики, которые считаются при scrape, в этом режиме не отдаются
+    """
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_process_dead() -> None:
+    """
+    Убирает файлы live-метрик завершившегося воркера
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
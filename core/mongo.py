@@ -1,6 +1,65 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from typing import Optional, Type, Union
+
+from beanie import Document
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 
 from config import cnf
+from core.metrics import mongo_metrics_listener
+
+ReadPreference = Union[Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest]
+
+READ_PREFERENCES = {
+    "primary": Primary(),
+    "primaryPreferred": PrimaryPreferred(),
+    "secondary": Secondary(),
+    "secondaryPreferred": SecondaryPreferred(),
+    "nearest": Nearest(),
+}
+
+
+def read_preference(name: str) -> ReadPreference:
+    """
+    Read preference по имени из конфига (primary, secondaryPreferred, ...)
+    """
+    try:
+        return READ_PREFERENCES[name]
+    except KeyError:
+        raise ValueError(f"Unknown Mongo read preference {name!r}, expected one of {', '.join(READ_PREFERENCES)}")
+
+
+def create_client(url: Optional[str] = None, appname: Optional[str] = None) -> AsyncIOMotorClient:
+    """
+    Клиент MongoDB с настройками пула, сжатия и таймаутов из MONGO_*.
+    Соединения открываются при первом запросе.
+
+    :param url: Адрес вместо MONGO_* (нагрузочный тест, бенчмарки)
+    :param appname: Имя приложения в логах и currentOp сервера
+    """
+    return AsyncIOMotorClient(
+        url or cnf.mongo.URL,
+        appname=appname,
+        maxPoolSize=cnf.mongo.MAX_POOL_SIZE,
+        minPoolSize=cnf.mongo.MIN_POOL_SIZE,
+        maxIdleTimeMS=cnf.mongo.MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=cnf.mongo.SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=cnf.mongo.CONNECT_TIMEOUT_MS,
+        compressors=cnf.mongo.COMPRESSORS or None,
+        zlibCompressionLevel=cnf.mongo.ZLIB_COMPRESSION_LEVEL,
+        read_preference=read_preference(cnf.mongo.READ_PREFERENCE),
+        event_listeners=[mongo_metrics_listener]
+    )
+
+
+def analytics_collection(model: Type[Document]) -> AsyncIOMotorCollection:
+    """
+    Коллекция модели с MONGO_ANALYTICS_READ_PREFERENCE — для листингов API, статистики и выгрузок,
+    которым не нужны только что записанные данные
+    """
+    return model.get_motor_collection().with_options(
+        read_preference=read_preference(cnf.mongo.ANALYTICS_READ_PREFERENCE)
+    )
 
 
-client: AsyncIOMotorClient = AsyncIOMotorClient(cnf.mongo.URL)
\ No newline at end of file
+# Общий клиент процесса
+client: AsyncIOMotorClient = create_client()
@@ -0,0 +1,72 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+# Категории времени, на которые раскладывается обработка апдейта
+CATEGORIES = ("mongo", "mysql", "telegram", "konsol")
+
+
+class UpdateTiming:
+    """
+    Время обработки одного апдейта с разбивкой по внешним вызовам
+    """
+
+    def __init__(self, update_id: Optional[int] = None, user_id: Optional[int] = None):
+        self.update_id = update_id
+        self.user_id = user_id
+        self.handler: Optional[str] = None
+        self.started = time.perf_counter()
+        self.spent: Dict[str, float] = {category: 0.0 for category in CATEGORIES}
+        self.calls: Dict[str, int] = {category: 0 for category in CATEGORIES}
+
+    def add(self, category: str, seconds: float) -> None:
+        self.spent[category] = self.spent.get(category, 0.0) + seconds
+        self.calls[category] = self.calls.get(category, 0) + 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        external = sum(self.spent.values())
+        return {
+            "update_id": self.update_id,
+            "user_id": self.user_id,
+            "handler": self.handler,
+            "total_ms": round(elapsed * 1000, 1),
+            # Всё, что не ушло на внешние вызовы: код хэндлеров, ожидание event loop
+            "other_ms": round(max(elapsed - external, 0) * 1000, 1),
+            **{f"{category}_ms": round(seconds * 1000, 1) for category, seconds in self.spent.items()},
+            **{f"{category}_calls": count for category, count in self.calls.items()}
+        }
+
+
+current_timing: ContextVar[Optional[UpdateTiming]] = ContextVar("current_timing", default=None)
+
+
+def record(category: str, seconds: float) -> None:
+    """
+    Добавляет время к текущему апдейту, если он есть.
+    Безопасно вызывать из потоков motor: контекст копируется в executor.
+    """
+    timing = current_timing.get()
+    if timing is not None:
+        timing.add(category, seconds)
+
+
+@contextmanager
+def track(category: str) -> Iterator[None]:
+    """
+    Засекает блок и относит его время к категории текущего апдейта
+
+    Пример:
+        with track("konsol"):
+            await session.request(...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(category, time.perf_counter() - start)
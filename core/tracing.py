@@ -0,0 +1,118 @@
+import hashlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+)
+from opentelemetry.trace import Link, NonRecordingSpan, Span, SpanContext, TraceFlags
+
+from config import cnf
+from core.logger import bot_logger as logger
+
+# Пока setup_tracing не вызван, трейсер no-op и спаны ничего не стоят
+tracer = trace.get_tracer("techwizards")
+
+_provider: Optional[TracerProvider] = None
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Спаны строками JSON в файл — для разбора без коллектора
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        with open(self.path, "a", encoding="utf-8") as file:
+            for span in spans:
+                file.write(span.to_json(indent=None) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def create_exporter() -> SpanExporter:
+    if cnf.tracing.EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=cnf.tracing.OTLP_ENDPOINT)
+    if cnf.tracing.EXPORTER == "console":
+        return ConsoleSpanExporter()
+    cnf.tracing.FILE.parent.mkdir(parents=True, exist_ok=True)
+    return FileSpanExporter(cnf.tracing.FILE)
+
+
+def setup_tracing(service_name: str) -> None:
+    """
+    Включает экспорт спанов для процесса (bot / api). Без TRACING_ENABLED ничего не делает.
+    """
+    global _provider
+    if not cnf.tracing.ENABLED or _provider is not None:
+        return
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    _provider.add_span_processor(BatchSpanProcessor(create_exporter()))
+    trace.set_tracer_provider(_provider)
+    logger.info(f"✅ Трассировка включена: {cnf.tracing.EXPORTER}")
+
+
+def shutdown_tracing() -> None:
+    """
+    Отправляет накопленные спаны
+    """
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def claim_context(claim_id: str) -> Context:
+    """
+    Контекст трейса заявки. trace_id выводится из номера заявки, поэтому спаны бота,
+    менеджерской группы, API и webhook Konsol попадают в один трейс без передачи заголовков.
+    """
+    digest = hashlib.sha256(f"claim:{claim_id}".encode()).digest()
+    parent = SpanContext(
+        trace_id=int.from_bytes(digest[:16], "big"),
+        span_id=int.from_bytes(digest[16:24], "big"),
+        is_remote=True,
+        trace_flags=TraceFlags(TraceFlags.SAMPLED)
+    )
+    return trace.set_span_in_context(NonRecordingSpan(parent))
+
+
+@contextmanager
+def claim_span(name: str, claim_id: Optional[str], **attributes: Any) -> Iterator[Span]:
+    """
+    Спан этапа жизни заявки. Текущий спан (хэндлер, HTTP запрос) добавляется ссылкой.
+
+    Пример:
+        with claim_span("claim.approve", claim_id, admin_id=call.from_user.id):
+            ...
+    """
+    attributes = span_attributes(**attributes)
+    if not claim_id:
+        with tracer.start_as_current_span(name, attributes=attributes) as span:
+            yield span
+        return
+
+    current = trace.get_current_span().get_span_context()
+    links = [Link(current)] if current.is_valid else None
+    with tracer.start_as_current_span(
+        name,
+        context=claim_context(claim_id),
+        links=links,
+        attributes={"claim.id": claim_id, **attributes}
+    ) as span:
+        yield span
+
+
+def span_attributes(**attributes: Any) -> Dict[str, Any]:
+    """
+    Атрибуты без None — OpenTelemetry их не принимает
+    """
+    return {key: value for key, value in attributes.items() if value is not None}
@@ -1,3 +1,3 @@
-from .models import User, AdminMessage, Claim, KonsolPayment
+from .models import User, AdminMessage, Claim, KonsolPayment, KonsolWebhookEvent, DailyStats, MediaFile, PayoutJob, Broadcast, ApiKey
 
-document_models = [User, Claim, AdminMessage, KonsolPayment]
+document_models = [User, Claim, AdminMessage, KonsolPayment, KonsolWebhookEvent, DailyStats, MediaFile, PayoutJob, Broadcast, ApiKey]
@@ -2,12 +2,33 @@ import pytz
 from typing import List, Dict, Any, Union
 from datetime import datetime
 from decimal import Decimal
-from beanie import Document
+from beanie import DecimalAnnotation, Document
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import get_origin, get_args, Optional
-from pydantic import TypeAdapter, ValidationError
+from pydantic import Field, TypeAdapter, ValidationError
 from typing import get_type_hints
+
+from core.tracing import tracer
 MOSCOW_TZ = pytz.timezone('Europe/Moscow')
 
+
+def moscow_now() -> datetime:
+    """Текущее время по Москве (значение по умолчанию для временных меток)"""
+    return datetime.now(MOSCOW_TZ)
+
+
+# === Статусы платежей konsol.pro ===
+KONSOL_TERMINAL_STATUSES = ("executed", "failed")  # больше не меняются
+KONSOL_PENDING_STATUSES = ("created", "manualpay", "nalog_unbound")  # ещё могут измениться
+
+def db_span(model: type, operation: str):
+    """Спан операции с коллекцией: `Claim.get`, `KonsolPayment.update` и т.д."""
+    return tracer.start_as_current_span(
+        f"{model.__name__}.{operation}",
+        attributes={"db.system": "mongodb", "db.operation": operation, "db.model": model.__name__}
+    )
+
+
 # Базовый класс для CRUD-операций
 class ModelAdmin(Document):
     class CellTypeExp(Exception):
@@ -22,7 +43,8 @@ class ModelAdmin(Document):
             kwargs = data
         obj = cls(**kwargs)
 
-        await obj.insert()
+        with db_span(cls, "create"):
+            await obj.insert()
         return obj
 
     class CellTypeExp(Exception):
@@ -64,27 +86,31 @@ class ModelAdmin(Document):
             _set["$set"][key] = value
 
         # === Выполняем обновление в БД ===
-        await super().update(_set)
+        with db_span(self.__class__, "update"):
+            await super().update(_set)
 
     async def delete(self):
         """
         Удаляет объект из базы данных.
         """
-        await super().delete()
+        with db_span(self.__class__, "delete"):
+            await super().delete()
 
     @classmethod
     async def get(cls, **kwargs):
         """
         Возвращает один объект, соответствующий критериям поиска.
         """
-        return await cls.find_one(kwargs)
+        with db_span(cls, "get"):
+            return await cls.find_one(kwargs)
 
     @classmethod
     async def check(cls, **kwargs) -> Optional[str]:
         """
         Проверяет наличие объекта, соответствующего критериям поиска, и возвращает его ID.
         """
-        obj = await cls.find_one(kwargs)
+        with db_span(cls, "check"):
+            obj = await cls.find_one(kwargs)
         return str(obj.id) if obj else None
 
     @classmethod
@@ -92,14 +118,16 @@ class ModelAdmin(Document):
         """
         Возвращает список объектов, соответствующих критериям поиска.
         """
-        return await cls.find(kwargs).to_list()
+        with db_span(cls, "filter"):
+            return await cls.find(kwargs).to_list()
 
     @classmethod
     async def all(cls):
         """
         Возвращает список всех объектов.
         """
-        return await cls.find_all().to_list()
+        with db_span(cls, "all"):
+            return await cls.find_all().to_list()
 
 
 class AdminMessage(ModelAdmin):
@@ -108,7 +136,7 @@ class AdminMessage(ModelAdmin):
     to_user_id: int
     message_text: str = ""
     is_reply: bool = False
-    created_at: datetime = datetime.now(MOSCOW_TZ)
+    created_at: datetime = Field(default_factory=moscow_now)
 
     class Settings:
         name = "admin_messages"
@@ -119,12 +147,16 @@ class User(ModelAdmin):
     username: Optional[str] = None
     role: str = "user"
     banned: bool = False
+    blocked_bot: bool = False  # пользователь заблокировал бота (выяснилось при рассылке)
     # === Поля для Konsol API ===
     kind: str = "individual"  # всегда "individual"
-    created_at: datetime = datetime.now(MOSCOW_TZ)
+    created_at: datetime = Field(default_factory=moscow_now)
 
     class Settings:
         name = "users"
+        indexes = [
+            IndexModel([("tg_id", ASCENDING)])
+        ]
 
 
 class Claim(ModelAdmin):
@@ -148,13 +180,22 @@ class Claim(ModelAdmin):
 
     # === Связь с платежом ===
     konsol_payment_id: Optional[str] = None  # ID в коллекции konsol_payments
+    payment_status: Optional[str] = None  # Статус платежа в konsol.pro
 
-    created_at: datetime = datetime.now(MOSCOW_TZ)
-    updated_at: datetime = datetime.now(MOSCOW_TZ)
+    created_at: datetime = Field(default_factory=moscow_now)
+    updated_at: datetime = Field(default_factory=moscow_now)
 
     class Settings:
         name = "claims"
         use_state_management = True
+        indexes = [
+            IndexModel([("claim_id", ASCENDING)]),
+            # Листинг GET /claims: фильтр + keyset пагинация по (created_at, _id)
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("claim_status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("payment_method", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+        ]
 
     def update_status(self, claim_status: str, process_status: str):
         """Метод для обновления статусов"""
@@ -178,7 +219,7 @@ class KonsolPayment(ModelAdmin):
     """Модель для платежей konsol.pro"""
     konsol_id: Optional[str] = None  # ID платежа в konsol.pro (заполняется после создания)
     contractor_id: str  # ID исполнителя в Konsol (берётся из User)
-    amount: Decimal = Decimal("100.00")  # Сумма (Decimal)
+    amount: DecimalAnnotation = Decimal("100.00")  # Сумма (в Mongo — Decimal128)
     status: str  # created, manualpay, executed, failed, nalog_unbound
     purpose: str  # Назначение платежа
     services_list: List[Dict[str, Any]]  # Список услуг: [{"title": "...", "amount": "100.00"}]
@@ -194,9 +235,10 @@ class KonsolPayment(ModelAdmin):
     user_id: Optional[int] = None  # tg_id пользователя (для удобства поиска)
 
     # === Временные метки ===
-    created_at: datetime = datetime.now(MOSCOW_TZ)
-    updated_at: datetime = datetime.now(MOSCOW_TZ)
+    created_at: datetime = Field(default_factory=moscow_now)
+    updated_at: datetime = Field(default_factory=moscow_now)
     paid_at: Optional[datetime] = None  # Заполняется при статусе "executed"
+    checked_at: Optional[datetime] = None  # Последняя сверка статуса с konsol.pro
 
     class Settings:
         name = "konsol_payments"
@@ -208,11 +250,157 @@ class KonsolPayment(ModelAdmin):
             "claim_id",
             "bank_details_kind",
             "phone_number",
-            "card_number"
+            "card_number",
+            # Листинг GET /konsol/payments: фильтр + keyset пагинация по (created_at, _id)
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("bank_details_kind", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+        ]
+
+
+class KonsolWebhookEvent(ModelAdmin):
+    """Обработанные webhook события konsol.pro (для дедупликации)"""
+    event_id: str  # ID события (из тела, заголовка или хэш тела)
+    konsol_id: Optional[str] = None
+    status: Optional[str] = None
+    payload: Dict[str, Any] = {}
+    received_at: datetime = Field(default_factory=moscow_now)
+
+    class Settings:
+        name = "konsol_webhook_events"
+        indexes = [
+            IndexModel([("event_id", ASCENDING)], unique=True),
+            "konsol_id"
+        ]
+
+
+class DailyStats(ModelAdmin):
+    """Счётчики за день (по Москве), обновляются $inc при смене состояний"""
+    day: str  # "2024-01-31"
+    claims_created: int = 0  # код принят, заявка создана
+    claims_finalized: int = 0  # пользователь отправил заявку менеджерам
+    claims_approved: int = 0
+    claims_rejected: int = 0
+    payouts_executed: int = 0
+    payouts_amount: DecimalAnnotation = Decimal("0")
+    codes_rejected: int = 0
+
+    class Settings:
+        name = "daily_stats"
+        indexes = [
+            IndexModel([("day", ASCENDING)], unique=True)
         ]
 
 
+class MediaFile(ModelAdmin):
+    """file_id статических файлов, уже загруженных в Telegram (file_id привязан к боту)"""
+    bot_id: int
+    kind: str  # "photo" / "document" / "video" / "animation"
+    sha256: str  # хэш содержимого файла
+    path: str
+    file_id: str
+    uploaded_at: datetime = Field(default_factory=moscow_now)
+
+    class Settings:
+        name = "media_files"
+        indexes = [
+            IndexModel([("bot_id", ASCENDING), ("kind", ASCENDING), ("sha256", ASCENDING)], unique=True)
+        ]
+
 
+# === Статусы заданий на выплату ===
+PAYOUT_JOB_ACTIVE_STATUSES = ("queued", "running")
+# done — выплата создана; failed — Konsol отклонил запрос;
+# review — неизвестно, создан ли платёж (сбой во время запроса), нужна ручная проверка
 
 
+class PayoutJob(ModelAdmin):
+    """Задание на выплату по подтверждённой заявке. Одно на заявку (claim_id — ключ идемпотентности)."""
+    claim_id: str
+    status: str = "queued"  # queued / running / done / failed / review
+    step: str = "contractor"  # contractor -> payment -> save -> notify -> done
+    attempts: int = 0
+    last_error: Optional[str] = None
+
+    # === Результаты шагов (для продолжения после сбоя) ===
+    contractor_id: Optional[str] = None
+    payment_requested_at: Optional[datetime] = None
+    konsol_payment_id: Optional[str] = None
+    payment_status: Optional[str] = None
+
+    # === Аренда задания воркером ===
+    lease_owner: Optional[str] = None
+    lease_until: Optional[datetime] = None
+    next_run_at: datetime = Field(default_factory=moscow_now)
+
+    # === Сообщение в группе менеджеров, которое обновляется по завершении ===
+    admin_id: Optional[int] = None
+    chat_id: Optional[int] = None
+    message_id: Optional[int] = None
+    message_is_photo: bool = False
+    message_prefix: str = ""
+
+    created_at: datetime = Field(default_factory=moscow_now)
+    updated_at: datetime = Field(default_factory=moscow_now)
+
+    class Settings:
+        name = "payout_jobs"
+        indexes = [
+            IndexModel([("claim_id", ASCENDING)], unique=True),
+            IndexModel([("status", ASCENDING), ("next_run_at", ASCENDING)])
+        ]
+
+
+class Broadcast(ModelAdmin):
+    """Рассылка сообщения админа всем пользователям. Прогресс сохраняется после каждой пачки."""
+    admin_id: int
+    from_chat_id: int  # сообщение, которое копируется пользователям
+    message_id: int
+    status: str = "running"  # running / done / cancelled
+
+    # === Прогресс: пользователи обходятся по возрастанию tg_id ===
+    last_user_id: int = 0
+    total: int = 0
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+
+    # === Сообщение админу со статусом рассылки ===
+    status_chat_id: Optional[int] = None
+    status_message_id: Optional[int] = None
+
+    created_at: datetime = Field(default_factory=moscow_now)
+    updated_at: datetime = Field(default_factory=moscow_now)
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        name = "broadcasts"
+        indexes = [
+            IndexModel([("status", ASCENDING)])
+        ]
+
+
+class ApiKey(ModelAdmin):
+    """Ключ доступа к API. Хранится только SHA-256 ключа, сам ключ показывается один раз при создании."""
+    name: str  # интеграция, которой выдан ключ
+    key_hash: str
+    prefix: str  # начало ключа — чтобы узнать ключ в логах и списке
+    scopes: List[str] = []  # konsol / user / claims / export / stats, "*" — все
+    active: bool = True
+
+    # === Лимит запросов в скользящем окне, None — API_RATE_LIMIT / API_RATE_WINDOW ===
+    rate_limit: Optional[int] = None
+    rate_window: Optional[int] = None
+
+    created_at: datetime = Field(default_factory=moscow_now)
+    revoked_at: Optional[datetime] = None
+
+    class Settings:
+        name = "api_keys"
+        indexes = [
+            IndexModel([("key_hash", ASCENDING)], unique=True)
+        ]
 
+    def allows(self, scope: str) -> bool:
+        return "*" in self.scopes or scope in self.scopes
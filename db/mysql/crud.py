@@ -1,23 +1,53 @@
-import aiomysql
+import asyncio
 from contextlib import asynccontextmanager
+from typing import Optional
+
+import aiomysql
 from config import cnf
+from core.metrics import MYSQL_LATENCY
+from core.timing import track
+from core.tracing import tracer
+
+# Общий пул соединений, создаётся при первом обращении
+pool: Optional[aiomysql.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_pool() -> aiomysql.Pool:
+    global pool
+    async with _pool_lock:
+        if pool is None:
+            pool = await aiomysql.create_pool(
+                host=cnf.mysql.HOST,
+                port=cnf.mysql.PORT,
+                user=cnf.mysql.USER,
+                password=cnf.mysql.PASSWORD,
+                db=cnf.mysql.DATABASE,
+                charset='utf8mb4',
+                autocommit=True,
+                minsize=cnf.mysql.POOL_MIN_SIZE,
+                maxsize=cnf.mysql.POOL_MAX_SIZE,
+                pool_recycle=cnf.mysql.POOL_RECYCLE
+            )
+    return pool
 
 
 @asynccontextmanager
 async def get_connection():
-    conn = await aiomysql.connect(
-        host=cnf.mysql.HOST,
-        port=cnf.mysql.PORT,
-        user=cnf.mysql.USER,
-        password=cnf.mysql.PASSWORD,
-        db=cnf.mysql.DATABASE,
-        charset='utf8mb4',
-        autocommit=True
-    )
-    try:
+    async with (await get_pool()).acquire() as conn:
         yield conn
-    finally:
-        conn.close()
+
+
+async def close_mysql():
+    """
+    Закрывает пул, дожидаясь возврата выданных соединений
+    """
+    global pool
+    if pool is None:
+        return
+    pool.close()
+    await pool.wait_closed()
+    pool = None
 
 
 async def init_mysql():
@@ -34,16 +64,18 @@ async def get_and_delete_code(code_text: str):
     Пытается найти код и сразу удалить его (атомарно).
     Возвращает True, если код существовал и удалён.
     """
-    async with get_connection() as conn:
-        async with conn.cursor() as cur:
-            # Сначала проверяем наличие
-            await cur.execute("SELECT code_text FROM oc_qrcode WHERE code_text = %s", (code_text,))
-            exists = await cur.fetchone()
+    with MYSQL_LATENCY.labels("get_and_delete_code").time(), track("mysql"), \
+            tracer.start_as_current_span("mysql.get_and_delete_code", attributes={"db.system": "mysql"}):
+        async with get_connection() as conn:
+            async with conn.cursor() as cur:
+                # Сначала проверяем наличие
+                await cur.execute("SELECT code_text FROM oc_qrcode WHERE code_text = %s", (code_text,))
+                exists = await cur.fetchone()
 
-            if not exists:
-                return False
+                if not exists:
+                    return False
 
-            # Удаляем код
-            # await cur.execute("DELETE FROM oc_qrcode WHERE code_text = %s", (code_text,))
+                # Удаляем код
+                # await cur.execute("DELETE FROM oc_qrcode WHERE code_text = %s", (code_text,))
 
-            return True
+                return True
@@ -0,0 +1,209 @@
+"""
+Нагрузочный тест регистрации заявок: всплеск пользователей после раздачи промокодов.
+
+Апдейты подаются прямо в Dispatcher бота. Telegram заменён сессией без сети, MySQL — кодами
+в памяти, Konsol — локальным HTTP сервером. MongoDB нужна настоящая (локальная), данные
+пишутся в отдельную базу, которая удаляется после прогона.
+
+    python -m loadtest --users 500 --concurrency 100 --ramp 10 --approve
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+from beanie import init_beanie
+
+from bot.dispatcher import create_dispatcher
+from bot.handlers.user import commands as user_commands
+from bot.templates.user.reg import RegCallback
+from config import cnf
+from core.mongo import create_client
+from core.bot import bot
+from db.beanie.models import Claim, PayoutJob, document_models
+from db.beanie.models.models import PAYOUT_JOB_ACTIVE_STATUSES
+from loadtest.stubs import CodeStore, FakeKonsolServer
+from loadtest.telegram import FakeTelegramSession, UpdateFactory
+from utils.konsol_client import konsol_client
+from utils.payout_queue import payout_worker
+
+STEPS = ("start", "code", "screenshot", "choose_card", "card", "approve")
+
+
+class LoadTest:
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.dp = create_dispatcher()
+        self.updates = UpdateFactory(bot)
+        self.codes = CodeStore(latency=args.mysql_latency / 1000)
+        self.konsol = FakeKonsolServer(latency=args.konsol_latency / 1000)
+        self.session = FakeTelegramSession(latency=args.telegram_latency / 1000)
+
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.completed = 0
+        self.fed = 0
+
+    async def feed(self, step: str, update) -> bool:
+        start = time.perf_counter()
+        try:
+            await self.dp.feed_update(bot, update)
+            return True
+        except Exception as e:
+            self.errors[step][type(e).__name__] += 1
+            return False
+        finally:
+            self.fed += 1
+            self.latencies[step].append(time.perf_counter() - start)
+
+    async def user_flow(self, user_id: int) -> None:
+        """
+        /start → код → скриншот → «карта» → номер карты (→ подтверждение менеджером)
+        """
+        code = f"LOAD-{user_id}"
+        if random.random() >= self.args.invalid_codes:
+            self.codes.codes.add(code)
+
+        steps = [
+            ("start", lambda: self.updates.text(user_id, "/start")),
+            ("code", lambda: self.updates.text(user_id, code)),
+            ("screenshot", lambda: self.updates.photo(user_id, caption="Отличный продукт, всем советую попробовать")),
+            ("choose_card", lambda: self.updates.callback(user_id, RegCallback(step="card").pack())),
+            ("card", lambda: self.updates.text(user_id, "2222 2222 2222 2222")),
+        ]
+        for step, build in steps:
+            if not await self.feed(step, build()):
+                return
+            if step == "code" and code not in self.codes.codes:
+                return
+
+        if self.args.approve:
+            claim = await Claim.find_one(Claim.user_id == user_id)
+            if not claim:
+                self.errors["approve"]["ClaimNotFound"] += 1
+                return
+            admin_id = (cnf.bot.ADMINS or [1])[0]
+            update = self.updates.callback(
+                admin_id, f"confirm_{claim.claim_id}", chat_id=cnf.bot.GROUP_ID,
+                text=f"Номер заявки: {claim.claim_id}\nСтатус заявки: Не обработано"
+            )
+            if not await self.feed("approve", update):
+                return
+
+        self.completed += 1
+
+    async def run(self) -> None:
+        args = self.args
+        if args.mongo_db == cnf.mongo.NAME:
+            raise SystemExit("Нагрузочный тест удаляет свою базу — укажите --mongo-db, отличную от MONGO_NAME")
+        mongo_client = create_client(args.mongo_url, appname="loadtest")
+        database = mongo_client[args.mongo_db]
+        await init_beanie(database=database, document_models=document_models)
+
+        bot.session = self.session
+        cnf.throttle.ENABLED = args.throttle
+        user_commands.get_and_delete_code = self.codes.get_and_delete_code
+        konsol_client.base_url = await self.konsol.start()
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        base_user_id = 10_000_000
+
+        async def run_user(index: int) -> None:
+            if args.ramp:
+                await asyncio.sleep(args.ramp * index / args.users)
+            async with semaphore:
+                await self.user_flow(base_user_id + index)
+
+        if args.approve:
+            payout_worker.start(bot)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(run_user(i) for i in range(args.users)))
+            if args.approve:
+                await self.wait_payouts()
+            elapsed = time.perf_counter() - started
+            statuses = await Claim.get_motor_collection().aggregate([
+                {"$group": {"_id": "$claim_status", "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+            payouts = await PayoutJob.get_motor_collection().aggregate([
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+            self.report(
+                elapsed,
+                {row["_id"]: row["count"] for row in statuses},
+                {row["_id"]: row["count"] for row in payouts}
+            )
+        finally:
+            await payout_worker.stop()
+            await konsol_client.close()
+            await self.konsol.stop()
+            if not args.keep_data:
+                await mongo_client.drop_database(args.mongo_db)
+
+    async def wait_payouts(self) -> None:
+        """
+        Ждёт, пока воркер обработает все поставленные в очередь выплаты
+        """
+        while await PayoutJob.find({"status": {"$in": list(PAYOUT_JOB_ACTIVE_STATUSES)}}).count():
+            await asyncio.sleep(0.2)
+
+    def report(self, elapsed: float, claim_statuses: Dict[str, int], payout_statuses: Dict[str, int]) -> None:
+        print(f"\nПользователей: {self.args.users}, параллельно: {self.args.concurrency}, разгон: {self.args.ramp} с")
+        print(f"Время: {elapsed:.2f} с, апдейтов: {self.fed} ({self.fed / elapsed:.1f}/с), "
+              f"пройдено сценариев: {self.completed} ({self.completed / elapsed:.1f}/с)\n")
+
+        print(f"{'step':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+        for step in STEPS:
+            samples = sorted(self.latencies.get(step, []))
+            errors = sum(self.errors[step].values())
+            if not samples and not errors:
+                continue
+            print(
+                f"{step:<12}{len(samples):>8}"
+                f"{percentile(samples, 50):>10.1f}{percentile(samples, 95):>10.1f}"
+                f"{percentile(samples, 99):>10.1f}{percentile(samples, 100):>10.1f}{errors:>8}"
+            )
+
+        for step, errors in self.errors.items():
+            for error, count in errors.most_common():
+                print(f"  {step}: {error} × {count}")
+
+        print(f"\nЗаявки по статусам: {claim_statuses}")
+        if self.args.approve:
+            print(f"Выплаты по статусам: {payout_statuses}")
+        print(f"Вызовы Bot API: {dict(self.session.calls.most_common())}")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """
+    Перцентиль в миллисекундах по отсортированной выборке
+    """
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(q / 100 * len(samples)) - 1))
+    return samples[index] * 1000
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест регистрации заявок")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременно проходящих сценарий")
+    parser.add_argument("--ramp", type=float, default=0, help="Секунды, за которые приходят все пользователи")
+    parser.add_argument("--approve", action="store_true", help="Подтверждать заявки менеджером (платёж в Konsol)")
+    parser.add_argument("--throttle", action="store_true", help="Включить ограничение частоты (THROTTLE_*)")
+    parser.add_argument("--invalid-codes", type=float, default=0.0, help="Доля неверных кодов")
+    parser.add_argument("--telegram-latency", type=float, default=30, help="мс на запрос к Bot API")
+    parser.add_argument("--mysql-latency", type=float, default=5, help="мс на проверку кода")
+    parser.add_argument("--konsol-latency", type=float, default=100, help="мс на запрос к Konsol")
+    parser.add_argument("--mongo-url", default=None, help="По умолчанию MONGO_* из .env")
+    parser.add_argument("--mongo-db", default=f"{cnf.mongo.NAME}_loadtest")
+    parser.add_argument("--keep-data", action="store_true", help="Не удалять базу после прогона")
+    return parser
+
+
+if __name__ == "__main__":
+    asyncio.run(LoadTest(build_parser().parse_args()).run())
@@ -0,0 +1,67 @@
+import asyncio
+import itertools
+from typing import Set
+
+from aiohttp import web
+
+
+class CodeStore:
+    """
+    Замена MySQL для get_and_delete_code: коды в памяти с задержкой запроса
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.codes: Set[str] = set()
+
+    async def get_and_delete_code(self, code_text: str) -> bool:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return code_text in self.codes
+
+
+class FakeKonsolServer:
+    """
+    Локальный HTTP сервер с эндпоинтами konsol.pro, которые вызывает бот
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._ids = itertools.count(1)
+        self._runner: web.AppRunner = None
+        self.url: str = ""
+
+        self.app = web.Application()
+        self.app.router.add_post("/api/v1/contractors", self.create_contractor)
+        self.app.router.add_post("/api/v1/payments", self.create_payment)
+        self.app.router.add_get("/api/v1/payments/{payment_id}", self.get_payment)
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def create_contractor(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({"id": f"contractor-{next(self._ids)}"})
+
+    async def create_payment(self, request: web.Request) -> web.Response:
+        await self._delay()
+        data = await request.json()
+        return web.json_response({"id": f"payment-{next(self._ids)}", "status": "created", "amount": data.get("amount")})
+
+    async def get_payment(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({"id": request.match_info["payment_id"], "status": "executed"})
+
+    async def start(self) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetChatMember, SendMediaGroup, SendPhoto, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import ChatMemberMember, Message, Update, User
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Сессия бота без сети: отвечает на методы Bot API заготовками с заданной задержкой.
+    Пользователь всегда подписан на канал, отправленные сообщения получают новые message_id.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1_000_000)
+
+    async def make_request(
+            self,
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+            timeout: Optional[int] = None
+    ) -> TelegramType:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, GetChatMember):
+            return ChatMemberMember(user=User(id=method.user_id, is_bot=False, first_name="Load"))
+        if isinstance(method, SendMediaGroup):
+            return [self.message(bot, method.chat_id) for _ in method.media]
+        if isinstance(method, SendPhoto):
+            # file_id нужен кэшу статических картинок (utils/media.py)
+            photo = [{"file_id": "load-photo", "file_unique_id": "load-photo", "width": 1, "height": 1}]
+            return self.message(bot, method.chat_id, photo=photo)
+        if method.__returning__ is Message:
+            return self.message(bot, method.chat_id)
+        # editMessageText, deleteMessage, answerCallbackQuery и т.д.
+        return True
+
+    def message(self, bot: Bot, chat_id: Any, **fields: Any) -> Message:
+        return Message.model_validate(
+            {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                **fields
+            },
+            context={"bot": bot}
+        )
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class UpdateFactory:
+    """
+    Синтетические апдейты от пользователей и менеджеров
+    """
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _update(self, payload: Dict[str, Any]) -> Update:
+        return Update.model_validate(
+            {"update_id": next(self._update_ids), **payload},
+            context={"bot": self.bot}
+        )
+
+    def _message(self, user_id: int, chat_id: int, **fields: Any) -> Dict[str, Any]:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id == user_id else "supergroup"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Load", "username": f"load{user_id}"},
+            **fields
+        }
+
+    def text(self, user_id: int, text: str) -> Update:
+        return self._update({"message": self._message(user_id, user_id, text=text)})
+
+    def photo(self, user_id: int, caption: Optional[str] = None) -> Update:
+        photo = [{"file_id": f"photo-{user_id}", "file_unique_id": f"u-{user_id}", "width": 1280, "height": 960}]
+        return self._update({"message": self._message(user_id, user_id, photo=photo, caption=caption)})
+
+    def callback(self, user_id: int, data: str, chat_id: Optional[int] = None, text: str = "") -> Update:
+        chat_id = chat_id or user_id
+        return self._update({"callback_query": {
+            "id": str(next(self._update_ids)),
+            "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": self._message(user_id, chat_id, text=text)
+        }})
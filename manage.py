@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from config import cnf
+from db.beanie.crud.crud import init_mongo
+from db.beanie.models import ApiKey
+from utils import rollup
+from utils.api_keys import SCOPES, api_keys
+from utils.export import EXPORTS, EXPORT_FORMATS, export_chunks, gzip_chunks
+from utils.payout_queue import requeue_payout
+
+
+async def export_command(args: argparse.Namespace) -> None:
+    """
+    Выгрузка заявок/платежей в файл или stdout
+    """
+    await init_mongo()
+
+    chunks = export_chunks(args.kind, args.format, args.date_from, args.date_to, args.batch_size)
+    if args.gzip:
+        chunks = gzip_chunks(chunks)
+
+    output = open(args.output, "wb") if args.output != "-" else sys.stdout.buffer
+    try:
+        async for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+async def backfill_rollups_command(args: argparse.Namespace) -> None:
+    """
+    Пересчёт дневных счётчиков daily_stats по существующим данным
+    """
+    await init_mongo()
+    days = await rollup.backfill(days=args.days, batch_size=args.batch_size)
+    print(f"Пересчитано дней: {days}")
+
+
+async def api_key_create_command(args: argparse.Namespace) -> None:
+    """
+    Выпуск ключа API. Ключ печатается один раз — в базе хранится только хэш
+    """
+    await init_mongo()
+    api_key, key = await api_keys.create(args.name, args.scopes, args.rate_limit, args.rate_window)
+    print(f"Ключ {api_key.name} ({', '.join(api_key.scopes)}): {key}")
+
+
+async def api_key_revoke_command(args: argparse.Namespace) -> None:
+    """
+    Отзыв ключа API по префиксу
+    """
+    await init_mongo()
+    revoked = await api_keys.revoke(args.prefix)
+    print(f"Отозвано ключей: {revoked}")
+
+
+async def api_keys_command(args: argparse.Namespace) -> None:
+    """
+    Список ключей API
+    """
+    await init_mongo()
+    async for api_key in ApiKey.find_all().sort("created_at"):
+        limit = api_key.rate_limit if api_key.rate_limit is not None else cnf.api.RATE_LIMIT
+        window = api_key.rate_window or cnf.api.RATE_WINDOW
+        state = "активен" if api_key.active else "отозван"
+        print(f"{api_key.prefix:<12}{api_key.name:<24}{','.join(api_key.scopes):<32}{f'{limit}/{window}с':<16}{state}")
+
+
+async def payout_requeue_command(args: argparse.Namespace) -> None:
+    """
+    Повтор выплаты, завершившейся ошибкой. Задание подхватит воркер бота
+    """
+    await init_mongo()
+    job = await requeue_payout(args.claim_id, force=args.force)
+    if job is None:
+        print("Задание не найдено или не в статусе failed (review — только с --force)")
+        return
+    print(f"Выплата по заявке {job.claim_id} поставлена в очередь с шага {job.step}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Служебные команды")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Потоковая выгрузка claims / payments")
+    export.add_argument("kind", choices=list(EXPORTS))
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export.add_argument("--gzip", action="store_true", help="Сжать выгрузку gzip")
+    export.add_argument("--from", dest="date_from", type=datetime.fromisoformat, help="created_at >= (ISO дата)")
+    export.add_argument("--to", dest="date_to", type=datetime.fromisoformat, help="created_at < (ISO дата)")
+    export.add_argument("--batch-size", type=int, default=1000)
+    export.add_argument("-o", "--output", default="-", help="Файл, по умолчанию stdout")
+    export.set_defaults(handler=export_command)
+
+    backfill = commands.add_parser("backfill-rollups", help="Пересчитать daily_stats по заявкам и платежам")
+    backfill.add_argument("--days", type=int, default=None, help="Глубина в днях, по умолчанию вся история")
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.set_defaults(handler=backfill_rollups_command)
+
+    key_create = commands.add_parser("api-key-create", help="Выпустить ключ API")
+    key_create.add_argument("name", help="Интеграция, которой выдаётся ключ")
+    key_create.add_argument("--scopes", nargs="+", choices=[*SCOPES, "*"], required=True)
+    key_create.add_argument("--rate-limit", type=int, default=None, help="Запросов за окно, по умолчанию API_RATE_LIMIT")
+    key_create.add_argument("--rate-window", type=int, default=None, help="Окно в секундах, по умолчанию API_RATE_WINDOW")
+    key_create.set_defaults(handler=api_key_create_command)
+
+    key_revoke = commands.add_parser("api-key-revoke", help="Отозвать ключ API")
+    key_revoke.add_argument("prefix", help="Префикс ключа из api-keys")
+    key_revoke.set_defaults(handler=api_key_revoke_command)
+
+    keys = commands.add_parser("api-keys", help="Список ключей API")
+    keys.set_defaults(handler=api_keys_command)
+
+    requeue = commands.add_parser("payout-requeue", help="Поставить выплату с ошибкой в очередь заново")
+    requeue.add_argument("claim_id")
+    requeue.add_argument(
+        "--force", action="store_true",
+        help="Повторить и задание в статусе review — только убедившись в Konsol, что платёж не создан"
+    )
+    requeue.set_defaults(handler=payout_requeue_command)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    asyncio.run(args.handler(args))
@@ -1,19 +1,50 @@
-import secrets
+import math
+from typing import Awaitable, Callable
 
 from fastapi import HTTPException, status, Header
 
-from config import cnf
+from core.logger import api_logger as logger
+from core.metrics import API_REJECTED_REQUESTS
+from db.beanie.models import ApiKey
+from utils.api_keys import api_keys
 
 
-async def auth_by_token(token: str = Header(alias='x-auth-token')) -> bool:
+def require_scope(scope: str) -> Callable[..., Awaitable[ApiKey]]:
     """
-        Auth request by token
-    :param token: Token form request header
+        Зависимость эндпоинта: ключ из x-auth-token с правом `scope` в пределах лимита ключа
+    :param scope: konsol / user / claims / export / stats
     """
-    if not secrets.compare_digest(token, cnf.api.TOKEN):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-        )
 
-    return True
+    async def auth_by_token(token: str = Header(alias='x-auth-token')) -> ApiKey:
+        """
+            Auth request by token
+        :param token: Token form request header
+        """
+        api_key = await api_keys.authenticate(token)
+        if api_key is None:
+            API_REJECTED_REQUESTS.labels("invalid_key", scope).inc()
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token",
+            )
+
+        if not api_key.allows(scope):
+            API_REJECTED_REQUESTS.labels("forbidden", scope).inc()
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Key has no access to {scope}",
+            )
+
+        wait = await api_keys.hit(api_key)
+        if wait:
+            API_REJECTED_REQUESTS.labels("rate_limited", scope).inc()
+            logger.warning("API key rate limited", extra={"key": api_key.name, "prefix": api_key.prefix})
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+        return api_key
+
+    return auth_by_token
@@ -0,0 +1,137 @@
+import hashlib
+import secrets
+from typing import List, Optional, Tuple
+
+from config import cnf
+from core.logger import api_logger as logger
+from core.metrics import register_cache
+from db.beanie.models import ApiKey
+from db.beanie.models.models import moscow_now
+from utils.cache import AsyncTTLCache
+from utils.throttling import MemoryBackend, RedisBackend
+
+KEY_PREFIX = "twk_"
+SCOPES = ("konsol", "user", "claims", "export", "stats")
+
+
+def hash_key(key: str) -> str:
+    """
+    SHA-256 ключа: ключи случайные и длинные, медленный хэш не нужен
+    """
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ApiKeyService:
+    """
+    Ключи API: проверка, права и лимит запросов в скользящем окне на ключ.
+
+    Ключ ищется в Mongo по хэшу и кэшируется в памяти воркера на API_KEY_CACHE_TTL секунд,
+    поэтому отзыв ключа вступает в силу в течение этого времени. Неизвестные ключи кэшируются
+    отдельно (API_KEY_NEGATIVE_CACHE_MAXSIZE): поток случайных токенов не вытесняет действующие ключи.
+    Лимиты считаются в памяти воркера или в Redis (API_RATE_LIMIT_BACKEND=redis) — общие для всех воркеров.
+    Ошибки хранилища лимитов не блокируют запросы.
+    """
+
+    def __init__(self):
+        self.cache = AsyncTTLCache(name="api_keys", maxsize=cnf.api.KEY_CACHE_MAXSIZE)
+        self.unknown = AsyncTTLCache(name="api_keys_unknown", maxsize=cnf.api.KEY_NEGATIVE_CACHE_MAXSIZE)
+        self._backend = None
+        self._legacy: Optional[ApiKey] = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = RedisBackend(cnf.redis.URL) if cnf.api.RATE_LIMIT_BACKEND == "redis" else MemoryBackend()
+        return self._backend
+
+    @property
+    def legacy_key(self) -> ApiKey:
+        """
+        API_TOKEN — общий токен со всеми правами для интеграций, которым ещё не выданы ключи
+        """
+        if self._legacy is None:
+            self._legacy = ApiKey(name="API_TOKEN", key_hash="legacy", prefix="API_TOKEN", scopes=["*"])
+        return self._legacy
+
+    async def create(
+            self,
+            name: str,
+            scopes: List[str],
+            rate_limit: Optional[int] = None,
+            rate_window: Optional[int] = None
+    ) -> Tuple[ApiKey, str]:
+        """
+        Выпускает ключ
+
+        :return: (запись ключа, сам ключ — сохраняется только его хэш)
+        """
+        key = KEY_PREFIX + secrets.token_urlsafe(32)
+        api_key = await ApiKey.create(
+            name=name,
+            key_hash=hash_key(key),
+            prefix=key[:len(KEY_PREFIX) + 6],
+            scopes=scopes,
+            rate_limit=rate_limit,
+            rate_window=rate_window
+        )
+        logger.info("API key created", extra={"key": name, "prefix": api_key.prefix, "scopes": scopes})
+        return api_key, key
+
+    async def revoke(self, prefix: str) -> int:
+        """
+        Отзывает ключ по префиксу
+
+        :return: Количество отозванных ключей
+        """
+        result = await ApiKey.get_motor_collection().update_many(
+            {"prefix": prefix, "active": True},
+            {"$set": {"active": False, "revoked_at": moscow_now()}}
+        )
+        if result.modified_count:
+            logger.info("API key revoked", extra={"prefix": prefix})
+        return result.modified_count
+
+    async def authenticate(self, token: str) -> Optional[ApiKey]:
+        """
+        Активный ключ по значению заголовка, None — ключ неизвестен или отозван
+        """
+        if cnf.api.TOKEN and secrets.compare_digest(token.encode(), cnf.api.TOKEN.encode()):
+            return self.legacy_key
+
+        key_hash = hash_key(token)
+        found, _ = self.unknown.get(key_hash)
+        if found:
+            self.unknown.hits += 1
+            return None
+
+        api_key = await self.cache.get_or_load(
+            key_hash,
+            loader=lambda: ApiKey.find_one({"key_hash": key_hash, "active": True}),
+            ttl_for=lambda api_key: cnf.api.KEY_CACHE_TTL if api_key else 0
+        )
+        if api_key is None:
+            self.unknown.misses += 1
+            self.unknown.set(key_hash, True, cnf.api.KEY_CACHE_TTL)
+        return api_key
+
+    async def hit(self, api_key: ApiKey) -> float:
+        """
+        Учитывает запрос в лимите ключа
+
+        :return: 0, если запрос разрешён, иначе секунды до повтора
+        """
+        limit = api_key.rate_limit if api_key.rate_limit is not None else cnf.api.RATE_LIMIT
+        if not limit:
+            return 0.0
+        window = api_key.rate_window or cnf.api.RATE_WINDOW
+        try:
+            return await self.backend.window(f"api:{api_key.key_hash[:16]}", limit, window)
+        except Exception as e:
+            logger.warning(f"API rate limit check skipped: {e}")
+            return 0.0
+
+
+# Глобальный экземпляр
+api_keys = ApiKeyService()
+register_cache(api_keys.cache)
+register_cache(api_keys.unknown)
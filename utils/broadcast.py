@@ -0,0 +1,242 @@
+import asyncio
+import contextlib
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+from pymongo import ReturnDocument
+
+from bot.templates.admin import broadcast as tbroadcast
+from config import cnf
+from core.logger import bot_logger as logger
+from core.metrics import BROADCAST_MESSAGES
+from db.beanie.models import Broadcast, User
+from db.beanie.models.models import moscow_now
+from utils.throttling import MemoryBackend
+
+
+def recipients_filter(after_user_id: int = 0) -> dict:
+    """
+    Получатели рассылки: не заблокированные админом и не заблокировавшие бота
+    """
+    return {
+        "tg_id": {"$gt": after_user_id},
+        "banned": {"$ne": True},
+        "blocked_bot": {"$ne": True}
+    }
+
+
+class Broadcaster:
+    """
+    Рассылка сообщения всем пользователям.
+
+    Пользователи читаются одним курсором Mongo по возрастанию tg_id пачками по BATCH_SIZE,
+    в память попадает только текущая пачка. Сообщения отправляются copy_message с общим
+    ограничением скорости (RATE) и параллельности (CONCURRENCY); retry_after от Telegram
+    приостанавливает все отправки. После каждой пачки в Broadcast сохраняются счётчики и
+    последний tg_id, поэтому после перезапуска рассылка продолжается со следующей пачки
+    (текущая пачка может быть отправлена повторно).
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+        self._limiter = MemoryBackend()
+        self._paused_until = 0.0
+
+    def launch(self, bot: Bot, broadcast: Broadcast) -> None:
+        """
+        Запускает (или продолжает) рассылку в фоне
+        """
+        key = str(broadcast.id)
+        if key in self._tasks and not self._tasks[key].done():
+            return
+        self._stopping = False
+        self._tasks[key] = asyncio.create_task(self._run(bot, broadcast))
+
+    async def resume(self, bot: Bot) -> None:
+        """
+        Продолжает рассылки, прерванные остановкой бота
+        """
+        for broadcast in await Broadcast.find(Broadcast.status == "running").to_list():
+            logger.info(f"Resuming broadcast {broadcast.id} after user {broadcast.last_user_id}")
+            self.launch(bot, broadcast)
+
+    async def stop(self, timeout: float = 30) -> None:
+        """
+        Даёт текущим пачкам дойти до сохранения прогресса, затем останавливает рассылки
+        """
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        if not tasks:
+            return
+        self._stopping = True
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = {}
+
+    async def _run(self, bot: Bot, broadcast: Broadcast) -> None:
+        try:
+            await self.deliver(bot, broadcast)
+        except Exception as e:
+            logger.exception(f"Broadcast {broadcast.id} interrupted: {e}")
+
+    async def deliver(self, bot: Bot, broadcast: Broadcast) -> None:
+        collection = User.get_motor_collection()
+        cursor = collection.find(
+            recipients_filter(broadcast.last_user_id),
+            projection={"tg_id": 1, "_id": 0},
+            batch_size=cnf.broadcast.BATCH_SIZE
+        ).sort("tg_id", 1)
+
+        last_progress = time.monotonic()
+        batch: List[int] = []
+        try:
+            async for user in cursor:
+                batch.append(user["tg_id"])
+                if len(batch) < cnf.broadcast.BATCH_SIZE:
+                    continue
+                if not await self.send_batch(bot, broadcast, batch):
+                    return
+                batch = []
+                if time.monotonic() - last_progress >= cnf.broadcast.PROGRESS_INTERVAL:
+                    await self.report(bot, broadcast, tbroadcast.broadcast_cancel_ikb(str(broadcast.id)))
+                    last_progress = time.monotonic()
+                if self._stopping:
+                    return
+
+            if batch and not await self.send_batch(bot, broadcast, batch):
+                return
+        finally:
+            await cursor.close()
+
+        await self.finish(bot, broadcast, "done")
+
+    async def send_batch(self, bot: Bot, broadcast: Broadcast, user_ids: List[int]) -> bool:
+        """
+        Отправляет пачку и сохраняет прогресс
+
+        :return: False, если рассылку отменили
+        """
+        semaphore = asyncio.Semaphore(cnf.broadcast.CONCURRENCY)
+
+        async def send(user_id: int) -> str:
+            async with semaphore:
+                return await self.send_one(bot, broadcast, user_id)
+
+        results = await asyncio.gather(*(send(user_id) for user_id in user_ids))
+        counts = Counter(results)
+        for result, count in counts.items():
+            BROADCAST_MESSAGES.labels(result).inc(count)
+
+        blocked = [user_id for user_id, result in zip(user_ids, results) if result == "blocked"]
+        if blocked:
+            await User.get_motor_collection().update_many(
+                {"tg_id": {"$in": blocked}},
+                {"$set": {"blocked_bot": True}}
+            )
+
+        # Прогресс сохраняется, только пока рассылка не отменена
+        updated = await Broadcast.get_motor_collection().find_one_and_update(
+            {"_id": broadcast.id, "status": "running"},
+            {
+                "$set": {"last_user_id": user_ids[-1], "updated_at": moscow_now()},
+                "$inc": {key: counts.get(key, 0) for key in ("sent", "blocked", "failed")}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if updated is None:
+            logger.info(f"Broadcast {broadcast.id} cancelled")
+            return False
+        for key in ("last_user_id", "sent", "blocked", "failed"):
+            setattr(broadcast, key, updated[key])
+        return True
+
+    async def send_one(self, bot: Bot, broadcast: Broadcast, user_id: int) -> str:
+        """
+        :return: sent / blocked / failed
+        """
+        for _ in range(cnf.broadcast.MAX_RETRIES + 1):
+            await self.acquire()
+            try:
+                await bot.copy_message(
+                    chat_id=user_id,
+                    from_chat_id=broadcast.from_chat_id,
+                    message_id=broadcast.message_id
+                )
+                return "sent"
+            except TelegramRetryAfter as e:
+                logger.warning(f"Broadcast flood control, pause {e.retry_after}s")
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            except TelegramForbiddenError:
+                return "blocked"
+            except TelegramBadRequest as e:
+                # chat not found, user is deactivated и т.п. — повтор не поможет
+                logger.debug(f"Broadcast to {user_id} failed: {e}")
+                return "failed"
+            except Exception as e:
+                logger.warning(f"Broadcast to {user_id} failed, retrying: {e}")
+                await asyncio.sleep(1)
+        return "failed"
+
+    async def acquire(self) -> None:
+        """
+        Ждёт паузы после retry_after и свободного токена общего лимита скорости
+        """
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            wait = await self._limiter.take("broadcast", cnf.broadcast.RATE, max(1, int(cnf.broadcast.RATE)))
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    async def finish(self, bot: Bot, broadcast: Broadcast, status: str) -> None:
+        now = moscow_now()
+        await Broadcast.get_motor_collection().update_one(
+            {"_id": broadcast.id, "status": "running"},
+            {"$set": {"status": status, "finished_at": now, "updated_at": now}}
+        )
+        broadcast.status = status
+        broadcast.finished_at = now
+        logger.info(
+            f"Broadcast {broadcast.id} {status}",
+            extra={"sent": broadcast.sent, "blocked": broadcast.blocked, "failed": broadcast.failed}
+        )
+        await self.report(bot, broadcast)
+
+    async def cancel(self, broadcast: Broadcast) -> bool:
+        """
+        Отменяет рассылку. Запущенная пачка досылается, дальше рассылка не идёт.
+        """
+        now = moscow_now()
+        result = await Broadcast.get_motor_collection().update_one(
+            {"_id": broadcast.id, "status": "running"},
+            {"$set": {"status": "cancelled", "finished_at": now, "updated_at": now}}
+        )
+        return bool(result.modified_count)
+
+    async def report(self, bot: Bot, broadcast: Broadcast, reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+        """
+        Обновляет сообщение админа со статусом рассылки
+        """
+        if not broadcast.status_chat_id or not broadcast.status_message_id:
+            return
+        with contextlib.suppress(TelegramBadRequest):
+            await bot.edit_message_text(
+                chat_id=broadcast.status_chat_id,
+                message_id=broadcast.status_message_id,
+                text=tbroadcast.broadcast_status_text(broadcast),
+                reply_markup=reply_markup
+            )
+
+
+# Глобальный экземпляр
+broadcaster = Broadcaster()
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class AsyncTTLCache:
+    """
+    In-memory read-through кэш с TTL на каждую запись и объединением одновременных запросов.
+
+    TTL вычисляется по загруженному значению: None — бессрочно, 0 — не кэшировать.
+    Пока значение загружается, остальные запросы того же ключа ждут ту же загрузку.
+    """
+
+    def __init__(self, name: str, maxsize: int = 10000):
+        self.name = name
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        # === Метрики ===
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Значение из кэша без загрузки
+
+        :return: (найдено, значение)
+        """
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+
+        self._data.move_to_end(key)
+        return True, value
+
+    def get_many(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], List[Hashable]]:
+        """
+        Пакетное чтение из кэша с учётом в метриках
+
+        :return: (найденные значения, ключи без значения)
+        """
+        found_values, missing = {}, []
+        for key in keys:
+            found, value = self.get(key)
+            if found:
+                found_values[key] = value
+            else:
+                missing.append(key)
+
+        self.hits += len(found_values)
+        self.misses += len(missing)
+        return found_values, missing
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Кладёт значение в кэш
+
+        :param ttl: Время жизни в секундах, None — бессрочно, 0 — не кэшировать
+        """
+        if ttl is not None and ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Удаляет значение из кэша
+        """
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(
+            self,
+            key: Hashable,
+            loader: Callable[[], Awaitable[Any]],
+            ttl_for: Callable[[Any], Optional[float]]
+    ) -> Any:
+        """
+        Возвращает значение из кэша или загружает его через `loader`.
+        Ошибки загрузки не кэшируются и пробрасываются всем ожидающим.
+
+        :param key: Ключ
+        :param loader: Корутина-загрузчик
+        :param ttl_for: TTL по загруженному значению
+        """
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже проброшено вызывающему, ожидающих может не быть
+            future.exception()
+            raise
+        else:
+            self.set(key, value, ttl_for(value))
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Счётчики попаданий/промахов
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Type
+
+from beanie import Document
+from bson import Decimal128, ObjectId
+
+from core.mongo import analytics_collection
+from db.beanie.models.models import Claim, KonsolPayment
+from utils.pagination import date_range_filter
+
+# === Экспортируемые коллекции и колонки ===
+EXPORTS: Dict[str, Dict[str, Any]] = {
+    "claims": {
+        "model": Claim,
+        "fields": [
+            "claim_id", "user_id", "claim_status", "process_status", "payment_method", "payment_status",
+            "amount", "konsol_payment_id", "contractor_id", "phone", "card", "bank_member_id",
+            "created_at", "updated_at"
+        ]
+    },
+    "payments": {
+        "model": KonsolPayment,
+        "fields": [
+            "konsol_id", "claim_id", "user_id", "contractor_id", "amount", "status", "bank_details_kind",
+            "purpose", "card_number", "phone_number", "bank_member_id", "created_at", "updated_at", "paid_at"
+        ]
+    }
+}
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson"
+}
+
+
+def export_value(value: Any) -> Any:
+    """
+    Приводит значение из BSON к виду для выгрузки
+    """
+    if isinstance(value, (ObjectId, Decimal128, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def iter_documents(
+        model: Type[Document],
+        query: Dict[str, Any],
+        fields: List[str],
+        batch_size: int
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Потоково читает документы курсором Mongo пачками по `batch_size`,
+    в памяти одновременно держится не больше одной пачки
+    """
+    cursor = analytics_collection(model).find(
+        query,
+        projection={field: 1 for field in fields},
+        batch_size=batch_size
+    ).sort([("created_at", 1), ("_id", 1)])
+
+    async for doc in cursor:
+        yield doc
+
+
+async def export_chunks(
+        kind: str,
+        fmt: str = "csv",
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        batch_size: int = 1000
+) -> AsyncIterator[bytes]:
+    """
+    Выгрузка коллекции кусками по `batch_size` строк
+
+    :param kind: claims / payments
+    :param fmt: csv / ndjson
+    :param date_from: created_at >= date_from
+    :param date_to: created_at < date_to
+    :param batch_size: Размер пачки курсора и куска вывода
+    """
+    export = EXPORTS[kind]
+    fields = export["fields"]
+    query = date_range_filter(date_from, date_to)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(fields)
+
+    rows = 0
+    async for doc in iter_documents(export["model"], query, fields, batch_size):
+        values = [export_value(doc.get(field)) for field in fields]
+        if writer:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, values)), ensure_ascii=False, default=str))
+            buffer.write("\n")
+
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Потоковое gzip сжатие
+    """
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -3,7 +3,21 @@ from typing import Dict, Any, Optional, List
 from decimal import Decimal
 
 from core.logger import api_logger as logger
+from core.metrics import KONSOL_LATENCY, KONSOL_RESPONSES, endpoint_label
+from core.timing import track
+from core.tracing import tracer
+from opentelemetry.trace import SpanKind, Status, StatusCode
 from config import cnf
+from utils.serialization import dumps, loads
+
+
+class KonsolAPIError(Exception):
+    """Konsol ответил статусом >= 400: запрос получен и не выполнен"""
+
+    def __init__(self, status: int, data: Any):
+        super().__init__(f"API Error {status}: {data}")
+        self.status = status
+        self.data = data
 
 
 class KonsolAPIClient:
@@ -13,13 +27,36 @@ class KonsolAPIClient:
         self.base_url = cnf.konsol.BASE_URL.rstrip("/")  # убираем лишний слэш
         self.token = cnf.konsol.TOKEN  # используем TOKEN из config
         self.timeout = aiohttp.ClientTimeout(total=cnf.konsol.TIMEOUT or 30)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def start(self) -> aiohttp.ClientSession:
+        """
+        Общая сессия с пулом keep-alive соединений (KONSOL_POOL_SIZE), JSON запросов и ответов — через orjson.
+        Создаётся при старте процесса или при первом запросе
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=cnf.konsol.POOL_SIZE),
+                json_serialize=dumps
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """
+        Закрывает сессию и соединения пула
+        """
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     async def _make_request(
             self,
             method: str,
             endpoint: str,
             data: Optional[Dict[str, Any]] = None,
-            params: Optional[Dict[str, Any]] = None
+            params: Optional[Dict[str, Any]] = None,
+            idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Выполняет HTTP запрос к API konsol.pro
@@ -28,6 +65,7 @@ class KonsolAPIClient:
         :param endpoint: Эндпоинт (например: /api/v1/payments)
         :param data: Тело запроса
         :param params: GET-параметры
+        :param idempotency_key: Заголовок Idempotency-Key для повторяемых POST запросов
         :return: Ответ API
         """
         url = f"{self.base_url}{endpoint}"
@@ -35,33 +73,45 @@ class KonsolAPIClient:
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+
+        label = endpoint_label(endpoint)
 
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.request(
+            with KONSOL_LATENCY.labels(method, label).time(), track("konsol"), tracer.start_as_current_span(
+                    f"konsol {method} {label}",
+                    kind=SpanKind.CLIENT,
+                    attributes={"http.request.method": method, "url.path": label}
+            ) as span:
+                async with self.start().request(
                         method=method,
                         url=url,
                         headers=headers,
                         json=data,
                         params=params
                 ) as response:
-                    response_data = await response.json()
+                    KONSOL_RESPONSES.labels(method, label, response.status).inc()
+                    span.set_attribute("http.response.status_code", response.status)
+                    response_data = await response.json(loads=loads)
 
                     if response.status >= 400:
+                        span.set_status(Status(StatusCode.ERROR))
                         logger.error(f"Konsol API error: {response.status} - {response_data}")
-                        raise Exception(f"API Error {response.status}: {response_data}")
+                        raise KonsolAPIError(response.status, response_data)
 
                     logger.info(f"Konsol API request successful: {method} {endpoint}")
                     return response_data
 
         except aiohttp.ClientError as e:
+            KONSOL_RESPONSES.labels(method, label, "connection_error").inc()
             logger.error(f"Konsol API connection error: {e}")
             raise Exception(f"Connection error: {e}")
         except Exception as e:
             logger.error(f"Konsol API request error: {e}")
             raise
 
-    async def create_payment(self, payment_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_payment(self, payment_data: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Создает новый платёж
 
@@ -73,9 +123,10 @@ class KonsolAPIClient:
             "purpose": "Назначение",
             "amount": "100.00"
         }
+        :param idempotency_key: Ключ, по которому повтор запроса не создаёт второй платёж
         :return: Ответ API
         """
-        return await self._make_request("POST", "/api/v1/payments", data=payment_data)
+        return await self._make_request("POST", "/api/v1/payments", data=payment_data, idempotency_key=idempotency_key)
 
     async def get_payment(self, payment_id: str) -> Dict[str, Any]:
         """
@@ -105,7 +156,7 @@ class KonsolAPIClient:
         return await self._make_request("GET", "/api/v1/company_accounts")
 
     # === НОВЫЙ МЕТОД ===
-    async def create_contractor(self, contractor_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_contractor(self, contractor_data: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Создает нового контрактора в Konsol API
 
@@ -115,7 +166,7 @@ class KonsolAPIClient:
         }
         :return: Ответ API (обычно с id контрактора)
         """
-        return await self._make_request("POST", "/api/v1/contractors", data=contractor_data)
+        return await self._make_request("POST", "/api/v1/contractors", data=contractor_data, idempotency_key=idempotency_key)
 
 
 # Глобальный экземпляр клиента
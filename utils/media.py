@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from core.logger import bot_logger as logger
+from db.beanie.models import MediaFile
+from db.beanie.models.models import moscow_now
+
+# Методы отправки по типу файла
+SEND_METHODS = {
+    "photo": "send_photo",
+    "document": "send_document",
+    "video": "send_video",
+    "animation": "send_animation",
+}
+
+
+def sent_file_id(message: Message, kind: str) -> str:
+    """
+    file_id из отправленного сообщения (у фото — самый большой размер)
+    """
+    media = getattr(message, kind)
+    return media[-1].file_id if kind == "photo" else media.file_id
+
+
+def is_file_id_error(error: TelegramBadRequest) -> bool:
+    """
+    Telegram отклонил сам file_id: "wrong file identifier", "wrong remote file identifier",
+    "FILE_REFERENCE_EXPIRED" и т.п.
+    """
+    return "file" in error.message.lower()
+
+
+class StaticMedia:
+    """
+    Отправка статических файлов (картинка на /start и т.п.) по file_id.
+
+    Файл загружается в Telegram один раз, file_id сохраняется в Mongo по хэшу содержимого.
+    Изменился файл — изменился хэш, файл загружается заново. Если Telegram не принял
+    сохранённый file_id, запись удаляется и файл тоже загружается заново.
+    """
+
+    def __init__(self):
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}  # path -> (mtime_ns, size, sha256)
+        self._file_ids: Dict[Tuple[int, str, str], str] = {}  # (bot_id, kind, sha256) -> file_id
+        self._locks: Dict[Tuple[int, str, str], asyncio.Lock] = {}
+
+    def content_hash(self, path: str) -> str:
+        """
+        sha256 файла. Пересчитывается только при изменении mtime или размера.
+        """
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(65536), b""):
+                digest.update(chunk)
+        self._hashes[path] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+        return digest.hexdigest()
+
+    async def get_file_id(self, key: Tuple[int, str, str]) -> Optional[str]:
+        if key in self._file_ids:
+            return self._file_ids[key]
+        bot_id, kind, sha256 = key
+        media = await MediaFile.find_one({"bot_id": bot_id, "kind": kind, "sha256": sha256})
+        if media:
+            self._file_ids[key] = media.file_id
+            return media.file_id
+        return None
+
+    async def save_file_id(self, key: Tuple[int, str, str], path: str, file_id: str) -> None:
+        bot_id, kind, sha256 = key
+        self._file_ids[key] = file_id
+        await MediaFile.get_motor_collection().update_one(
+            {"bot_id": bot_id, "kind": kind, "sha256": sha256},
+            {"$set": {"path": path, "file_id": file_id, "uploaded_at": moscow_now()}},
+            upsert=True
+        )
+
+    async def forget(self, key: Tuple[int, str, str]) -> None:
+        bot_id, kind, sha256 = key
+        self._file_ids.pop(key, None)
+        await MediaFile.get_motor_collection().delete_one({"bot_id": bot_id, "kind": kind, "sha256": sha256})
+
+    async def send(self, bot: Bot, chat_id: int, path: str, kind: str = "photo", **kwargs: Any) -> Message:
+        """
+        Отправляет файл по file_id, при необходимости загружая его
+
+        :param bot: Бот
+        :param chat_id: Чат
+        :param path: Путь к файлу
+        :param kind: photo / document / video / animation
+        :param kwargs: Остальные параметры метода (caption, reply_markup, ...)
+        """
+        send_method = getattr(bot, SEND_METHODS[kind])
+        key = (bot.id, kind, self.content_hash(path))
+
+        file_id = await self.get_file_id(key)
+        if file_id:
+            try:
+                return await send_method(chat_id, file_id, **kwargs)
+            except TelegramBadRequest as e:
+                # Остальные ошибки (chat not found, caption too long, ...) не связаны с file_id
+                if not is_file_id_error(e):
+                    raise
+                logger.warning(f"Stored file_id for {path} rejected, re-uploading: {e}")
+                await self.forget(key)
+
+        # Одна загрузка на файл, даже если /start пришёл от многих пользователей одновременно
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            file_id = self._file_ids.get(key)
+            if file_id:
+                return await send_method(chat_id, file_id, **kwargs)
+
+            message = await send_method(chat_id, FSInputFile(path), **kwargs)
+            await self.save_file_id(key, path, sent_file_id(message, kind))
+            logger.info(f"Uploaded {path} to Telegram")
+            return message
+
+
+# Глобальный экземпляр
+static_media = StaticMedia()
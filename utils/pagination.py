@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from beanie import Document
+from beanie.odm.utils.parsing import parse_obj
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from core.mongo import analytics_collection
+
+# Порядок выдачи: сначала новые, при равном created_at — по _id
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+
+
+class InvalidCursor(Exception):
+    """Курсор страницы повреждён или подделан"""
+    pass
+
+
+def encode_cursor(created_at: datetime, object_id: ObjectId) -> str:
+    """
+    Курсор следующей страницы: позиция последнего элемента текущей
+    """
+    raw = json.dumps({"c": created_at.isoformat(), "i": str(object_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """
+    Разбирает курсор, созданный `encode_cursor`
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["c"]), ObjectId(data["i"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_filter(cursor: str) -> Dict[str, Any]:
+    """
+    Условие «после курсора» для сортировки KEYSET_SORT
+    """
+    created_at, object_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": object_id}}
+        ]
+    }
+
+
+async def paginate(
+        model: Type[Document],
+        query: Dict[str, Any],
+        cursor: Optional[str],
+        limit: int
+) -> Tuple[List[Document], Optional[str]]:
+    """
+    Keyset пагинация по (created_at, _id): глубокие страницы не дороже первой,
+    в отличие от skip/limit
+
+    :param model: Beanie модель с полем created_at
+    :param query: Фильтр Mongo
+    :param cursor: Курсор из предыдущего ответа
+    :param limit: Размер страницы
+    :return: (документы страницы, курсор следующей страницы или None)
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(cursor)]} if query else keyset_filter(cursor)
+
+    # Листинги читаются с MONGO_ANALYTICS_READ_PREFERENCE, разбор документов — как в Beanie
+    raw = await analytics_collection(model).find(query).sort(KEYSET_SORT).limit(limit + 1).to_list(None)
+    docs = [parse_obj(model, doc) for doc in raw]
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1].created_at, docs[-1].id)
+
+    return docs, next_cursor
+
+
+def date_range_filter(date_from: Optional[datetime], date_to: Optional[datetime]) -> Dict[str, Any]:
+    """
+    Условие по created_at: [date_from, date_to)
+    """
+    condition = {}
+    if date_from:
+        condition["$gte"] = date_from
+    if date_to:
+        condition["$lt"] = date_to
+    return {"created_at": condition} if condition else {}
@@ -0,0 +1,130 @@
+import asyncio
+import contextlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from aiogram import Bot
+from beanie.operators import In, Or, LT, Eq
+from pymongo import UpdateOne
+
+from config import cnf
+from core.logger import bot_logger as logger
+from db.beanie.models.models import KonsolPayment, KONSOL_PENDING_STATUSES, MOSCOW_TZ
+from utils.payment_status import apply_payment_status, fetch_payment_statuses, notify_payment_status, is_terminal
+
+
+class PaymentReconciler:
+    """
+    Фоновая сверка статусов платежей с konsol.pro.
+
+    Каждый проход берёт пачку незавершённых платежей (индекс `status`), которые давно
+    не сверялись, опрашивает konsol.pro с ограничением параллельности, одним bulk_write
+    отмечает сверку, а изменившиеся статусы применяет через apply_payment_status.
+    Если за проход ничего не изменилось, интервал между проходами удваивается
+    до RECONCILE_MAX_INTERVAL, при изменениях — сбрасывается до минимального.
+    """
+
+    def __init__(self):
+        self.min_interval = cnf.konsol.RECONCILE_MIN_INTERVAL
+        self.max_interval = max(cnf.konsol.RECONCILE_MAX_INTERVAL, self.min_interval)
+        self.concurrency = cnf.konsol.RECONCILE_CONCURRENCY
+        self.batch_size = cnf.konsol.RECONCILE_BATCH_SIZE
+        self.interval = self.min_interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, bot: Bot) -> None:
+        """
+        Запускает фоновую задачу сверки
+        """
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(bot))
+        logger.info("Payment reconciler started")
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновую задачу сверки
+        """
+        if not self._task:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Payment reconciler stopped")
+
+    async def _run(self, bot: Bot) -> None:
+        while True:
+            try:
+                changed = await self.reconcile_once(bot)
+            except Exception as e:
+                logger.error(f"Payment reconciliation failed: {e}")
+                changed = 0
+
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * 2, self.max_interval)
+
+            await asyncio.sleep(self.interval)
+
+    async def reconcile_once(self, bot: Bot) -> int:
+        """
+        Один проход сверки
+
+        :param bot: Бот для уведомлений
+        :return: Количество платежей, у которых изменился статус
+        """
+        now = datetime.now(MOSCOW_TZ)
+        checked_before = now - timedelta(seconds=self.min_interval)
+
+        payments = await KonsolPayment.find(
+            In(KonsolPayment.status, list(KONSOL_PENDING_STATUSES)),
+            Or(Eq(KonsolPayment.checked_at, None), LT(KonsolPayment.checked_at, checked_before))
+        ).sort("+checked_at").limit(self.batch_size).to_list()
+
+        payments = [payment for payment in payments if payment.konsol_id]
+        if not payments:
+            return 0
+
+        api_results = await fetch_payment_statuses(
+            (payment.konsol_id for payment in payments),
+            concurrency=self.concurrency
+        )
+
+        requests = []
+        changes = []
+        for payment in payments:
+            api_result = api_results.get(payment.konsol_id)
+            if not api_result:
+                continue
+
+            new_status = api_result.get("status")
+            if new_status and new_status != payment.status:
+                changes.append((payment, new_status))
+                continue
+
+            # Условие по старому статусу защищает от гонки с другими обновлениями
+            requests.append(UpdateOne(
+                {"_id": payment.id, "status": payment.status},
+                {"$set": {"checked_at": now}}
+            ))
+
+        if requests:
+            await KonsolPayment.get_motor_collection().bulk_write(requests, ordered=False)
+
+        # Изменения применяются по одному с условием на статус: уведомление и счётчики — только
+        # для платежей, которые изменил этот проход, а не вебхук или параллельная сверка
+        changed = 0
+        for payment, new_status in changes:
+            if not await apply_payment_status(payment, new_status, now):
+                continue
+            changed += 1
+            if is_terminal(new_status):
+                await notify_payment_status(bot, payment, new_status)
+
+        return changed
+
+
+# Глобальный экземпляр
+payment_reconciler = PaymentReconciler()
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, Optional
+
+from aiogram import Bot
+
+from config import cnf
+from core.logger import bot_logger as logger
+from db.beanie.models.models import KonsolPayment, Claim, KONSOL_TERMINAL_STATUSES, MOSCOW_TZ
+from utils.konsol_client import konsol_client
+from utils import rollup
+
+# === Тексты уведомлений о смене статуса ===
+user_status_texts = {
+    "executed": "✅ Выплата по заявке {claim_id} зачислена на указанные реквизиты. "
+                "Компания Pure желает Вам крепкого здоровья, и хорошего дня.",
+    "failed": "❌ Не удалось выполнить выплату по заявке {claim_id}. "
+              "Мы свяжемся с Вами для уточнения реквизитов."
+}
+
+manager_status_texts = {
+    "executed": "💸 Платёж {konsol_id} по заявке {claim_id} выполнен",
+    "failed": "⚠️ Платёж {konsol_id} по заявке {claim_id} завершился ошибкой"
+}
+
+
+def is_terminal(status: Optional[str]) -> bool:
+    """Платёж в конечном статусе больше не опрашивается"""
+    return status in KONSOL_TERMINAL_STATUSES
+
+
+def build_status_update(payment: KonsolPayment, status: str, now: datetime = None) -> Dict[str, Any]:
+    """
+    Формирует поля для `$set` при смене статуса платежа
+
+    :param payment: Платёж из БД
+    :param status: Новый статус из konsol.pro
+    :param now: Время изменения
+    :return: {"status": ..., "updated_at": ..., "paid_at": ...}
+    """
+    now = now or datetime.now(MOSCOW_TZ)
+    update_data = {"status": status, "updated_at": now}
+    if status == "executed" and not payment.paid_at:
+        update_data["paid_at"] = now
+    return update_data
+
+
+def is_status_fresh(payment: KonsolPayment, max_age: int) -> bool:
+    """
+    Статус в БД можно отдавать без запроса в konsol.pro: платёж завершён
+    или сверялся (webhook / сверка) не позже `max_age` секунд назад
+    """
+    if is_terminal(payment.status):
+        return True
+    if not payment.checked_at:
+        return False
+
+    checked_at = payment.checked_at
+    if checked_at.tzinfo is None:
+        # Mongo возвращает naive datetime в UTC
+        checked_at = checked_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - checked_at).total_seconds() <= max_age
+
+
+async def apply_payment_status(payment: KonsolPayment, status: str, now: datetime = None) -> bool:
+    """
+    Идемпотентно применяет новый статус к платежу и связанной заявке.
+    Платёж в конечном статусе не меняется, повторное применение того же статуса — no-op.
+
+    :param payment: Платёж из БД
+    :param status: Новый статус из konsol.pro
+    :param now: Время изменения
+    :return: True, если статус изменился
+    """
+    now = now or datetime.now(MOSCOW_TZ)
+    update_data = build_status_update(payment, status, now)
+    update_data["checked_at"] = now
+
+    result = await KonsolPayment.get_motor_collection().update_one(
+        {"_id": payment.id, "status": {"$nin": [*KONSOL_TERMINAL_STATUSES, status]}},
+        {"$set": update_data}
+    )
+    if not result.modified_count:
+        # Статус уже применён или платёж завершён — только отмечаем сверку
+        await KonsolPayment.get_motor_collection().update_one(
+            {"_id": payment.id},
+            {"$set": {"checked_at": now}}
+        )
+        return False
+
+    if payment.claim_id:
+        await Claim.get_motor_collection().update_one(
+            {"claim_id": payment.claim_id},
+            {"$set": {"payment_status": status, "updated_at": now}}
+        )
+
+    if status == "executed":
+        await rollup.bump(payouts_executed=1, payouts_amount=payment.amount)
+
+    logger.info(f"Payment {payment.konsol_id} status changed: {payment.status} -> {status}")
+    return True
+
+
+async def fetch_payment_statuses(
+        konsol_ids: Iterable[str],
+        concurrency: int
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Параллельно запрашивает платежи в konsol.pro, не более `concurrency` запросов одновременно.
+    Платежи, по которым запрос не удался, в результат не попадают.
+
+    :param konsol_ids: ID платежей в konsol.pro
+    :param concurrency: Максимум одновременных запросов
+    :return: {konsol_id: ответ API}
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(konsol_id: str):
+        async with semaphore:
+            try:
+                return konsol_id, await konsol_client.get_payment(konsol_id)
+            except Exception as e:
+                logger.warning(f"Failed to fetch payment {konsol_id}: {e}")
+                return konsol_id, None
+
+    results = await asyncio.gather(*(fetch(konsol_id) for konsol_id in konsol_ids))
+    return {konsol_id: result for konsol_id, result in results if result}
+
+
+async def notify_payment_status(bot: Bot, payment: KonsolPayment, status: str) -> None:
+    """
+    Уведомляет пользователя и группу менеджеров о конечном статусе платежа
+    """
+    if status not in user_status_texts:
+        return
+
+    if payment.user_id:
+        try:
+            await bot.send_message(
+                chat_id=payment.user_id,
+                text=user_status_texts[status].format(claim_id=payment.claim_id)
+            )
+        except Exception as e:
+            logger.warning(f"Failed to notify user {payment.user_id} about payment {payment.konsol_id}: {e}")
+
+    try:
+        await bot.send_message(
+            chat_id=cnf.bot.GROUP_ID,
+            text=manager_status_texts[status].format(konsol_id=payment.konsol_id, claim_id=payment.claim_id)
+        )
+    except Exception as e:
+        logger.warning(f"Failed to notify managers about payment {payment.konsol_id}: {e}")
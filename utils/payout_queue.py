@@ -0,0 +1,411 @@
+import asyncio
+import contextlib
+import os
+import uuid
+from datetime import timedelta
+from typing import List, Optional
+
+from aiogram import Bot
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from bot.templates.admin.menu import claim_action_ikb
+from config import cnf
+from core.logger import bot_logger as logger
+from core.tracing import claim_span
+from db.beanie.models import Claim, KonsolPayment, PayoutJob
+from db.beanie.models.models import PAYOUT_JOB_ACTIVE_STATUSES, moscow_now
+from utils import rollup
+from utils.konsol_client import KonsolAPIError, konsol_client
+
+PAYMENT_PURPOSE = "Выплата выигрыша"
+USER_PAID_TEXT = "✅ Ваш выигрыш отправлен на указанные реквизиты. Компания Pure желает Вам крепкого здоровья, и хорошего дня."
+
+# Итог задания -> статус в сообщении группы менеджеров
+RESULT_LABELS = {
+    "queued": "В очереди на выплату ⏳",
+    "done": "Подтверждено ✅",
+    "failed": "Ошибка выплаты ❌",
+    "review": "Проверьте платёж в Konsol вручную ⚠️",
+}
+
+
+class PayoutAmbiguous(Exception):
+    """Неизвестно, создан ли платёж в Konsol — повторять запрос нельзя"""
+
+
+class PayoutFailed(Exception):
+    """Выплата невозможна, повтор не поможет"""
+
+
+async def enqueue_payout(
+        claim: Claim,
+        admin_id: int,
+        chat_id: int,
+        message_id: int,
+        message_is_photo: bool,
+        message_prefix: str
+) -> PayoutJob:
+    """
+    Ставит выплату по заявке в очередь. Повторное подтверждение той же заявки
+    возвращает уже существующее задание, а завершившееся ошибкой (failed) ставит в очередь заново.
+    """
+    try:
+        job = await PayoutJob.create(
+            claim_id=claim.claim_id,
+            contractor_id=claim.contractor_id,
+            admin_id=admin_id,
+            chat_id=chat_id,
+            message_id=message_id,
+            message_is_photo=message_is_photo,
+            message_prefix=message_prefix
+        )
+    except DuplicateKeyError:
+        requeued = await requeue_payout(claim.claim_id, admin_id=admin_id)
+        return requeued or await PayoutJob.get(claim_id=claim.claim_id)
+
+    payout_worker.wake()
+    return job
+
+
+async def requeue_payout(claim_id: str, force: bool = False, admin_id: Optional[int] = None) -> Optional[PayoutJob]:
+    """
+    Возвращает в очередь задание в статусе failed; review — только с force, после ручной проверки,
+    что платёж в Konsol не создан. Попытки считаются заново, выполнение продолжается с шага, на котором
+    задание остановилось. Если платёж так и не был создан, запрос на его создание повторяется
+    (с тем же ключом идемпотентности).
+
+    :return: Задание или None, если его нет или оно не в подходящем статусе
+    """
+    job = await PayoutJob.get(claim_id=claim_id)
+    if not job or job.status not in (("failed", "review") if force else ("failed",)):
+        return None
+
+    now = moscow_now()
+    fields = {
+        "status": "queued",
+        "attempts": 0,
+        "last_error": None,
+        "lease_owner": None,
+        "lease_until": None,
+        "next_run_at": now,
+        "updated_at": now
+    }
+    if not job.konsol_payment_id:
+        fields["payment_requested_at"] = None
+    if admin_id is not None:
+        fields["admin_id"] = admin_id
+
+    # Условие на статус: два одновременных повтора не поставят задание дважды
+    result = await PayoutJob.get_motor_collection().update_one(
+        {"_id": job.id, "status": job.status},
+        {"$set": fields}
+    )
+    if not result.modified_count:
+        return None
+
+    logger.info("Payout requeued", extra={"claim_id": claim_id, "payout_status": job.status})
+    payout_worker.wake()
+    return await PayoutJob.get(claim_id=claim_id)
+
+
+class PayoutWorker:
+    """
+    Пул воркеров очереди выплат.
+
+    Задание берётся атомарно (find_one_and_update) с арендой на VISIBILITY_TIMEOUT секунд:
+    если воркер упал, задание снова станет доступно. Шаги (контрактор, платёж, запись в БД,
+    уведомления) сохраняют результат в задании, поэтому после сбоя выполнение продолжается
+    с незавершённого шага. Если сбой случился во время запроса на создание платежа,
+    задание уходит на ручную проверку, чтобы не выплатить дважды.
+    """
+
+    def __init__(self):
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._bot: Optional[Bot] = None
+
+    def start(self, bot: Bot) -> None:
+        """
+        Запускает воркеры
+        """
+        if self._tasks:
+            return
+        self._bot = bot
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(cnf.payout.WORKERS)]
+        logger.info(f"Payout worker started ({cnf.payout.WORKERS} workers)")
+
+    def wake(self) -> None:
+        """
+        Будит воркеры после постановки задания в очередь
+        """
+        self._wakeup.set()
+
+    async def stop(self, timeout: float = 30) -> None:
+        """
+        Даёт текущим заданиям завершиться, затем останавливает воркеры.
+        Незавершённые задания вернутся в очередь по истечении аренды.
+        """
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        logger.info("Payout worker stopped")
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                job = await self.lease()
+            except Exception as e:
+                logger.error(f"Failed to lease payout job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=cnf.payout.POLL_INTERVAL)
+                continue
+
+            await self.process(job)
+
+    async def lease(self) -> Optional[PayoutJob]:
+        """
+        Берёт одно готовое к выполнению задание
+        """
+        now = moscow_now()
+        doc = await PayoutJob.get_motor_collection().find_one_and_update(
+            {
+                "status": {"$in": list(PAYOUT_JOB_ACTIVE_STATUSES)},
+                "next_run_at": {"$lte": now},
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "lease_owner": self.owner,
+                    "lease_until": now + timedelta(seconds=cnf.payout.VISIBILITY_TIMEOUT),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        return PayoutJob.model_validate(doc) if doc else None
+
+    async def save(self, job: PayoutJob, **fields) -> None:
+        """
+        Сохраняет результат шага, пока аренда задания принадлежит этому воркеру
+        """
+        fields["updated_at"] = moscow_now()
+        result = await PayoutJob.get_motor_collection().update_one(
+            {"_id": job.id, "lease_owner": self.owner},
+            {"$set": fields}
+        )
+        if not result.matched_count:
+            raise RuntimeError(f"Lease on payout job {job.claim_id} lost")
+        for key, value in fields.items():
+            setattr(job, key, value)
+
+    async def process(self, job: PayoutJob) -> None:
+        with claim_span("claim.payout", job.claim_id, **{"payout.attempt": job.attempts, "payout.step": job.step}):
+            try:
+                await self.run_steps(job)
+            except PayoutAmbiguous as e:
+                logger.error(f"Payout {job.claim_id} needs manual review: {e}")
+                await self.finish(job, "review", str(e))
+            except PayoutFailed as e:
+                logger.error(f"Payout {job.claim_id} failed: {e}")
+                await self.finish(job, "failed", str(e))
+            except KonsolAPIError as e:
+                if e.status >= 500:
+                    await self.retry(job, e)
+                else:
+                    logger.error(f"Payout {job.claim_id} rejected by Konsol: {e}")
+                    await self.finish(job, "failed", str(e))
+            except Exception as e:
+                await self.retry(job, e)
+
+    async def retry(self, job: PayoutJob, error: Exception) -> None:
+        if job.attempts >= cnf.payout.MAX_ATTEMPTS:
+            logger.error(f"Payout {job.claim_id} failed after {job.attempts} attempts: {error}")
+            await self.finish(job, "failed", str(error))
+            return
+
+        delay = cnf.payout.RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        logger.warning(f"Payout {job.claim_id} attempt {job.attempts} failed, retry in {delay}s: {error}")
+        with contextlib.suppress(Exception):
+            await self.save(
+                job,
+                status="queued",
+                last_error=str(error),
+                lease_owner=None,
+                lease_until=None,
+                next_run_at=moscow_now() + timedelta(seconds=delay)
+            )
+
+    async def finish(self, job: PayoutJob, status: str, error: Optional[str] = None) -> None:
+        with contextlib.suppress(Exception):
+            await self.save(job, status=status, last_error=error, lease_owner=None, lease_until=None)
+        await self.update_group_message(job, status)
+
+    async def run_steps(self, job: PayoutJob) -> None:
+        claim = await Claim.get(claim_id=job.claim_id)
+        if not claim:
+            raise PayoutFailed(f"Claim {job.claim_id} not found")
+
+        # === 1. Контрактор ===
+        if job.step == "contractor":
+            if not job.contractor_id:
+                contractor = await konsol_client.create_contractor(
+                    {
+                        "kind": "individual",
+                        "first_name": claim.claim_id,
+                        "last_name": "Заявка",
+                        # Если СБП - используем реальный телефон из заявки, если карта - заглушку
+                        "phone": claim.phone or "+79000" + claim.claim_id
+                    },
+                    idempotency_key=f"contractor-{claim.claim_id}"
+                )
+                await self.save(job, contractor_id=contractor["id"])
+                await claim.update(contractor_id=contractor["id"])
+                logger.info("Contractor created", extra={"claim_id": claim.claim_id, "contractor_id": contractor["id"]})
+            await self.save(job, step="payment")
+
+        # === 2. Платёж ===
+        if job.step == "payment":
+            if job.payment_requested_at and not job.konsol_payment_id:
+                raise PayoutAmbiguous("предыдущий запрос на создание платежа прервался")
+
+            await self.save(job, payment_requested_at=moscow_now())
+            try:
+                result = await konsol_client.create_payment(payment_data(claim, job.contractor_id),
+                                                            idempotency_key=f"payout-{claim.claim_id}")
+            except KonsolAPIError as e:
+                if e.status < 500:
+                    raise
+                raise PayoutAmbiguous(str(e))
+            except Exception as e:
+                raise PayoutAmbiguous(str(e))
+
+            await self.save(job, konsol_payment_id=result.get("id"), payment_status=result.get("status"), step="save")
+            logger.info("Payment created", extra={"claim_id": claim.claim_id, "konsol_id": job.konsol_payment_id})
+
+        # === 3. Запись в БД ===
+        if job.step == "save":
+            await save_payment(claim, job)
+            await self.save(job, step="notify")
+
+        # === 4. Уведомления ===
+        if job.step == "notify":
+            try:
+                await self._bot.send_message(chat_id=claim.user_id, text=USER_PAID_TEXT)
+            except Exception as e:
+                logger.warning("User notification failed: %s", e, extra={"user_id": claim.user_id})
+            await self.save(job, step="done", status="done", lease_owner=None, lease_until=None)
+            await self.update_group_message(job, "done")
+
+    async def update_group_message(self, job: PayoutJob, status: str) -> None:
+        """
+        Обновляет статус заявки в сообщении группы менеджеров
+        """
+        if not job.chat_id or not job.message_id:
+            return
+        await update_claim_message(self._bot, job, status)
+
+
+def payment_data(claim: Claim, contractor_id: str) -> dict:
+    """
+    Тело запроса на создание платежа по заявке
+    """
+    if claim.phone:
+        bank_details_kind = "fps"
+        bank_details = {
+            "fps_mobile_phone": claim.phone,
+            "fps_bank_member_id": claim.bank_member_id
+        }
+    else:
+        bank_details_kind = "card"
+        bank_details = {
+            "card_number": claim.card
+        }
+
+    return {
+        "contractor_id": contractor_id,
+        "services_list": [
+            {
+                "title": f"Выплата по заявке {claim.claim_id}",
+                "amount": str(claim.amount)
+            }
+        ],
+        "bank_details_kind": bank_details_kind,
+        "bank_details": bank_details,
+        "purpose": PAYMENT_PURPOSE,
+        "amount": str(claim.amount)
+    }
+
+
+async def save_payment(claim: Claim, job: PayoutJob) -> None:
+    """
+    Сохраняет платёж и подтверждает заявку. Повторный вызов ничего не дублирует.
+    """
+    if not await KonsolPayment.get(konsol_id=job.konsol_payment_id):
+        data = payment_data(claim, job.contractor_id)
+        await KonsolPayment.create(
+            konsol_id=job.konsol_payment_id,
+            contractor_id=job.contractor_id,
+            amount=claim.amount,
+            status=job.payment_status,
+            purpose=data["purpose"],
+            services_list=data["services_list"],
+            bank_details_kind=data["bank_details_kind"],
+            card_number=claim.card,
+            phone_number=claim.phone,
+            bank_member_id=claim.bank_member_id,
+            claim_id=claim.claim_id,
+            user_id=claim.user_id
+        )
+
+    result = await Claim.get_motor_collection().update_one(
+        {"claim_id": claim.claim_id, "claim_status": {"$ne": "confirm"}},
+        {"$set": {
+            "claim_status": "confirm",
+            "process_status": "complete",
+            "konsol_payment_id": job.konsol_payment_id,
+            "updated_at": moscow_now()
+        }}
+    )
+    if result.modified_count:
+        await rollup.bump(claims_approved=1)
+
+
+async def update_claim_message(bot: Bot, job: PayoutJob, status: str) -> None:
+    text = f"{job.message_prefix} {RESULT_LABELS[status]}"
+    if status in ("failed", "review") and job.last_error:
+        text += f"\n{job.last_error[:200]}"
+    # После ошибки кнопки возвращаются: повторное подтверждение ставит выплату в очередь заново
+    reply_markup = claim_action_ikb(job.claim_id) if status == "failed" else None
+    try:
+        if job.message_is_photo:
+            await bot.edit_message_caption(
+                chat_id=job.chat_id, message_id=job.message_id, caption=text, reply_markup=reply_markup
+            )
+        else:
+            await bot.edit_message_text(
+                chat_id=job.chat_id, message_id=job.message_id, text=text, reply_markup=reply_markup
+            )
+    except Exception as e:
+        logger.warning("Claim message update failed: %s", e, extra={"claim_id": job.claim_id})
+
+
+# Глобальный экземпляр
+payout_worker = PayoutWorker()
@@ -0,0 +1,182 @@
+import asyncio
+import contextlib
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+from config import cnf
+from core.logger import bot_logger as logger
+from db.beanie.models.models import AdminMessage, Claim, KonsolPayment, KONSOL_TERMINAL_STATUSES, moscow_now
+
+ABANDONED_CLAIMS_TTL_INDEX = "abandoned_claims_ttl"
+ARCHIVE_SUFFIX = "_archive"
+
+# Код ошибки Mongo: индекс с таким именем уже есть, но с другими параметрами
+INDEX_OPTIONS_CONFLICT = 85
+DUPLICATE_KEY = 11000
+
+
+async def ensure_abandoned_claims_ttl() -> None:
+    """
+    TTL индекс на брошенные заявки: созданы в proceed_to_review, но не дошли до finalize_claim
+    (claim_status = "pending"). Частичный индекс — заявки, ушедшие дальше, под него не попадают.
+    Изменение RETENTION_ABANDONED_CLAIM_DAYS применяется через collMod, 0 — индекс удаляется.
+    """
+    collection = Claim.get_motor_collection()
+    days = cnf.retention.ABANDONED_CLAIM_DAYS
+
+    if not days:
+        with contextlib.suppress(OperationFailure):
+            await collection.drop_index(ABANDONED_CLAIMS_TTL_INDEX)
+        return
+
+    seconds = days * 24 * 3600
+    try:
+        await collection.create_index(
+            "created_at",
+            name=ABANDONED_CLAIMS_TTL_INDEX,
+            expireAfterSeconds=seconds,
+            partialFilterExpression={"claim_status": "pending"}
+        )
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+        await collection.database.command(
+            "collMod", collection.name,
+            index={"name": ABANDONED_CLAIMS_TTL_INDEX, "expireAfterSeconds": seconds}
+        )
+
+
+async def archive_collection(collection: AsyncIOMotorCollection) -> AsyncIOMotorCollection:
+    """
+    Архивная коллекция `<name>_archive` со сжатием блоков RETENTION_ARCHIVE_COMPRESSOR.
+    Создаётся один раз, индексы горячей коллекции в архив не переносятся.
+    """
+    name = collection.name + ARCHIVE_SUFFIX
+    with contextlib.suppress(CollectionInvalid):
+        await collection.database.create_collection(
+            name,
+            storageEngine={"wiredTiger": {"configString": f"block_compressor={cnf.retention.ARCHIVE_COMPRESSOR}"}}
+        )
+    return collection.database[name]
+
+
+async def move_documents(
+        source: AsyncIOMotorCollection,
+        target: AsyncIOMotorCollection,
+        docs: List[Dict[str, Any]]
+) -> int:
+    """
+    Копирует документы в архив и удаляет из горячей коллекции.
+    Повтор после сбоя безопасен: уже скопированные документы пропускаются по _id.
+    """
+    if not docs:
+        return 0
+    try:
+        await target.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+    result = await source.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+    return result.deleted_count
+
+
+class RetentionService:
+    """
+    Фоновая архивация старых данных.
+
+    Раз в RETENTION_INTERVAL пачками по BATCH_SIZE переносит в архивные коллекции
+    завершённые заявки (confirm / cancelled) вместе с их перепиской и платежи в конечном
+    статусе, которые не менялись дольше ARCHIVE_AFTER_DAYS. Последняя заявка не переносится:
+    по ней generate_next_claim_id выдаёт следующий номер.
+    rollup.backfill читает и архивные коллекции, поэтому пересчёт статистики за архивный период её не уменьшает.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Запускает фоновую задачу архивации
+        """
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Retention service started")
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновую задачу архивации
+        """
+        if not self._task:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Retention service stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.archive_once()
+            except Exception as e:
+                logger.error(f"Archiving failed: {e}")
+            await asyncio.sleep(cnf.retention.INTERVAL)
+
+    async def archive_once(self) -> Dict[str, int]:
+        """
+        Один проход архивации
+
+        :return: Количество перенесённых документов по коллекциям
+        """
+        moved = {"claims": 0, "admin_messages": 0, "konsol_payments": 0}
+        if not cnf.retention.ARCHIVE_AFTER_DAYS:
+            return moved
+        cutoff = moscow_now() - timedelta(days=cnf.retention.ARCHIVE_AFTER_DAYS)
+
+        claims = Claim.get_motor_collection()
+        messages = AdminMessage.get_motor_collection()
+        claims_archive = await archive_collection(claims)
+        messages_archive = await archive_collection(messages)
+
+        last_claim = await claims.find_one({}, projection={"claim_id": 1}, sort=[("claim_id", -1)])
+        claim_filter = {
+            "claim_status": {"$in": ["confirm", "cancelled"]},
+            "updated_at": {"$lt": cutoff},
+            "claim_id": {"$ne": last_claim["claim_id"] if last_claim else None}
+        }
+        while True:
+            batch = await claims.find(claim_filter).sort("_id", 1).limit(cnf.retention.BATCH_SIZE).to_list(None)
+            if not batch:
+                break
+            # Сначала переписка: если проход прервётся, заявка останется и перенесётся вместе с остатком
+            claim_ids = [claim["claim_id"] for claim in batch]
+            while True:
+                message_batch = await messages.find({"claim_id": {"$in": claim_ids}}).limit(
+                    cnf.retention.BATCH_SIZE).to_list(None)
+                if not message_batch:
+                    break
+                moved["admin_messages"] += await move_documents(messages, messages_archive, message_batch)
+            moved["claims"] += await move_documents(claims, claims_archive, batch)
+            if len(batch) < cnf.retention.BATCH_SIZE:
+                break
+
+        payments = KonsolPayment.get_motor_collection()
+        payments_archive = await archive_collection(payments)
+        payment_filter = {"status": {"$in": list(KONSOL_TERMINAL_STATUSES)}, "updated_at": {"$lt": cutoff}}
+        while True:
+            batch = await payments.find(payment_filter).sort("_id", 1).limit(cnf.retention.BATCH_SIZE).to_list(None)
+            moved["konsol_payments"] += await move_documents(payments, payments_archive, batch)
+            if len(batch) < cnf.retention.BATCH_SIZE:
+                break
+
+        if any(moved.values()):
+            logger.info("Archived old documents", extra=moved)
+        return moved
+
+
+# Глобальный экземпляр
+retention_service = RetentionService()
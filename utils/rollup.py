@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Type
+
+from beanie import Document
+from bson import Decimal128
+from pymongo import UpdateOne
+
+from config import cnf
+from core.logger import bot_logger as logger
+from core.mongo import analytics_collection
+from db.beanie.models.models import Claim, DailyStats, KonsolPayment, MOSCOW_TZ
+from utils.retention import ARCHIVE_SUFFIX
+
+# Счётчики, которые можно восстановить по заявкам и платежам (codes_rejected — нельзя)
+BACKFILL_COUNTERS = (
+    "claims_created", "claims_finalized", "claims_approved", "claims_rejected",
+    "payouts_executed", "payouts_amount"
+)
+
+
+def start_of_day(days_ago: int) -> datetime:
+    """
+    Начало дня (по Москве) `days_ago` дней назад
+    """
+    today = datetime.now(MOSCOW_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days_ago)
+
+
+def day_key(at: Optional[datetime] = None) -> str:
+    """
+    Ключ дня по Москве: "2024-01-31"
+    """
+    if at is None:
+        at = datetime.now(MOSCOW_TZ)
+    elif at.tzinfo is None:
+        # Mongo возвращает naive datetime в UTC
+        at = at.replace(tzinfo=timezone.utc)
+    return at.astimezone(MOSCOW_TZ).strftime("%Y-%m-%d")
+
+
+async def bump(at: Optional[datetime] = None, **counters: Any) -> None:
+    """
+    Увеличивает дневные счётчики одним upsert с $inc.
+    Ошибки только логируются — статистика не должна ломать обработку заявок.
+
+    Пример: await bump(claims_approved=1)
+    """
+    inc = {
+        name: Decimal128(str(value)) if isinstance(value, Decimal) else value
+        for name, value in counters.items()
+    }
+    try:
+        await DailyStats.get_motor_collection().update_one(
+            {"day": day_key(at)},
+            {"$inc": inc},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"Failed to update daily stats {counters}: {e}")
+
+
+async def get_rollups(since_day: str) -> List[Dict[str, Any]]:
+    """
+    Дневные счётчики начиная с `since_day` по возрастанию
+    """
+    cursor = analytics_collection(DailyStats).find(
+        {"day": {"$gte": since_day}},
+        projection={"_id": 0}
+    ).sort("day", 1)
+
+    rollups = []
+    async for doc in cursor:
+        amount = doc.get("payouts_amount", 0)
+        doc["payouts_amount"] = str(amount.to_decimal() if isinstance(amount, Decimal128) else amount)
+        rollups.append(doc)
+    return rollups
+
+
+def as_aware(at: datetime) -> datetime:
+    """
+    Mongo возвращает naive datetime в UTC
+    """
+    return at.replace(tzinfo=timezone.utc) if at.tzinfo is None else at
+
+
+async def find_with_archive(
+        model: Type[Document],
+        query: Dict[str, Any],
+        projection: Dict[str, Any],
+        batch_size: int
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Документы горячей коллекции и её архива `<name>_archive` (utils/retention).
+    Документ, который архивация уже скопировала, но ещё не удалила, отдаётся один раз:
+    такими могут быть только документы старше RETENTION_ARCHIVE_AFTER_DAYS, их _id запоминаются.
+    """
+    hot = analytics_collection(model)
+    archive = hot.database.get_collection(hot.name + ARCHIVE_SUFFIX, read_preference=hot.read_preference)
+    archive_days = cnf.retention.ARCHIVE_AFTER_DAYS
+    archived_before = datetime.now(timezone.utc) - timedelta(days=archive_days) if archive_days else None
+
+    candidates = set()
+    async for doc in hot.find(query, projection={**projection, "updated_at": 1}, batch_size=batch_size):
+        updated_at = doc.get("updated_at")
+        if archived_before and updated_at and as_aware(updated_at) < archived_before:
+            candidates.add(doc["_id"])
+        yield doc
+
+    async for doc in archive.find(query, projection=projection, batch_size=batch_size):
+        if doc["_id"] not in candidates:
+            yield doc
+
+
+async def backfill(days: Optional[int] = None, batch_size: int = 1000) -> int:
+    """
+    Пересчитывает дневные счётчики по существующим данным.
+    Документы читаются курсором пачками, в памяти — только счётчики по дням.
+
+    Заявки считаются созданными по created_at, решение (подтверждение / отклонение) —
+    по updated_at. Отправка менеджерам не хранит своего времени, поэтому для неё
+    берётся updated_at ещё не решённых заявок и created_at решённых.
+    codes_rejected не восстанавливается и не перезаписывается.
+
+    Заявки и платежи читаются вместе с архивом. Брошенные заявки удаляются TTL индексом
+    безвозвратно, поэтому за дни старше RETENTION_ABANDONED_CLAIM_DAYS claims_created
+    только увеличивается ($max), но не уменьшается.
+
+    :param days: Глубина пересчёта в днях, None — вся история
+    :param batch_size: Размер пачки курсора
+    :return: Количество пересчитанных дней
+    """
+    since = start_of_day(days - 1) if days else None
+    counters: Dict[str, Dict[str, Any]] = {}
+
+    def add(at: Optional[datetime], name: str, value: Any = 1) -> None:
+        if at is None:
+            return
+        day = day_key(at)
+        if since and day < day_key(since):
+            return
+        day_counters = counters.setdefault(day, {counter: 0 for counter in BACKFILL_COUNTERS})
+        day_counters[name] += value
+
+    claims = find_with_archive(
+        Claim,
+        {"updated_at": {"$gte": since}} if since else {},
+        projection={"created_at": 1, "updated_at": 1, "claim_status": 1},
+        batch_size=batch_size
+    )
+    async for claim in claims:
+        status = claim.get("claim_status")
+        add(claim.get("created_at"), "claims_created")
+        if status == "process":
+            add(claim.get("updated_at"), "claims_finalized")
+        elif status in ("confirm", "cancelled"):
+            add(claim.get("created_at"), "claims_finalized")
+            add(claim.get("updated_at"), "claims_approved" if status == "confirm" else "claims_rejected")
+
+    payments = find_with_archive(
+        KonsolPayment,
+        {"status": "executed", **({"paid_at": {"$gte": since}} if since else {})},
+        projection={"paid_at": 1, "amount": 1},
+        batch_size=batch_size
+    )
+    async for payment in payments:
+        amount = payment.get("amount", 0)
+        amount = amount.to_decimal() if isinstance(amount, Decimal128) else Decimal(str(amount))
+        add(payment.get("paid_at"), "payouts_executed")
+        add(payment.get("paid_at"), "payouts_amount", amount)
+
+    abandoned_days = cnf.retention.ABANDONED_CLAIM_DAYS
+    # Последний день, часть брошенных заявок которого TTL индекс уже мог удалить
+    last_expired_day = day_key(start_of_day(abandoned_days)) if abandoned_days else None
+
+    requests = []
+    for day, day_counters in counters.items():
+        update = {"$set": {**day_counters, "payouts_amount": Decimal128(str(day_counters["payouts_amount"]))}}
+        if last_expired_day and day <= last_expired_day:
+            # Пересчёт даёт только нижнюю границу: сохранённое значение не уменьшаем
+            update["$max"] = {"claims_created": update["$set"].pop("claims_created")}
+        requests.append(UpdateOne({"day": day}, update, upsert=True))
+    for i in range(0, len(requests), batch_size):
+        await DailyStats.get_motor_collection().bulk_write(requests[i:i + batch_size], ordered=False)
+
+    logger.info(f"Daily stats backfilled for {len(counters)} days")
+    return len(counters)
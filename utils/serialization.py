@@ -0,0 +1,46 @@
+from decimal import Decimal
+from typing import Any, Union
+
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import ORJSONResponse as BaseORJSONResponse
+
+# Ключи-числа (tg_id) превращаются в строки, как в стандартном json
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def default(obj: Any) -> Any:
+    """
+    Типы, которых нет в orjson. Суммы — строкой без потери точности, как в payment_to_dict
+    и в запросах к konsol.pro ("100.00"); datetime orjson пишет сам в ISO 8601, как isoformat()
+    """
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> str:
+    """
+    json.dumps на orjson (для aiohttp json_serialize)
+    """
+    return orjson.dumps(obj, default=default, option=ORJSON_OPTIONS).decode()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    json.loads на orjson
+    """
+    return orjson.loads(data)
+
+
+class ORJSONResponse(BaseORJSONResponse):
+    """
+    Ответ API, сериализуемый orjson, с Decimal / ObjectId
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=default, option=ORJSON_OPTIONS)
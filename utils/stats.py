@@ -0,0 +1,180 @@
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from config import cnf
+from core.mongo import analytics_collection
+from db.beanie.models.models import Claim, KonsolPayment
+from utils.rollup import get_rollups, start_of_day
+
+TIMEZONE = "Europe/Moscow"
+
+
+def day_expr(field: str) -> Dict[str, Any]:
+    """
+    Выражение агрегации: дата поля в формате YYYY-MM-DD по Москве
+    """
+    return {"$dateToString": {"format": "%Y-%m-%d", "date": f"${field}", "timezone": TIMEZONE}}
+
+
+async def aggregate_claims(since: datetime) -> List[Dict[str, Any]]:
+    """
+    Заявки по дню создания и статусу + суммарное время до подтверждения
+    """
+    pipeline = [
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$group": {
+            "_id": {"day": day_expr("created_at"), "status": "$claim_status"},
+            "count": {"$sum": 1},
+            "latency_ms": {"$sum": {"$cond": [
+                {"$eq": ["$claim_status", "confirm"]},
+                {"$subtract": ["$updated_at", "$created_at"]},
+                0
+            ]}},
+            "max_latency_ms": {"$max": {"$cond": [
+                {"$eq": ["$claim_status", "confirm"]},
+                {"$subtract": ["$updated_at", "$created_at"]},
+                None
+            ]}}
+        }}
+    ]
+    return await analytics_collection(Claim).aggregate(pipeline).to_list(length=None)
+
+
+async def aggregate_payouts(since: datetime) -> List[Dict[str, Any]]:
+    """
+    Выполненные выплаты по дню оплаты и способу
+    """
+    pipeline = [
+        {"$match": {"status": "executed", "paid_at": {"$gte": since}}},
+        {"$group": {
+            "_id": {"day": day_expr("paid_at"), "kind": "$bank_details_kind"},
+            "count": {"$sum": 1},
+            "amount": {"$sum": {"$toDecimal": "$amount"}}
+        }}
+    ]
+    return await analytics_collection(KonsolPayment).aggregate(pipeline).to_list(length=None)
+
+
+def empty_day() -> Dict[str, Any]:
+    return {"claims": {}, "latency_ms": 0, "max_latency_ms": 0, "payouts": {}}
+
+
+class StatsService:
+    """
+    Статистика для админки и API.
+
+    Считается агрегациями на стороне Mongo по дням. Дни кэшируются: при обновлении
+    пересчитываются только последние REFRESH_DAYS дней, более старые берутся из кэша.
+    """
+
+    def __init__(self):
+        self._days: Dict[str, Dict[str, Any]] = {}
+        self._covered_since: Optional[datetime] = None
+        self._refreshed_at: float = 0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, history_days: int) -> None:
+        """
+        Пересчитывает дни, которые могли измениться
+        """
+        since = start_of_day(history_days - 1)
+        if self._covered_since and self._covered_since <= since:
+            # История уже есть — пересчитываем только «живое» окно
+            since = max(since, start_of_day(cnf.stats.REFRESH_DAYS - 1))
+
+        claims, payouts = await asyncio.gather(aggregate_claims(since), aggregate_payouts(since))
+
+        days: Dict[str, Dict[str, Any]] = {}
+        for row in claims:
+            day = days.setdefault(row["_id"]["day"], empty_day())
+            day["claims"][row["_id"]["status"]] = row["count"]
+            day["latency_ms"] += row["latency_ms"] or 0
+            day["max_latency_ms"] = max(day["max_latency_ms"], row["max_latency_ms"] or 0)
+
+        for row in payouts:
+            day = days.setdefault(row["_id"]["day"], empty_day())
+            day["payouts"][row["_id"]["kind"]] = {
+                "count": row["count"],
+                "amount": str(row["amount"].to_decimal())
+            }
+
+        since_day = since.strftime("%Y-%m-%d")
+        self._days = {day: data for day, data in self._days.items() if day < since_day}
+        self._days.update(days)
+        if not self._covered_since or since < self._covered_since:
+            self._covered_since = since
+        self._refreshed_at = time.monotonic()
+
+    async def get(self, history_days: int = None) -> Dict[str, Any]:
+        """
+        Статистика за последние `history_days` дней
+
+        :return: {
+            "days": [{"day": "2024-01-01", "claims": {"confirm": 3, ...}, "payouts": {...}}],
+            "rollups": [{"day": "2024-01-01", "claims_created": 5, "codes_rejected": 2, ...}],
+            "claims_by_status": {...},
+            "approval_latency": {"count", "avg_seconds", "max_seconds"},
+            "payouts": {"fps": {"count", "amount"}, "card": {...}},
+            "conversion": {"created", "finalized", "approved", "finalized_rate", "approved_rate"}
+        }
+        """
+        history_days = history_days or cnf.stats.HISTORY_DAYS
+
+        async with self._lock:
+            expired = time.monotonic() - self._refreshed_at > cnf.stats.CACHE_TTL
+            not_covered = not self._covered_since or self._covered_since > start_of_day(history_days - 1)
+            if expired or not_covered:
+                await self.refresh(history_days)
+
+        stats = self.summarize(history_days)
+        # Дневные счётчики читаются из daily_stats, история не пересчитывается
+        stats["rollups"] = await get_rollups(stats["since"])
+        return stats
+
+    def summarize(self, history_days: int) -> Dict[str, Any]:
+        since_day = start_of_day(history_days - 1).strftime("%Y-%m-%d")
+        days = sorted((day, data) for day, data in self._days.items() if day >= since_day)
+
+        claims_by_status: Dict[str, int] = {}
+        payouts: Dict[str, Dict[str, Any]] = {}
+        latency_ms = max_latency_ms = 0
+        for _, data in days:
+            for status, count in data["claims"].items():
+                claims_by_status[status] = claims_by_status.get(status, 0) + count
+            for kind, payout in data["payouts"].items():
+                total = payouts.setdefault(kind, {"count": 0, "amount": "0"})
+                total["count"] += payout["count"]
+                total["amount"] = str(Decimal(total["amount"]) + Decimal(payout["amount"]))
+            latency_ms += data["latency_ms"]
+            max_latency_ms = max(max_latency_ms, data["max_latency_ms"])
+
+        created = sum(claims_by_status.values())
+        # Заявка создаётся после ввода кода в статусе pending, finalize_claim переводит её дальше
+        finalized = created - claims_by_status.get("pending", 0)
+        approved = claims_by_status.get("confirm", 0)
+
+        return {
+            "since": since_day,
+            "days": [{"day": day, **data} for day, data in days],
+            "claims_by_status": claims_by_status,
+            "approval_latency": {
+                "count": approved,
+                "avg_seconds": round(latency_ms / approved / 1000, 1) if approved else None,
+                "max_seconds": round(max_latency_ms / 1000, 1) if approved else None
+            },
+            "payouts": payouts,
+            "conversion": {
+                "created": created,
+                "finalized": finalized,
+                "approved": approved,
+                "finalized_rate": round(finalized / created, 4) if created else None,
+                "approved_rate": round(approved / created, 4) if created else None
+            }
+        }
+
+
+# Глобальный экземпляр
+stats_service = StatsService()
@@ -0,0 +1,276 @@
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from config import cnf
+from core.logger import bot_logger as logger
+
+# Правило хэндлера ввода кода: к нему применяется блокировка за неверные коды
+CODE_RULE = "code"
+
+# Token bucket атомарно на стороне Redis. Время берётся из Redis, чтобы реплики с разными часами
+# считали одинаково. Возвращает 0, если токен выдан, иначе секунды до следующего токена.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+# Скользящее окно по двум соседним фиксированным окнам: счётчик прошлого окна учитывается
+# с весом, убывающим по мере хода текущего. Возвращает 0, если запрос учтён, иначе секунды до повтора.
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local index = math.floor(now / window)
+local elapsed = now - index * window
+local current_key = KEYS[1] .. ':' .. index
+local current = tonumber(redis.call('GET', current_key)) or 0
+local previous = tonumber(redis.call('GET', KEYS[1] .. ':' .. (index - 1))) or 0
+if previous * (1 - elapsed / window) + current + 1 <= limit then
+    redis.call('INCR', current_key)
+    redis.call('EXPIRE', current_key, window * 2)
+    return '0'
+end
+if current + 1 > limit or previous == 0 then
+    return tostring(window - elapsed)
+end
+return tostring(math.max(window * (1 - (limit - current - 1) / previous) - elapsed, 0.001))
+"""
+
+
+def window_wait(current: int, previous: int, elapsed: float, limit: int, window: int) -> float:
+    """
+    Секунды до повтора для скользящего окна (как SLIDING_WINDOW_LUA), 0 — запрос укладывается в лимит
+    """
+    if previous * (1 - elapsed / window) + current + 1 <= limit:
+        return 0.0
+    if current + 1 > limit or not previous:
+        return window - elapsed
+    return max(window * (1 - (limit - current - 1) / previous) - elapsed, 0.001)
+
+
+class MemoryBackend:
+    """
+    Лимиты в памяти процесса — для одного экземпляра бота (или одного воркера API)
+    """
+
+    # Чистка устаревших ключей, когда их становится больше
+    MAX_KEYS = 100_000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}  # key -> (tokens, ts, expires_at)
+        self._counters: Dict[str, Tuple[int, float]] = {}  # key -> (value, expires_at)
+        self._blocks: Dict[str, float] = {}  # key -> until
+        self._windows: Dict[str, Tuple[int, int, int, float]] = {}  # key -> (window, current, previous, expires_at)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        tokens, ts, _ = self._buckets.get(key, (burst, now, 0))
+        tokens = min(burst, tokens + (now - ts) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now, now + burst / rate)
+        if len(self._buckets) > self.MAX_KEYS:
+            self._prune(now)
+        return wait
+
+    async def window(self, key: str, limit: int, window: int) -> float:
+        now = time.time()
+        index = int(now // window)
+        stored, current, previous, _ = self._windows.get(key, (index, 0, 0, 0))
+        if stored == index - 1:
+            current, previous = 0, current
+        elif stored != index:
+            current, previous = 0, 0
+        wait = window_wait(current, previous, now - index * window, limit, window)
+        if not wait:
+            current += 1
+        self._windows[key] = (index, current, previous, time.monotonic() + 2 * window)
+        if len(self._windows) > self.MAX_KEYS:
+            self._prune(time.monotonic())
+        return wait
+
+    async def incr(self, key: str, ttl: int) -> int:
+        now = time.monotonic()
+        value, expires_at = self._counters.get(key, (0, 0))
+        value = value + 1 if expires_at > now else 1
+        self._counters[key] = (value, now + ttl)
+        return value
+
+    async def reset(self, key: str) -> None:
+        self._counters.pop(key, None)
+
+    async def block(self, key: str, seconds: float) -> None:
+        self._blocks[key] = time.monotonic() + seconds
+
+    async def blocked_for(self, key: str) -> float:
+        until = self._blocks.get(key)
+        if until is None:
+            return 0.0
+        left = until - time.monotonic()
+        if left <= 0:
+            del self._blocks[key]
+            return 0.0
+        return left
+
+    def _prune(self, now: float) -> None:
+        # Полные бакеты не отличаются от отсутствующих
+        self._buckets = {key: value for key, value in self._buckets.items() if value[2] > now}
+        self._counters = {key: value for key, value in self._counters.items() if value[1] > now}
+        self._blocks = {key: until for key, until in self._blocks.items() if until > now}
+        self._windows = {key: value for key, value in self._windows.items() if value[3] > now}
+
+
+class RedisBackend:
+    """
+    Лимиты в Redis — общие для всех реплик бота и воркеров API
+    """
+
+    PREFIX = "throttle:"
+
+    def __init__(self, url: str):
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(url, decode_responses=True)
+        self._take = self.redis.register_script(TOKEN_BUCKET_LUA)
+        self._window = self.redis.register_script(SLIDING_WINDOW_LUA)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._take(keys=[self.PREFIX + key], args=[rate, burst]))
+
+    async def window(self, key: str, limit: int, window: int) -> float:
+        return float(await self._window(keys=[self.PREFIX + key], args=[limit, window]))
+
+    async def incr(self, key: str, ttl: int) -> int:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            value, _ = await pipe.incr(self.PREFIX + key).expire(self.PREFIX + key, ttl).execute()
+        return value
+
+    async def reset(self, key: str) -> None:
+        await self.redis.delete(self.PREFIX + key)
+
+    async def block(self, key: str, seconds: float) -> None:
+        await self.redis.set(self.PREFIX + key, 1, px=max(1, int(seconds * 1000)))
+
+    async def blocked_for(self, key: str) -> float:
+        left = await self.redis.pttl(self.PREFIX + key)
+        return left / 1000 if left > 0 else 0.0
+
+
+class Throttler:
+    """
+    Ограничение частоты обращений: token bucket на пользователя и общий на правило,
+    плюс нарастающая блокировка пользователя за неверные коды.
+    Ошибки хранилища не блокируют пользователей — проверка пропускается.
+    """
+
+    NOTICE_INTERVAL = 30
+
+    def __init__(self):
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = RedisBackend(cnf.redis.URL) if cnf.throttle.BACKEND == "redis" else MemoryBackend()
+        return self._backend
+
+    @staticmethod
+    def rule_limit(rule: str) -> Tuple[float, int]:
+        return cnf.throttle.RULES.get(rule, cnf.throttle.USER_LIMIT)
+
+    async def check(self, rule: str, user_id: int) -> Optional[Tuple[str, float]]:
+        """
+        Забирает токены пользователя и правила
+
+        :return: None, если обращение разрешено, иначе (user / global / cooldown, секунд до повтора)
+        """
+        try:
+            cooldown = await self.backend.blocked_for(f"block:{user_id}") if rule == CODE_RULE else 0
+            if cooldown:
+                return "cooldown", cooldown
+
+            wait = await self.backend.take(f"user:{rule}:{user_id}", *self.rule_limit(rule))
+            if wait:
+                return "user", wait
+
+            wait = await self.backend.take(f"global:{rule}", *cnf.throttle.GLOBAL_LIMIT)
+            if wait:
+                return "global", wait
+        except Exception as e:
+            logger.warning(f"Throttle check skipped: {e}")
+        return None
+
+    async def notice_allowed(self, user_id: int) -> bool:
+        """
+        Не чаще одного предупреждения пользователю за NOTICE_INTERVAL секунд
+        """
+        try:
+            return not await self.backend.take(f"notice:{user_id}", 1 / self.NOTICE_INTERVAL, 1)
+        except Exception:
+            return False
+
+    async def code_failed(self, user_id: int) -> float:
+        """
+        Учитывает неверный код. После CODE_FAILURES подряд пользователь блокируется,
+        каждая следующая ошибка удваивает блокировку.
+
+        :return: Длительность блокировки в секундах (0 — без блокировки)
+        """
+        try:
+            failures = await self.backend.incr(f"failures:{user_id}", cnf.throttle.CODE_FAILURES_TTL)
+            if failures < cnf.throttle.CODE_FAILURES:
+                return 0
+            seconds = min(
+                cnf.throttle.CODE_COOLDOWN * 2 ** (failures - cnf.throttle.CODE_FAILURES),
+                cnf.throttle.CODE_COOLDOWN_MAX
+            )
+            await self.backend.block(f"block:{user_id}", seconds)
+            return seconds
+        except Exception as e:
+            logger.warning(f"Throttle code failure not recorded: {e}")
+            return 0
+
+    async def code_accepted(self, user_id: int) -> None:
+        """
+        Верный код сбрасывает счётчик ошибок
+        """
+        try:
+            await self.backend.reset(f"failures:{user_id}")
+        except Exception as e:
+            logger.warning(f"Throttle failures not reset: {e}")
+
+
+def format_wait(seconds: float) -> str:
+    """
+    Время до повтора для сообщения пользователю
+    """
+    seconds = math.ceil(seconds)
+    if seconds < 60:
+        return f"{seconds} сек."
+    if seconds < 3600:
+        return f"{math.ceil(seconds / 60)} мин."
+    return f"{math.ceil(seconds / 3600)} ч."
+
+
+# Глобальный экземпляр
+throttler = Throttler()